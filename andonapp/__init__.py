@@ -1 +1,18 @@
+import sys
+
 from .andon_client import AndonAppClient
+
+if (3, 5) <= sys.version_info < (3, 7):
+    try:
+        from .async_client import AsyncAndonAppClient
+    except ImportError:
+        # httpx isn't installed; the asyncio client is unavailable.
+        pass
+
+
+def __getattr__(name):
+    # asyncio is slow to import, so the asyncio client is loaded on first use.
+    if name == 'AsyncAndonAppClient':
+        from .async_client import AsyncAndonAppClient
+        return AsyncAndonAppClient
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
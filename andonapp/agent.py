@@ -0,0 +1,342 @@
+"""
+Local forwarding agent for fire-and-forget station events. The agent listens
+for datagrams on a UDP port or a Unix socket, parses each line into a
+``report_data`` or ``update_station_status`` call, and forwards it through one
+pooled, buffered and retrying client. Callers only write a datagram, so they
+never wait on Andon.
+
+Each line holds one event, with fields separated by ``|``::
+
+    report|<line>|<station>|<PASS or FAIL>|<process seconds>[|<fail reason>[|<fail notes>]]
+    status|<line>|<station>|<GREEN, YELLOW or RED>[|<reason>[|<notes>]]
+
+``R`` and ``S`` may be used for ``report`` and ``status``, empty trailing
+fields are treated as missing, and ``\\|``, ``\\\\``, ``\\n`` and ``\\r`` escape a
+pipe, backslash, newline or carriage return within a field. Lines are
+separated by newlines only; any other control character is part of the field.
+For example, from a shell::
+
+    echo 'report|line 1|station 1|PASS|120' | nc -u -w0 127.0.0.1 7325
+
+Run the agent with ``andonapp-agent --org-name ORG --api-token TOKEN``, or use
+``send_report``/``send_status`` from Python.
+"""
+
+import argparse
+import logging
+import math
+import os
+import socket
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7325
+DEFAULT_ADDRESS = (DEFAULT_HOST, DEFAULT_PORT)
+
+MAX_DATAGRAM_SIZE = 65535
+
+_KINDS = {
+    'report': 'report_data',
+    'r': 'report_data',
+    'status': 'update_station_status',
+    's': 'update_station_status',
+}
+_FIELDS = {
+    'report_data': ('line_name', 'station_name', 'pass_result',
+            'process_time_seconds', 'fail_reason', 'fail_notes'),
+    'update_station_status': ('line_name', 'station_name', 'status_color',
+            'status_reason', 'status_notes'),
+}
+_REQUIRED = {
+    'report_data': 4,
+    'update_station_status': 3,
+}
+_UNESCAPED = {'n': '\n', 'r': '\r'}
+
+
+def format_event(method, **kwargs):
+    """
+    Formats a ``report_data`` or ``update_station_status`` call as an agent
+    line.
+    """
+    fields = _FIELDS[method]
+    values = [kwargs.get(name) for name in fields]
+    while len(values) > _REQUIRED[method] and values[-1] is None:
+        values.pop()
+    kind = 'report' if method == 'report_data' else 'status'
+    return '|'.join([kind] + [_escape(value) for value in values])
+
+
+def parse_event(line):
+    """
+    Parses an agent line into a client method name and its keyword arguments.
+
+    Raises
+    ------
+    ValueError
+        If the line is malformed
+    """
+    fields = _split(line.rstrip('\r\n'))
+    method = _KINDS.get(fields[0].lower())
+    if method is None:
+        raise ValueError("Unknown event type: {!r}".format(fields[0]))
+
+    names = _FIELDS[method]
+    values = fields[1:]
+    if len(values) < _REQUIRED[method] or len(values) > len(names):
+        raise ValueError("Expected {} to {} fields for {}, got {}".format(
+                _REQUIRED[method], len(names), fields[0], len(values)))
+
+    values += [None] * (len(names) - len(values))
+    kwargs = dict((name, value or None) for name, value in zip(names, values))
+    if method == 'report_data':
+        kwargs['process_time_seconds'] = _parse_number(kwargs['process_time_seconds'])
+    return method, kwargs
+
+
+def send_report(line_name, station_name, pass_result, process_time_seconds,
+        fail_reason=None, fail_notes=None, address=DEFAULT_ADDRESS):
+    """
+    Sends a ``report_data`` event to an agent without waiting for Andon.
+    ``address`` is a (host, port) pair for UDP or a Unix socket path.
+    """
+    send_line(format_event('report_data', line_name=line_name,
+            station_name=station_name, pass_result=pass_result,
+            process_time_seconds=process_time_seconds,
+            fail_reason=fail_reason, fail_notes=fail_notes), address)
+
+
+def send_status(line_name, station_name, status_color,
+        status_reason=None, status_notes=None, address=DEFAULT_ADDRESS):
+    """
+    Sends an ``update_station_status`` event to an agent without waiting for
+    Andon. ``address`` is a (host, port) pair for UDP or a Unix socket path.
+    """
+    send_line(format_event('update_station_status', line_name=line_name,
+            station_name=station_name, status_color=status_color,
+            status_reason=status_reason, status_notes=status_notes), address)
+
+
+def send_line(line, address=DEFAULT_ADDRESS):
+    """
+    Sends one or more raw agent lines in a single datagram.
+    """
+    sock = socket.socket(_family(address), socket.SOCK_DGRAM)
+    try:
+        sock.sendto(line.encode('utf-8'), address)
+    finally:
+        sock.close()
+
+
+class Agent(object):
+    """
+    Receives agent lines on a datagram socket and forwards them through a
+    buffered reporter. Malformed lines and failed sends are logged and
+    counted.
+
+    Parameters
+    ----------
+    client : AndonAppClient
+        Client used to send events
+    address : tuple or str, optional
+        (host, port) to listen on for UDP, or a Unix socket path
+    workers : int, optional
+        Number of threads sending events
+    max_queue_size : int, optional
+        Events buffered before the oldest are dropped
+    """
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, client, address=DEFAULT_ADDRESS, workers=4,
+            max_queue_size=10000):
+        self.client = client
+        self.received = 0
+        self.malformed = 0
+        self.sent = 0
+        self.failed = 0
+        self._counter_lock = threading.Lock()
+
+        if _family(address) != socket.AF_INET and os.path.exists(address):
+            os.unlink(address)
+        self._socket = socket.socket(_family(address), socket.SOCK_DGRAM)
+        self._socket.bind(address)
+        self._socket.settimeout(self.POLL_INTERVAL)
+        self.address = self._socket.getsockname()
+        self._reporter = client.reporter(workers=workers,
+                max_queue_size=max_queue_size, when_full='drop_oldest',
+                callback=self._on_complete)
+        self._thread = None
+        self._stopping = False
+
+    def serve_forever(self):
+        """
+        Receives and forwards events until ``stop()`` is called.
+        """
+        while not self._stopping:
+            try:
+                data = self._socket.recv(MAX_DATAGRAM_SIZE)
+            except socket.timeout:
+                continue
+            except (OSError, socket.error):
+                if self._stopping:
+                    return
+                raise
+            self.handle(data)
+
+    def handle(self, data):
+        """
+        Forwards every event in a datagram.
+        """
+        # Not splitlines(), which also breaks lines at \r, \x0b, \x1c-\x1e,
+        # \x85 and \u2028 that may appear unescaped in a note.
+        for line in data.decode('utf-8', 'replace').split('\n'):
+            if not line.strip():
+                continue
+            with self._counter_lock:
+                self.received += 1
+            try:
+                method, kwargs = parse_event(line)
+            except ValueError as e:
+                with self._counter_lock:
+                    self.malformed += 1
+                logger.warning("Ignoring malformed event %r: %s", line, e)
+                continue
+            getattr(self._reporter, method)(**kwargs)
+
+    def start(self):
+        """
+        Serves from a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name='andon-agent')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stops receiving, sends everything already received, and closes the
+        socket.
+        """
+        self._stopping = True
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._socket.close()
+        self._reporter.close(timeout)
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def flush(self, timeout=None):
+        return self._reporter.flush(timeout)
+
+    def _on_complete(self, error):
+        with self._counter_lock:
+            if error is None:
+                self.sent += 1
+            else:
+                self.failed += 1
+        if error is not None:
+            logger.warning("Failed to forward event: %s", error)
+
+
+def main(argv=None):
+    """
+    Entry point of the ``andonapp-agent`` command.
+    """
+    from .andon_client import AndonAppClient
+    from .retry import CircuitBreaker, RetryPolicy
+    from .spool import Spool
+
+    parser = argparse.ArgumentParser(prog='andonapp-agent',
+            description='Forward station events received over UDP or a Unix socket to Andon.')
+    parser.add_argument('--org-name', default=os.environ.get('ANDON_ORG_NAME'),
+            help='Andon organization name (default: $ANDON_ORG_NAME)')
+    parser.add_argument('--api-token', default=os.environ.get('ANDON_API_TOKEN'),
+            help='Andon API token (default: $ANDON_API_TOKEN)')
+    parser.add_argument('--endpoint', help='Andon API base URL')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='UDP address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='UDP port to listen on')
+    parser.add_argument('--unix', metavar='PATH', help='Listen on a Unix datagram socket instead')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--max-attempts', type=int, default=5,
+            help='Attempts per event before it fails or is spooled')
+    parser.add_argument('--spool', metavar='PATH',
+            help='SQLite file keeping events while Andon is unreachable')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.org_name or not args.api_token:
+        parser.error('--org-name and --api-token are required')
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+            format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    client = AndonAppClient(args.org_name, args.api_token,
+            pool_maxsize=args.workers,
+            retry_policy=RetryPolicy(max_attempts=args.max_attempts),
+            circuit_breaker=CircuitBreaker(),
+            spool=Spool(args.spool) if args.spool else None)
+    if args.endpoint:
+        client.endpoint = args.endpoint
+
+    address = args.unix or (args.host, args.port)
+    agent = Agent(client, address, workers=args.workers, max_queue_size=args.queue_size)
+    logger.info("Listening on %s", agent.address)
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.stop()
+        client.close()
+
+
+def _family(address):
+    if isinstance(address, str):
+        return socket.AF_UNIX
+    return socket.AF_INET
+
+
+def _escape(value):
+    if value is None:
+        return ''
+    return (str(value).replace('\\', '\\\\').replace('|', '\\|')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _split(line):
+    fields = []
+    current = []
+    chars = iter(line)
+    for char in chars:
+        if char == '\\':
+            escaped = next(chars, '')
+            current.append(_UNESCAPED.get(escaped, escaped))
+        elif char == '|':
+            fields.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    fields.append(''.join(current))
+    return fields
+
+
+def _parse_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid process time: {!r}".format(value))
+    if math.isnan(number) or math.isinf(number):
+        raise ValueError("Invalid process time: {!r}".format(value))
+    return number
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Cross-process aggregation over a local Unix socket. One process runs an
+``AggregatorServer`` around a single ``AndonAppClient``, and any number of
+worker processes send their events through it with ``AggregatorClient``
+instead of each opening their own connections to Andon.
+
+Example
+-------
+.. highlight:: python
+    # In the parent, before forking workers
+    server = AggregatorServer(AndonAppClient('orgName', 'apiToken'),
+            '/tmp/andon.sock').start()
+
+    # In each worker
+    client = AggregatorClient('/tmp/andon.sock')
+    client.report_data(line_name='line 1',
+            station_name='station 1',
+            pass_result='PASS',
+            process_time_seconds=120)
+"""
+
+import json
+import os
+import socket
+import threading
+
+try:
+    from socketserver import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+except ImportError:
+    from SocketServer import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+
+from . import exceptions
+from .deadline import as_deadline
+from .exceptions import AndonAppException
+from .exceptions import AndonConnectionException
+from .exceptions import AndonDeadlineExceededException
+from .exceptions import AndonTimeoutException
+
+METHODS = ('report_data', 'update_station_status')
+
+
+class AggregatorServer(ThreadingMixIn, UnixStreamServer):
+    """
+    Accepts events from ``AggregatorClient`` connections on a Unix socket and
+    sends them with ``client``, so every process shares its connection pool.
+    Failures are returned to the sender with their exception type.
+
+    Parameters
+    ----------
+    client : AndonAppClient
+        Client used to send all events
+    path : str
+        Path of the Unix socket; an existing socket file is replaced
+    """
+
+    daemon_threads = True
+
+    def __init__(self, client, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        UnixStreamServer.__init__(self, path, _AggregatorHandler)
+        self.client = client
+        self.path = path
+        self._thread = None
+
+    def start(self):
+        """
+        Serves connections from a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.1,),
+                name='andon-aggregator')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops serving and removes the socket file.
+        """
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def dispatch(self, message):
+        method = message.get('method')
+        if method not in METHODS:
+            return {'error': 'AndonAppException',
+                    'message': 'Unknown method: {}'.format(method)}
+        try:
+            getattr(self.client, method)(**message.get('args', {}))
+        except AndonAppException as e:
+            return {'error': e.__class__.__name__, 'message': str(e)}
+        except Exception as e:
+            return {'error': 'AndonAppException',
+                    'message': '{}: {}'.format(e.__class__.__name__, e)}
+        return {'ok': True}
+
+
+class _AggregatorHandler(StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line.decode('utf-8'))
+                reply = self.server.dispatch(message)
+            except ValueError as e:
+                reply = {'error': 'AndonAppException', 'message': str(e)}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class AggregatorClient(object):
+    """
+    Drop-in stand-in for ``AndonAppClient`` that forwards calls to an
+    ``AggregatorServer`` and raises the same exceptions the server's client
+    raised. It keeps one connection per process and is safe to create before
+    forking.
+
+    Parameters
+    ----------
+    path : str
+        Path of the aggregator's Unix socket
+    timeout : float, optional
+        Seconds to wait for the aggregator to answer; a call's ``deadline``
+        shortens the wait
+    """
+
+    def __init__(self, path, timeout=None):
+        self.path = path
+        self.timeout = timeout
+        self._pid = os.getpid()
+        self._socket = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def report_data(self, line_name, station_name,
+            pass_result, process_time_seconds,
+            fail_reason=None, fail_notes=None, deadline=None, event_id=None):
+        """
+        Reports the outcome of a process at a station to Andon. See
+        ``AndonAppClient.report_data``; ``event_id`` must be a string or a
+        number, since it is sent to the aggregator as JSON.
+        """
+        self._call('report_data', {
+            'line_name': line_name,
+            'station_name': station_name,
+            'pass_result': pass_result,
+            'process_time_seconds': process_time_seconds,
+            'fail_reason': fail_reason,
+            'fail_notes': fail_notes,
+            'event_id': event_id
+        }, deadline)
+
+    def update_station_status(self, line_name, station_name,
+            status_color, status_reason=None, status_notes=None, deadline=None):
+        """
+        Changes the status of a station in Andon. See
+        ``AndonAppClient.update_station_status``.
+        """
+        self._call('update_station_status', {
+            'line_name': line_name,
+            'station_name': station_name,
+            'status_color': status_color,
+            'status_reason': status_reason,
+            'status_notes': status_notes
+        }, deadline)
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _call(self, method, args, deadline=None):
+        if self._pid != os.getpid():
+            # Never share the parent's connection; replies would interleave.
+            self._lock = threading.Lock()
+            self._socket = None
+            self._file = None
+            self._pid = os.getpid()
+
+        timeout = self.timeout
+        deadline = as_deadline(deadline)
+        if deadline is not None:
+            deadline.check()
+            # The aggregator's client gets what is left of the deadline once
+            # the message arrives, so it can't send after the caller gave up.
+            args['deadline'] = deadline.remaining()
+            timeout = deadline.clip(timeout)
+
+        message = json.dumps({'method': method, 'args': args}).encode('utf-8') + b'\n'
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+                self._socket.settimeout(timeout)
+                self._socket.sendall(message)
+                line = self._file.readline()
+            except socket.timeout:
+                # A late reply would be read as the answer to the next call.
+                self._disconnect()
+                if deadline is not None and deadline.expired:
+                    raise AndonDeadlineExceededException(
+                            "Deadline exceeded waiting for the aggregator")
+                raise AndonTimeoutException("Timed out waiting for the aggregator")
+            except (OSError, socket.error) as e:
+                self._disconnect()
+                raise AndonConnectionException("Aggregator unavailable: {}".format(e))
+            if not line:
+                self._disconnect()
+                raise AndonConnectionException("Aggregator closed the connection")
+
+        reply = json.loads(line.decode('utf-8'))
+        if 'error' in reply:
+            error = getattr(exceptions, reply['error'], None)
+            if not (isinstance(error, type) and issubclass(error, AndonAppException)):
+                error = AndonAppException
+            raise error(reply['message'])
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except Exception:
+            sock.close()
+            raise
+        self._socket = sock
+        self._file = sock.makefile('rb')
+
+    def _disconnect(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+        self._socket = None
+        self._file = None
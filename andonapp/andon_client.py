@@ -12,9 +12,28 @@ Example
             process_time_seconds=120)
 """
 
-import requests
+import functools
+import logging
+import os
+import threading
+import time
+
 from .exceptions import raise_from_error_response
+from .exceptions import raise_from_status
 from .exceptions import AndonAppException
+from .exceptions import AndonDeadlineExceededException
+from .bulk import dispatch
+from .deadline import as_deadline
+from .encoding import compact as compact_request
+from .encoding import get_encoder
+from .encoding import gzip_body
+from .metrics import RequestInfo
+from .reporter import BufferedReporter
+from .retry import RETRYABLE_EXCEPTIONS
+from .retry import RetryPolicy
+from .transport import get_transport
+
+logger = logging.getLogger(__name__)
 
 
 class AndonAppClient(object):
@@ -33,12 +52,79 @@ class AndonAppClient(object):
                 pass_result='PASS',
                 process_time_seconds=120)
 
+    The client owns a pool of keep-alive connections that is shared by every
+    call and is safe to use from multiple threads. It is also safe to create
+    before forking: a child process notices the new process ID and opens its
+    own connections instead of sharing the parent's. Call ``close()`` when done
+    with the client, or use it as a context manager:
+
+    .. code-block:: python
+
+        with AndonAppClient('orgName', 'apiToken') as client:
+            client.report_data(...)
+
     Parameters
     ----------
     org_name : str
         Organization name within Andon
     api_token : str
         Andon API token necessary to make requests
+    pool_connections : int, optional
+        Number of per-host connection pools to cache
+    pool_maxsize : int, optional
+        Maximum number of connections kept open to a single host
+    pool_block : bool, optional
+        If True, callers wait for a free connection once ``pool_maxsize``
+        connections are in use instead of opening a throwaway one
+    keep_alive : bool, optional
+        If False, connections are closed after every request
+    spool : Spool, optional
+        Durable store for events that can't be delivered because Andon is
+        unreachable. Spooled events are replayed in order in the background,
+        and while a backlog exists new events are spooled behind it.
+    retry_policy : RetryPolicy, optional
+        How to retry requests that fail because Andon is unreachable or has an
+        internal error. Requests are not retried by default.
+    circuit_breaker : CircuitBreaker, optional
+        Fails requests fast with ``AndonCircuitOpenException`` while Andon is
+        known to be down
+    status_cache : StatusCache, optional
+        Suppresses status updates that wouldn't change a station's last sent
+        status, and optionally coalesces bursts of updates
+    json_encoder : str or callable, optional
+        JSON encoder for request bodies -- 'orjson', 'ujson', 'json', or a
+        callable returning bytes. Defaults to the fastest one installed.
+    metrics : Metrics, optional
+        Collects request counters and latency histograms
+    validator : Validator, optional
+        Rejects malformed requests locally, with the exceptions Andon would
+        raise, instead of sending them
+    rate_limiter : RateLimiter, optional
+        Delays requests, including retries, to stay within global, per-line
+        and per-station rates
+    connect_timeout : float, optional
+        Seconds to wait for a connection to Andon; forever if None
+    read_timeout : float, optional
+        Seconds to wait for Andon to send each part of a response; forever if
+        None
+    dedup : DedupIndex, optional
+        Drops ``report_data`` calls repeating a report sent recently, such as
+        events a PLC replays after reconnecting
+    board : Board, optional
+        Keeps the last status and report result of every station as events
+        are delivered, for local dashboards
+    transport : str or Transport, optional
+        How requests are sent -- 'requests', 'http' for the faster-starting
+        standard library transport, 'http2' to multiplex concurrent requests
+        over one connection, or a ``Transport`` instance. Defaults to
+        'requests' when it is installed. The transport is only imported when
+        the first request is sent.
+    compact : bool, optional
+        If True, null optional fields are left out of request bodies
+    compress_threshold : int, optional
+        Gzip-compresses request bodies of at least this many bytes. If Andon
+        rejects a compressed body, it is resent uncompressed and compression
+        is turned off for the rest of the client's life. Off by default.
     """
 
     AUTHORIZATION_HEADER = 'Authorization'
@@ -48,16 +134,164 @@ class AndonAppClient(object):
     REPORT_DATA_PATH = '/data/report'
     UPDATE_STATUS_PATH = '/station/update'
 
-    def __init__(self, org_name, api_token):
+    DEFAULT_POOL_CONNECTIONS = 1
+    DEFAULT_POOL_MAXSIZE = 10
+
+    DEFAULT_CONNECT_TIMEOUT = 5.0
+    DEFAULT_READ_TIMEOUT = 30.0
+
+    # Statuses with which a server may refuse a body it can't decompress.
+    COMPRESSION_REJECTED_STATUSES = (400, 415)
+
+    def __init__(self, org_name, api_token,
+            pool_connections=DEFAULT_POOL_CONNECTIONS,
+            pool_maxsize=DEFAULT_POOL_MAXSIZE,
+            pool_block=False,
+            keep_alive=True,
+            spool=None,
+            retry_policy=None,
+            circuit_breaker=None,
+            status_cache=None,
+            json_encoder=None,
+            metrics=None,
+            validator=None,
+            rate_limiter=None,
+            connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+            read_timeout=DEFAULT_READ_TIMEOUT,
+            dedup=None,
+            board=None,
+            transport=None,
+            compact=False,
+            compress_threshold=None):
         self._org_name = org_name
         self._auth_header_value = self.BEARER + api_token
         self.endpoint = self.DEFAULT_ENDPOINT
 
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._keep_alive = keep_alive
+        self._timeout = (connect_timeout, read_timeout)
+
+        self._encode = get_encoder(json_encoder)
+        self._headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            self.AUTHORIZATION_HEADER: self._auth_header_value
+        }
+        if not keep_alive:
+            self._headers['Connection'] = 'close'
+        self._compact = compact
+        self._compress_threshold = compress_threshold
+        self._compressed_headers = dict(self._headers)
+        self._compressed_headers['Content-Encoding'] = 'gzip'
+
+        self._spool = spool
+        self._retry_policy = retry_policy
+        if retry_policy is None and circuit_breaker is not None:
+            self._retry_policy = RetryPolicy(max_attempts=1)
+        self._circuit_breaker = circuit_breaker
+        self.status_cache = status_cache
+        self._validator = validator
+        self.rate_limiter = rate_limiter
+        self.dedup = dedup
+        self.board = board
+
+        self.metrics = metrics
+        self._before_request_hooks = []
+        self._after_request_hooks = []
+        if metrics is not None:
+            self._after_request_hooks.append(metrics)
+
+        self._pid = os.getpid()
+        self._transport_option = transport
+        self._transport = None
+        self._transport_lock = threading.Lock()
+
+        if spool is not None and spool.backlog_size:
+            spool.start_replay(self._deliver)
+
+    @property
+    def endpoint(self):
+        """
+        Base URL of the Andon API.
+        """
+        return self._endpoint
+
+    @endpoint.setter
+    def endpoint(self, endpoint):
+        self._endpoint = endpoint
+        self._urls = {
+            self.REPORT_DATA_PATH: endpoint + self.REPORT_DATA_PATH,
+            self.UPDATE_STATUS_PATH: endpoint + self.UPDATE_STATUS_PATH
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Sends any status updates held for coalescing, then closes all pooled
+        connections and stops replaying the spool. The client may still be
+        used afterwards, in which case a new pool is created on the next
+        request.
+        """
+        if self.status_cache is not None:
+            self.status_cache.flush()
+        if self._spool is not None:
+            self._spool.stop_replay()
+        if self._transport is not None:
+            self._transport.close()
+
+    def add_request_hooks(self, before=None, after=None):
+        """
+        Registers functions called with a ``RequestInfo`` around every request
+        sent to Andon, including retries. ``before`` sees the path and payload
+        size; ``after`` also sees the status code, timings and the class of
+        any exception raised. Exceptions raised by hooks are logged and
+        otherwise ignored.
+
+        Example
+        -------
+        .. code-block:: python
+
+            def log_request(info):
+                print(info.path, info.status_code, info.elapsed, info.outcome)
+
+            client.add_request_hooks(after=log_request)
+        """
+        if before is not None:
+            self._before_request_hooks.append(before)
+        if after is not None:
+            self._after_request_hooks.append(after)
+
+    def reporter(self, **kwargs):
+        """
+        Creates a ``BufferedReporter`` that queues events and sends them with
+        this client from background threads, so callers never block on Andon.
+        Keyword arguments are passed to ``BufferedReporter``.
+
+        Example
+        -------
+        .. code-block:: python
+
+            with client.reporter(workers=4, when_full='drop_oldest') as reporter:
+                reporter.report_data(
+                        line_name='line 1',
+                        station_name='station 1',
+                        pass_result='PASS',
+                        process_time_seconds=120)
+        """
+        return BufferedReporter(self, **kwargs)
+
     def report_data(self, line_name, station_name,
             pass_result, process_time_seconds,
-            fail_reason=None, fail_notes=None):
+            fail_reason=None, fail_notes=None, deadline=None, event_id=None):
         """
-        Reports the outcome of a process at a station to Andon.
+        Reports the outcome of a process at a station to Andon. If the client
+        has a ``dedup`` index, a report repeating one sent recently is dropped.
 
         Example
         -------
@@ -85,6 +319,12 @@ class AndonAppClient(object):
             If the process failed, the reason why
         fail_notes : str, optional
             If the process failed, additional details on why
+        deadline : float or Deadline, optional
+            Seconds the whole call may take, including rate limiting, retries
+            and backoff
+        event_id : hashable, optional
+            Identifies the event for the ``dedup`` index, which otherwise
+            compares all the other fields. Not sent to Andon.
 
         Raises
         ------
@@ -100,6 +340,15 @@ class AndonAppClient(object):
             If a referenced station can't be found
         AndonUnauthorizedRequestException
             If authorization fails
+        AndonConnectionException
+            If Andon can't be reached and no spool is configured
+        AndonCircuitOpenException
+            If the circuit breaker is open and no spool is configured
+        AndonTimeoutException
+            If Andon doesn't answer within the client's timeouts and no spool
+            is configured
+        AndonDeadlineExceededException
+            If the deadline passes; the event is not spooled
         """
         request = {
             'orgName': self._org_name,
@@ -111,21 +360,30 @@ class AndonAppClient(object):
             'failNotes': fail_notes
         }
 
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8',
-            'Authorization': self._auth_header_value
-        }
+        if self._validator is not None:
+            self._validator.validate_report(request)
 
-        url = self.endpoint + self.REPORT_DATA_PATH
-        response = requests.post(url, json=request, headers=headers)
+        if self.dedup is None:
+            self._send(self.REPORT_DATA_PATH, request, as_deadline(deadline))
+            return
 
-        if response.status_code != requests.codes.ok:
-            self._process_error_response(response)
+        key = self.dedup.fingerprint(request, event_id)
+        if not self.dedup.add(key):
+            logger.debug("Dropping repeated report for %s/%s",
+                    line_name, station_name)
+            return
+        try:
+            self._send(self.REPORT_DATA_PATH, request, as_deadline(deadline))
+        except Exception:
+            self.dedup.discard(key)
+            raise
 
     def update_station_status(self, line_name, station_name,
-            status_color, status_reason=None, status_notes=None):
+            status_color, status_reason=None, status_notes=None, deadline=None):
         """
-        Changes the status of a station in Andon.
+        Changes the status of a station in Andon. If the client has a
+        ``status_cache``, updates that wouldn't change the station's status may
+        be skipped, and updates may be held briefly to coalesce a burst.
 
         Example
         -------
@@ -150,6 +408,10 @@ class AndonAppClient(object):
             The reason for the color change
         status_notes : str, optional
             Notes on the change
+        deadline : float or Deadline, optional
+            Seconds the whole call may take, including rate limiting, retries
+            and backoff. An update held for coalescing fails, and is logged,
+            if it is still held when its deadline passes.
 
         Raises
         ------
@@ -165,6 +427,15 @@ class AndonAppClient(object):
             If a referenced station can't be found
         AndonUnauthorizedRequestException
             If authorization fails
+        AndonConnectionException
+            If Andon can't be reached and no spool is configured
+        AndonCircuitOpenException
+            If the circuit breaker is open and no spool is configured
+        AndonTimeoutException
+            If Andon doesn't answer within the client's timeouts and no spool
+            is configured
+        AndonDeadlineExceededException
+            If the deadline passes; the event is not spooled
         """
         request = {
             'orgName': self._org_name,
@@ -175,17 +446,247 @@ class AndonAppClient(object):
             'statusNotes': status_notes
         }
 
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8',
-            'Authorization': self._auth_header_value
-        }
+        if self._validator is not None:
+            self._validator.validate_status(request)
 
-        url = self.endpoint + self.UPDATE_STATUS_PATH
-        response = requests.post(url, json=request, headers=headers)
+        deadline = as_deadline(deadline)
+        if self.status_cache is not None:
+            send = self._send_status
+            if deadline is not None:
+                send = functools.partial(self._send_status, deadline=deadline)
+            self.status_cache.update(request, send)
+        else:
+            self._send_status(request, deadline)
 
-        if response.status_code != requests.codes.ok:
+    def _send_status(self, request, deadline=None):
+        self._send(self.UPDATE_STATUS_PATH, request, deadline)
+
+    def report_many(self, events, max_workers=None, ordered=True):
+        """
+        Reports many process outcomes in parallel over the pooled connections.
+        ``events`` may be any iterable, including a generator, of dicts with
+        the keyword arguments of ``report_data``; it is consumed lazily, so
+        memory use doesn't grow with its size.
+
+        Example
+        -------
+        .. code-block:: python
+
+            events = ({'line_name': 'line 1',
+                       'station_name': 'station 1',
+                       'pass_result': 'PASS',
+                       'process_time_seconds': t} for t in times)
+
+            for result in client.report_many(events, max_workers=8):
+                if not result.ok:
+                    print(result.index, result.exception)
+
+        Parameters
+        ----------
+        events : iterable of dict
+            Keyword arguments for each ``report_data`` call
+        max_workers : int, optional
+            Maximum number of requests in progress at once; defaults to the
+            connection pool size
+        ordered : bool, optional
+            If True results are yielded in input order, otherwise as each
+            request completes
+
+        Returns
+        -------
+        iterator of BulkResult
+            The index, arguments and exception (None on success) of each event
+        """
+        return dispatch(self.report_data, events,
+                max_workers or self._pool_maxsize, ordered)
+
+    def update_many(self, updates, max_workers=None, ordered=True):
+        """
+        Changes the status of many stations in parallel. Works like
+        ``report_many``, with each item holding the keyword arguments of
+        ``update_station_status``.
+
+        Returns
+        -------
+        iterator of BulkResult
+            The index, arguments and exception (None on success) of each update
+        """
+        return dispatch(self.update_station_status, updates,
+                max_workers or self._pool_maxsize, ordered)
+
+    def send(self, path, request, deadline=None):
+        """
+        Sends a request body that is already prepared, such as one captured
+        by a ``Recorder``, to ``REPORT_DATA_PATH`` or ``UPDATE_STATUS_PATH``.
+        It is retried, spooled and applied to the ``board`` like the requests
+        of ``report_data`` and ``update_station_status``, but isn't validated,
+        deduplicated or held for coalescing.
+
+        Parameters
+        ----------
+        path : str
+            ``REPORT_DATA_PATH`` or ``UPDATE_STATUS_PATH``
+        request : dict
+            The request body, with Andon's field names
+        deadline : float or Deadline, optional
+            Seconds the whole call may take, including rate limiting, retries
+            and backoff
+
+        Raises
+        ------
+        ValueError
+            If the path isn't one of Andon's
+        AndonAppException
+            As for ``report_data`` and ``update_station_status``
+        """
+        if path not in self._urls:
+            raise ValueError("Unknown Andon path: {}".format(path))
+        self._send(path, request, as_deadline(deadline))
+
+    def _send(self, path, request, deadline=None):
+        if self._spool is None:
+            self._deliver(path, request, deadline)
+            return
+
+        if self._spool.backlog_size:
+            # Keep events in order behind the ones already waiting, which may
+            # have been spooled by another process sharing the file.
+            self._spool.append(path, request)
+            self._spool.start_replay(self._deliver)
+            return
+
+        try:
+            self._deliver(path, request, deadline)
+        except AndonDeadlineExceededException:
+            # The caller ran out of time, possibly without Andon being asked
+            # at all; spooling would hold every later event behind this one.
+            raise
+        except RETRYABLE_EXCEPTIONS:
+            self._spool.append(path, request)
+            self._spool.start_replay(self._deliver)
+
+    def _deliver(self, path, request, deadline=None):
+        if self._retry_policy is None:
+            if deadline is not None:
+                deadline.check()
+            self._post(path, request, deadline)
+        else:
+            self._retry_policy.call(lambda: self._post(path, request, deadline),
+                    self._circuit_breaker, deadline=deadline)
+
+        if self.board is not None:
+            if path == self.UPDATE_STATUS_PATH:
+                self.board.apply_status(request)
+            else:
+                self.board.apply_report(request)
+
+    def _post(self, path, request, deadline=None):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(request['lineName'], request['stationName'],
+                    None if deadline is None else deadline.remaining())
+
+        timeout = self._timeout
+        if deadline is not None:
+            deadline.check()
+            timeout = (deadline.clip(timeout[0]), deadline.clip(timeout[1]))
+
+        body = self._encode(compact_request(request) if self._compact else request)
+        threshold = self._compress_threshold
+        if threshold is not None and len(body) >= threshold:
+            response, error = self._exchange(path, request, body, gzip_body(body),
+                    self._compressed_headers, timeout)
+            if response.status_code in self.COMPRESSION_REJECTED_STATUSES:
+                response, error = self._exchange(path, request, body, body,
+                        self._headers, timeout)
+                if response.status_code == 200:
+                    # Only blame compression once the same body is accepted
+                    # uncompressed.
+                    logger.warning("Andon rejected a gzip-compressed request; "
+                            "sending uncompressed from now on")
+                    self._compress_threshold = None
+        else:
+            response, error = self._exchange(path, request, body, body, self._headers, timeout)
+
+        if error is not None:
+            raise error
+
+    def _exchange(self, path, request, body, wire_body, headers, timeout):
+        # Returns the response along with the exception its error body maps
+        # to, so that the body is parsed only once.
+        if not (self._before_request_hooks or self._after_request_hooks):
+            response = self._transmit(path, wire_body, headers, timeout)
+            return response, self._error_for(response)
+
+        info = RequestInfo(path, len(body), len(wire_body), request)
+        _run_hooks(self._before_request_hooks, info)
+
+        started = time.perf_counter()
+        try:
+            response = self._transmit(path, wire_body, headers, timeout)
+            info.status_code = response.status_code
+            info.server_time = response.elapsed.total_seconds()
+            # Only the stdlib transport sees connections being opened.
+            info.connect_time = getattr(response, 'connect_time', None)
+            info.tls_time = getattr(response, 'tls_time', None)
+            error = self._error_for(response)
+            if error is not None:
+                info.exception = error.__class__
+            return response, error
+        except Exception as e:
+            info.exception = e.__class__
+            raise
+        finally:
+            info.elapsed = time.perf_counter() - started
+            _run_hooks(self._after_request_hooks, info)
+
+    def _transmit(self, path, body, headers, timeout):
+        return self._get_transport().post(self._urls[path], body, headers, timeout)
+
+    def _get_transport(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+
+        transport = self._transport
+        if transport is not None:
+            return transport
+
+        with self._transport_lock:
+            if self._transport is None:
+                self._transport = get_transport(self._transport_option,
+                        pool_connections=self._pool_connections,
+                        pool_maxsize=self._pool_maxsize,
+                        pool_block=self._pool_block)
+            return self._transport
+
+    def _after_fork(self):
+        self._transport_lock = threading.Lock()
+        if self._transport is not None:
+            self._transport.after_fork()
+        self._pid = os.getpid()
+
+    def _error_for(self, response):
+        if response.status_code == 200:
+            return None
+        try:
             self._process_error_response(response)
+        except AndonAppException as e:
+            return e
 
     def _process_error_response(self, response):
-        raise_from_error_response(response.json())
-        raise AndonAppException("Status {}: {}".format(response.status_code, response.text))
+        try:
+            error = response.json()
+        except ValueError:
+            error = None
+        retry_after = response.headers.get('Retry-After')
+        if isinstance(error, dict):
+            raise_from_error_response(error, retry_after)
+        raise_from_status(response.status_code,
+                "Status {}: {}".format(response.status_code, response.text), retry_after)
+
+
+def _run_hooks(hooks, info):
+    for hook in hooks:
+        try:
+            hook(info)
+        except Exception:
+            logger.exception("Request hook %r failed", hook)
@@ -0,0 +1,268 @@
+"""
+Asyncio client for making requests to Andon (www.andonapp.com). It mirrors
+``AndonAppClient`` but every call is awaitable, so a single event loop can
+report for many stations without tying up a thread per request. Requests are
+sent with ``httpx``, which is installed with the ``async`` extra::
+
+    pip install andonapp[async]
+
+Example
+-------
+.. highlight:: python
+    async with AsyncAndonAppClient('orgName', 'apiToken') as client:
+        await client.report_data(line_name='line 1',
+                station_name='station 1',
+                pass_result='PASS',
+                process_time_seconds=120)
+"""
+
+import asyncio
+import json
+import logging
+
+try:
+    import httpx
+except ImportError:
+    raise ImportError("AsyncAndonAppClient requires httpx: pip install andonapp[async]")
+
+from .andon_client import AndonAppClient
+from .deadline import as_deadline
+from .encoding import compact as compact_request
+from .encoding import get_encoder
+from .encoding import gzip_body
+from .exceptions import raise_from_error_response
+from .exceptions import raise_from_status
+from .exceptions import AndonConnectionException
+from .exceptions import AndonDeadlineExceededException
+from .exceptions import AndonTimeoutException
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAndonAppClient(object):
+    """
+    Asyncio client for making requests to Andon (www.andonapp.com). In order to
+    use the client you must generate an API token on the org settings page
+    within Andon.
+
+    All calls share one pool of keep-alive connections, and at most
+    ``max_in_flight`` requests are outstanding at once; further calls wait
+    for a slot instead of opening more connections.
+
+    Example
+    -------
+    .. code-block:: python
+
+        async with AsyncAndonAppClient('orgName', 'apiToken') as client:
+            await client.report_data(
+                    line_name='line 1',
+                    station_name='station 1',
+                    pass_result='PASS',
+                    process_time_seconds=120)
+
+    Parameters
+    ----------
+    org_name : str
+        Organization name within Andon
+    api_token : str
+        Andon API token necessary to make requests
+    pool_maxsize : int, optional
+        Maximum number of connections kept open to a single host
+    max_in_flight : int, optional
+        Maximum number of requests awaiting a response at any time
+    keep_alive : bool, optional
+        If False, connections are closed after every request; has no effect
+        with ``http2``
+    json_encoder : str or callable, optional
+        JSON encoder for request bodies -- 'orjson', 'ujson', 'json', or a
+        callable returning bytes. Defaults to the fastest one installed.
+    connect_timeout : float, optional
+        Seconds to wait for a connection to Andon; forever if None
+    read_timeout : float, optional
+        Seconds to wait for Andon to send each part of a response; forever if
+        None
+    compact : bool, optional
+        If True, null optional fields are left out of request bodies
+    compress_threshold : int, optional
+        Gzip-compresses request bodies of at least this many bytes, falling
+        back to uncompressed bodies as ``AndonAppClient`` does
+    http2 : bool, optional
+        If True, requests are multiplexed over one HTTP/2 connection per host,
+        which requires the ``h2`` package installed with the ``http2`` extra.
+        HTTP/2 is negotiated with ALPN, falling back to HTTP/1.1.
+    ssl_context : ssl.SSLContext, optional
+        Context used to verify Andon's certificate, such as one trusting a
+        private CA; the system's default trust store if None
+    """
+
+    DEFAULT_ENDPOINT = AndonAppClient.DEFAULT_ENDPOINT
+    REPORT_DATA_PATH = AndonAppClient.REPORT_DATA_PATH
+    UPDATE_STATUS_PATH = AndonAppClient.UPDATE_STATUS_PATH
+
+    DEFAULT_POOL_MAXSIZE = AndonAppClient.DEFAULT_POOL_MAXSIZE
+    DEFAULT_MAX_IN_FLIGHT = 100
+
+    DEFAULT_CONNECT_TIMEOUT = AndonAppClient.DEFAULT_CONNECT_TIMEOUT
+    DEFAULT_READ_TIMEOUT = AndonAppClient.DEFAULT_READ_TIMEOUT
+
+    def __init__(self, org_name, api_token,
+            pool_maxsize=DEFAULT_POOL_MAXSIZE,
+            max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+            keep_alive=True,
+            json_encoder=None,
+            connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+            read_timeout=DEFAULT_READ_TIMEOUT,
+            compact=False,
+            compress_threshold=None,
+            http2=False,
+            ssl_context=None):
+        self._org_name = org_name
+        self._auth_header_value = AndonAppClient.BEARER + api_token
+        self.endpoint = self.DEFAULT_ENDPOINT
+
+        self._pool_maxsize = pool_maxsize
+        self._max_in_flight = max_in_flight
+        self._keep_alive = keep_alive
+        self._encode = get_encoder(json_encoder)
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._compact = compact
+        self._compress_threshold = compress_threshold
+        self._ssl_context = ssl_context
+
+        self._http2 = http2
+        try:
+            # Creating the httpx client checks that h2 is installed when
+            # HTTP/2 is enabled; connections are only opened on first use.
+            self._client = self._new_client()
+        except ImportError:
+            raise ValueError("HTTP/2 requires h2: pip install andonapp[http2]")
+        self._in_flight = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Closes all pooled connections. The client may still be used afterwards,
+        in which case new connections are opened on the next request.
+        """
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    async def report_data(self, line_name, station_name,
+            pass_result, process_time_seconds,
+            fail_reason=None, fail_notes=None, deadline=None):
+        """
+        Reports the outcome of a process at a station to Andon. Takes the same
+        arguments and raises the same exceptions as
+        ``AndonAppClient.report_data``; the ``deadline`` also covers waiting
+        for a free request slot.
+        """
+        request = {
+            'orgName': self._org_name,
+            'lineName': line_name,
+            'stationName': station_name,
+            'passResult': pass_result,
+            'processTimeSeconds': process_time_seconds,
+            'failReason': fail_reason,
+            'failNotes': fail_notes
+        }
+
+        await self._send(self.REPORT_DATA_PATH, request, deadline)
+
+    async def update_station_status(self, line_name, station_name,
+            status_color, status_reason=None, status_notes=None, deadline=None):
+        """
+        Changes the status of a station in Andon. Takes the same arguments and
+        raises the same exceptions as ``AndonAppClient.update_station_status``;
+        the ``deadline`` also covers waiting for a free request slot.
+        """
+        request = {
+            'orgName': self._org_name,
+            'lineName': line_name,
+            'stationName': station_name,
+            'statusColor': status_color,
+            'statusReason': status_reason,
+            'statusNotes': status_notes
+        }
+
+        await self._send(self.UPDATE_STATUS_PATH, request, deadline)
+
+    async def _send(self, path, request, deadline=None):
+        deadline = as_deadline(deadline)
+        if deadline is None:
+            await self._request(path, request)
+            return
+
+        try:
+            await asyncio.wait_for(self._request(path, request), deadline.remaining())
+        except asyncio.TimeoutError:
+            raise AndonDeadlineExceededException("Deadline exceeded")
+
+    async def _request(self, path, request):
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self._max_in_flight)
+
+        url = self.endpoint + path
+        body = self._encode(compact_request(request) if self._compact else request)
+        threshold = self._compress_threshold
+        if threshold is not None and len(body) >= threshold:
+            status, content, headers = await self._post(url, gzip_body(body), 'gzip')
+            if status in AndonAppClient.COMPRESSION_REJECTED_STATUSES:
+                status, content, headers = await self._post(url, body)
+                if status == 200:
+                    logger.warning("Andon rejected a gzip-compressed request; "
+                            "sending uncompressed from now on")
+                    self._compress_threshold = None
+        else:
+            status, content, headers = await self._post(url, body)
+
+        if status != 200:
+            self._process_error_response(status, content, headers.get('Retry-After'))
+
+    async def _post(self, url, body, content_encoding=None):
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Authorization': self._auth_header_value
+        }
+        if not (self._keep_alive or self._http2):
+            headers['Connection'] = 'close'
+        if content_encoding is not None:
+            headers['Content-Encoding'] = content_encoding
+
+        if self._client is None:
+            self._client = self._new_client()
+
+        async with self._in_flight:
+            try:
+                response = await self._client.post(url, content=body, headers=headers,
+                        timeout=httpx.Timeout(connect=self._connect_timeout,
+                                read=self._read_timeout, write=self._read_timeout,
+                                pool=None))
+            except httpx.TimeoutException:
+                raise AndonTimeoutException("Timed out waiting for Andon")
+            except httpx.TransportError as e:
+                raise AndonConnectionException(str(e) or e.__class__.__name__)
+        return response.status_code, response.content, response.headers
+
+    def _new_client(self):
+        keep_alive = self._keep_alive or self._http2
+        return httpx.AsyncClient(http2=self._http2, verify=self._ssl_context or True,
+                limits=httpx.Limits(max_connections=self._pool_maxsize,
+                        max_keepalive_connections=self._pool_maxsize if keep_alive else 0))
+
+    def _process_error_response(self, status, content, retry_after=None):
+        text = content.decode('utf-8', 'replace')
+        try:
+            error = json.loads(text)
+        except ValueError:
+            error = None
+        if isinstance(error, dict):
+            raise_from_error_response(error, retry_after)
+        raise_from_status(status, "Status {}: {}".format(status, text), retry_after)
+
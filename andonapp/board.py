@@ -0,0 +1,154 @@
+"""
+Local view of station board state, kept up to date from the events the
+client delivers, so dashboards can read the current state of every station
+without asking Andon.
+
+Example
+-------
+.. highlight:: python
+    board = Board()
+    client = AndonAppClient('orgName', 'apiToken', board=board)
+
+    board.subscribe(lambda old, new: print(new.station_name, new.status_color),
+            line_name='line 1')
+    client.update_station_status(line_name='line 1',
+            station_name='station 1',
+            status_color='RED')
+
+    board.get('line 1', 'station 1').status_color  # 'RED'
+"""
+
+import collections
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StationState(collections.namedtuple('StationState', [
+        'line_name', 'station_name',
+        'status_color', 'status_reason', 'status_notes', 'status_time',
+        'pass_result', 'process_time_seconds', 'fail_reason', 'fail_notes',
+        'report_time'])):
+    """
+    Last status and last reported result of a station. Fields that haven't
+    been set yet are None; times are ``time.time()`` values of when the event
+    was delivered.
+    """
+
+    __slots__ = ()
+
+
+_EMPTY = StationState(*([None] * len(StationState._fields)))
+
+
+class Board(object):
+    """
+    Thread-safe view of the last status and last report result of every
+    (line, station) the client has delivered an event for. Events are applied
+    once Andon has accepted them, so spooled events appear when they are
+    replayed.
+
+    Subscribers are called with the previous and new ``StationState`` (the
+    previous one is None for a station's first event) whenever a status
+    changes or a report is delivered. They run on the thread that delivered
+    the event and must not block; exceptions they raise are logged and
+    otherwise ignored.
+    """
+
+    def __init__(self):
+        self._stations = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self._stations)
+
+    def get(self, line_name, station_name):
+        """
+        The ``StationState`` of a station, or None if nothing is known.
+        """
+        return self._stations.get((line_name, station_name))
+
+    def snapshot(self, line_name=None):
+        """
+        A consistent copy of the state of every station, or of the stations
+        on one line, keyed by (line, station).
+        """
+        with self._lock:
+            if line_name is None:
+                return dict(self._stations)
+            return dict((key, state) for key, state in self._stations.items()
+                    if key[0] == line_name)
+
+    def subscribe(self, callback, line_name=None, station_name=None):
+        """
+        Calls ``callback(old, new)`` on every change, optionally only for one
+        line or one station.
+
+        Returns
+        -------
+        callable
+            Cancels the subscription when called
+        """
+        subscriber = (callback, line_name, station_name)
+        with self._lock:
+            self._subscribers = self._subscribers + [subscriber]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s is not subscriber]
+        return unsubscribe
+
+    def clear(self):
+        with self._lock:
+            self._stations.clear()
+
+    def apply_status(self, request):
+        """
+        Records a delivered ``update_station_status`` request.
+        """
+        self._apply(request, lambda state: state._replace(
+                status_color=request['statusColor'],
+                status_reason=request.get('statusReason'),
+                status_notes=request.get('statusNotes'),
+                status_time=time.time()),
+                ('status_color', 'status_reason', 'status_notes'))
+
+    def apply_report(self, request):
+        """
+        Records a delivered ``report_data`` request.
+        """
+        self._apply(request, lambda state: state._replace(
+                pass_result=request['passResult'],
+                process_time_seconds=request['processTimeSeconds'],
+                fail_reason=request.get('failReason'),
+                fail_notes=request.get('failNotes'),
+                report_time=time.time()))
+
+    def _apply(self, request, update, compare=None):
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+        key = (request['lineName'], request['stationName'])
+        with self._lock:
+            old = self._stations.get(key)
+            new = update(old or _EMPTY._replace(line_name=key[0], station_name=key[1]))
+            self._stations[key] = new
+            subscribers = self._subscribers
+
+        if compare and old is not None and all(
+                getattr(old, field) == getattr(new, field) for field in compare):
+            return
+
+        for callback, line_name, station_name in subscribers:
+            if ((line_name is None or line_name == key[0])
+                    and (station_name is None or station_name == key[1])):
+                try:
+                    callback(old, new)
+                except Exception:
+                    logger.exception("Board subscriber %r failed", callback)
@@ -0,0 +1,81 @@
+"""
+Parallel dispatch of many client calls, used by ``AndonAppClient.report_many``
+and ``AndonAppClient.update_many``.
+"""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class BulkResult(collections.namedtuple('BulkResult', ['index', 'item', 'exception'])):
+    """
+    Outcome of one item of a bulk call.
+
+    Attributes
+    ----------
+    index : int
+        Position of the item in the input
+    item : dict
+        The keyword arguments the call was made with
+    exception : AndonAppException
+        The exception the call raised, or None if it succeeded
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.exception is None
+
+
+def dispatch(func, items, max_workers, ordered=True):
+    """
+    Calls ``func(**item)`` for every item using up to ``max_workers`` threads,
+    yielding a ``BulkResult`` per item. Items are pulled from ``items`` lazily
+    and only a bounded number are held at once, so generators of any size can
+    be passed.
+
+    Parameters
+    ----------
+    func : callable
+        Function to call for every item
+    items : iterable of dict
+        Keyword arguments for each call
+    max_workers : int
+        Maximum number of calls in progress at once
+    ordered : bool, optional
+        If True results are yielded in input order, otherwise as soon as each
+        call completes
+    """
+    window = max_workers * 2 if ordered else max_workers
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if ordered:
+            pending = collections.deque()
+            for index, item in enumerate(items):
+                pending.append((index, item, executor.submit(func, **item)))
+                if len(pending) >= window:
+                    yield _result(*pending.popleft())
+            while pending:
+                yield _result(*pending.popleft())
+        else:
+            pending = {}
+            for index, item in enumerate(items):
+                pending[executor.submit(func, **item)] = (index, item)
+                if len(pending) >= window:
+                    for result in _completed(pending):
+                        yield result
+            while pending:
+                for result in _completed(pending):
+                    yield result
+
+
+def _completed(pending):
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        index, item = pending.pop(future)
+        yield _result(index, item, future)
+
+
+def _result(index, item, future):
+    return BulkResult(index, item, future.exception())
@@ -0,0 +1,62 @@
+"""
+Deadlines bounding the total time a call may take, including time spent
+queued, rate limited, backing off between retries and waiting on Andon.
+"""
+
+import time
+
+from .exceptions import AndonDeadlineExceededException
+
+
+class Deadline(object):
+    """
+    The point in time by which a call must complete.
+
+    Parameters
+    ----------
+    timeout : float
+        Seconds from now
+    """
+
+    __slots__ = ('expires_at',)
+
+    def __init__(self, timeout):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self):
+        """
+        Seconds left before the deadline, never negative.
+        """
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """
+        Raises ``AndonDeadlineExceededException`` if the deadline has passed.
+        """
+        if self.expired:
+            raise AndonDeadlineExceededException("Deadline exceeded")
+
+    def clip(self, timeout):
+        """
+        ``timeout`` shortened so that it ends no later than the deadline.
+        Raises ``AndonDeadlineExceededException`` rather than returning a
+        timeout of zero, which requests and urllib3 refuse.
+        """
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise AndonDeadlineExceededException("Deadline exceeded")
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+def as_deadline(deadline):
+    """
+    A ``Deadline`` for a call given either seconds from now, an existing
+    ``Deadline``, or None for no deadline.
+    """
+    if deadline is None or isinstance(deadline, Deadline):
+        return deadline
+    return Deadline(deadline)
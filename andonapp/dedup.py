@@ -0,0 +1,128 @@
+"""
+Duplicate suppression for ``report_data``, for sources such as PLCs that
+replay their last events after reconnecting.
+
+Example
+-------
+.. highlight:: python
+    client = AndonAppClient('orgName', 'apiToken',
+            dedup=DedupIndex(max_size=50000, window=600))
+    client.report_data(line_name='line 1',
+            station_name='station 1',
+            pass_result='PASS',
+            process_time_seconds=120,
+            event_id='plc-7:48213')
+"""
+
+import collections
+import hashlib
+import os
+import threading
+import time
+
+REPORT_FIELDS = ('lineName', 'stationName', 'passResult', 'processTimeSeconds',
+        'failReason', 'failNotes')
+
+
+class DedupIndex(object):
+    """
+    Remembers a fingerprint of every report sent in the last ``window``
+    seconds, up to ``max_size`` reports, and flags repeats so they can be
+    dropped before reaching the network. Memory use is bounded by
+    ``max_size`` fixed-size fingerprints; once full, the oldest are
+    forgotten first.
+
+    A report's fingerprint is its caller-supplied event ID if it has one, and
+    otherwise a digest of all its fields. Without event IDs, two genuinely
+    separate reports with identical fields within ``window`` are treated as
+    one, so the window should be shorter than a station's cycle time.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum number of fingerprints kept
+    window : float, optional
+        Seconds a fingerprint is remembered
+    """
+
+    def __init__(self, max_size=10000, window=60):
+        self.max_size = max_size
+        self.window = window
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._seen = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def stats(self):
+        """
+        Counts of repeats found (hits), new reports (misses), fingerprints
+        forgotten early to stay within ``max_size``, and fingerprints held.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._seen)
+            }
+
+    def fingerprint(self, request, event_id=None):
+        """
+        The key identifying a ``report_data`` request.
+        """
+        if event_id is not None:
+            return ('id', event_id)
+        values = '\x1f'.join(str(request.get(field)) for field in REPORT_FIELDS)
+        return hashlib.sha1(values.encode('utf-8')).digest()
+
+    def add(self, key):
+        """
+        Records ``key`` and returns True, or returns False if it was already
+        recorded within the window.
+        """
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if key in self._seen:
+                self.hits += 1
+                return False
+
+            self.misses += 1
+            if len(self._seen) >= self.max_size:
+                self._seen.popitem(last=False)
+                self.evictions += 1
+            self._seen[key] = now
+            return True
+
+    def discard(self, key):
+        """
+        Forgets ``key``, so that a report that failed can be sent again.
+        """
+        with self._lock:
+            self._seen.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
+
+    def _expire(self, now):
+        # Fingerprints are kept in the order they were added, so the expired
+        # ones are all at the front.
+        cutoff = now - self.window
+        seen = self._seen
+        while seen:
+            key, added = next(iter(seen.items()))
+            if added > cutoff:
+                return
+            del seen[key]
@@ -0,0 +1,79 @@
+"""
+JSON encoders for request bodies. The fastest installed encoder is used by
+default: ``orjson``, then ``ujson``, then the standard library ``json``.
+
+``compact`` and ``gzip_body`` shrink bodies further for sites where the
+network, rather than Andon, is the bottleneck.
+"""
+
+import json
+import zlib
+
+ENCODERS = ('orjson', 'ujson', 'json')
+
+
+def get_encoder(encoder=None):
+    """
+    Returns a function that serializes a request dict to UTF-8 JSON bytes.
+
+    Parameters
+    ----------
+    encoder : str or callable, optional
+        'orjson', 'ujson' or 'json' to pick an encoder by name, a callable
+        taking a dict and returning bytes, or None for the fastest installed
+        encoder
+
+    Raises
+    ------
+    ValueError
+        If the named encoder is unknown or not installed
+    """
+    if callable(encoder):
+        return encoder
+
+    if encoder is None:
+        for name in ENCODERS:
+            try:
+                return get_encoder(name)
+            except ValueError:
+                pass
+
+    if encoder == 'orjson':
+        try:
+            import orjson
+        except ImportError:
+            raise ValueError("orjson is not installed")
+        return orjson.dumps
+    elif encoder == 'ujson':
+        try:
+            import ujson
+        except ImportError:
+            raise ValueError("ujson is not installed")
+        return lambda request: ujson.dumps(request, ensure_ascii=False).encode('utf-8')
+    elif encoder == 'json':
+        return _encode_json
+
+    raise ValueError("Unknown JSON encoder: {}".format(encoder))
+
+
+def _encode_json(request):
+    return json.dumps(request, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compact(request):
+    """
+    A copy of a request without its null fields. Andon treats a missing
+    optional field the same as a null one.
+    """
+    return dict((key, value) for key, value in request.items() if value is not None)
+
+
+def gzip_body(body, level=6):
+    """
+    Compresses an encoded body in the gzip format expected with a
+    ``Content-Encoding: gzip`` header.
+    """
+    # wbits of 31 selects the gzip container; its header carries no
+    # timestamp, so equal bodies compress to equal bytes.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
@@ -0,0 +1,118 @@
+"""
+Compact in-memory form of queued ``report_data`` and ``update_station_status``
+calls. A reporter may hold hundreds of thousands of events while Andon is
+unreachable, so each event is a ``__slots__`` object rather than a dict, and
+its line, station, pass result and status color strings are interned, so
+events for the same station share one copy of each.
+"""
+
+import sys
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class ReportEvent(object):
+    """
+    A queued ``report_data`` call, along with the callback and deadline it
+    was queued with and the ``time.time()`` it was queued at.
+    """
+
+    __slots__ = ('line_name', 'station_name', 'pass_result', 'process_time_seconds',
+            'fail_reason', 'fail_notes', 'event_id', 'callback', 'deadline', 'queued_at')
+
+    method = 'report_data'
+    key = None
+
+    def __init__(self, line_name, station_name, pass_result, process_time_seconds,
+            fail_reason=None, fail_notes=None, event_id=None, callback=None,
+            deadline=None, queued_at=None):
+        self.line_name = _intern(line_name)
+        self.station_name = _intern(station_name)
+        self.pass_result = _intern(pass_result)
+        self.process_time_seconds = process_time_seconds
+        self.fail_reason = fail_reason
+        self.fail_notes = fail_notes
+        self.event_id = event_id
+        self.callback = callback
+        self.deadline = deadline
+        self.queued_at = queued_at
+
+    def send(self, client, deadline=None):
+        """
+        Makes the call on ``client``.
+        """
+        kwargs = {}
+        if deadline is not None:
+            kwargs['deadline'] = deadline
+        if self.event_id is not None:
+            kwargs['event_id'] = self.event_id
+        client.report_data(self.line_name, self.station_name, self.pass_result,
+                self.process_time_seconds, self.fail_reason, self.fail_notes, **kwargs)
+
+    def to_request(self, org_name):
+        """
+        The body ``AndonAppClient.report_data`` sends for this event.
+        """
+        return {
+            'orgName': org_name,
+            'lineName': self.line_name,
+            'stationName': self.station_name,
+            'passResult': self.pass_result,
+            'processTimeSeconds': self.process_time_seconds,
+            'failReason': self.fail_reason,
+            'failNotes': self.fail_notes
+        }
+
+
+class StatusEvent(object):
+    """
+    A queued ``update_station_status`` call, along with the callback and
+    deadline it was queued with and the ``time.time()`` it was queued at.
+    """
+
+    __slots__ = ('line_name', 'station_name', 'status_color', 'status_reason',
+            'status_notes', 'callback', 'deadline', 'queued_at')
+
+    method = 'update_station_status'
+
+    def __init__(self, line_name, station_name, status_color, status_reason=None,
+            status_notes=None, callback=None, deadline=None, queued_at=None):
+        self.line_name = _intern(line_name)
+        self.station_name = _intern(station_name)
+        self.status_color = _intern(status_color)
+        self.status_reason = status_reason
+        self.status_notes = status_notes
+        self.callback = callback
+        self.deadline = deadline
+        self.queued_at = queued_at
+
+    @property
+    def key(self):
+        """
+        The (line, station) the status is for.
+        """
+        return (self.line_name, self.station_name)
+
+    def send(self, client, deadline=None):
+        """
+        Makes the call on ``client``.
+        """
+        kwargs = {} if deadline is None else {'deadline': deadline}
+        client.update_station_status(self.line_name, self.station_name,
+                self.status_color, self.status_reason, self.status_notes, **kwargs)
+
+    def to_request(self, org_name):
+        """
+        The body ``AndonAppClient.update_station_status`` sends for this
+        event.
+        """
+        return {
+            'orgName': org_name,
+            'lineName': self.line_name,
+            'stationName': self.station_name,
+            'statusColor': self.status_color,
+            'statusReason': self.status_reason,
+            'statusNotes': self.status_notes
+        }
@@ -2,6 +2,13 @@
 Packages custom Andon exceptions.
 """
 
+import email.utils
+import time
+
+# Statuses with which a server asks the client to slow down or try again,
+# rather than rejecting the request itself.
+THROTTLED_STATUSES = (408, 429)
+
 class AndonAppException(Exception):
     """
     Generic catch-all exception when a request to Andon fails.
@@ -15,6 +22,57 @@ class AndonBadRequestException(AndonAppException):
     """
     pass
 
+class AndonHttpErrorException(AndonBadRequestException):
+    """
+    Exception when a request fails with a 4xx status that isn't Andon
+    rejecting the request itself, such as an error page from a proxy in front
+    of Andon or an unknown path. ``status_code`` is the response's status.
+    """
+
+    def __init__(self, message, status_code=None):
+        AndonBadRequestException.__init__(self, message)
+        self.status_code = status_code
+
+class AndonConnectionException(AndonAppException):
+    """
+    Exception when a request can't reach Andon, such as when the network is
+    down or the connection is dropped.
+    """
+    pass
+
+class AndonCircuitOpenException(AndonConnectionException):
+    """
+    Exception when a request isn't attempted because recent failures show that
+    Andon is down.
+    """
+    pass
+
+class AndonTimeoutException(AndonConnectionException):
+    """
+    Exception when Andon doesn't accept a connection or answer a request
+    within the client's timeouts.
+    """
+    pass
+
+class AndonThrottledException(AndonConnectionException):
+    """
+    Exception when Andon, or a proxy in front of it, asks the client to slow
+    down (429 Too Many Requests) or to send the request again (408 Request
+    Timeout). ``retry_after`` is the number of seconds the server asked the
+    client to wait, or None if it didn't say.
+    """
+
+    def __init__(self, message, retry_after=None):
+        AndonConnectionException.__init__(self, message)
+        self.retry_after = retry_after
+
+class AndonDeadlineExceededException(AndonTimeoutException):
+    """
+    Exception when a call's deadline passes before it completes, whether it
+    was queued, rate limited, backing off between retries or waiting on Andon.
+    """
+    pass
+
 class AndonInternalErrorException(AndonAppException):
     """
     Generic exception when a request to Andon fails because there's something
@@ -41,7 +99,14 @@ class AndonUnauthorizedRequestException(AndonAppException):
     """
     pass
 
-def raise_from_error_response(response):
+class AndonQueueFullException(AndonAppException):
+    """
+    Exception when an event can't be buffered because the reporter's queue is
+    full.
+    """
+    pass
+
+def raise_from_error_response(response, retry_after=None):
     if not response:
         return
 
@@ -68,7 +133,44 @@ def raise_from_error_response(response):
 
         if 401 == status:
             raise AndonUnauthorizedRequestException(message)
-        elif status >= 400 and status < 500:
+        elif status in THROTTLED_STATUSES:
+            raise AndonThrottledException(message, parse_retry_after(retry_after))
+        elif 400 == status:
             raise AndonBadRequestException(message)
+        elif status > 400 and status < 500:
+            raise AndonHttpErrorException(message, status)
         else:
             raise AndonInternalErrorException(message)
+
+def raise_from_status(status_code, message, retry_after=None):
+    """
+    Raises the exception matching the HTTP status of an error response that
+    doesn't say what went wrong, such as an HTML error page from a proxy or
+    load balancer in front of Andon. ``retry_after`` is the response's
+    Retry-After header, if any.
+    """
+    if 401 == status_code:
+        raise AndonUnauthorizedRequestException(message)
+    elif status_code in THROTTLED_STATUSES:
+        raise AndonThrottledException(message, parse_retry_after(retry_after))
+    elif status_code >= 400 and status_code < 500:
+        raise AndonHttpErrorException(message, status_code)
+    elif status_code >= 500:
+        raise AndonInternalErrorException(message)
+    else:
+        raise AndonAppException(message)
+
+def parse_retry_after(value):
+    """
+    Seconds to wait given a Retry-After header, which is either a number of
+    seconds or an HTTP date. Returns None if the header is missing or invalid.
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(parsed) - time.time())
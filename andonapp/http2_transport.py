@@ -0,0 +1,99 @@
+"""
+Transport multiplexing requests as HTTP/2 streams over a single connection per
+host, using ``httpx``. Requires the ``http2`` extra::
+
+    pip install andonapp[http2]
+
+HTTP/2 is negotiated with ALPN during the TLS handshake; servers and proxies
+that only speak HTTP/1.1 are talked to over pooled HTTP/1.1 connections
+instead.
+"""
+
+import threading
+
+import httpx
+# httpx only imports h2 once it connects; fail when the transport is created
+# instead.
+import h2
+
+from .exceptions import AndonConnectionException
+from .exceptions import AndonTimeoutException
+from .transport import Transport
+
+# Connection-specific headers are forbidden in HTTP/2; keep-alive is implied.
+_HOP_BY_HOP_HEADERS = frozenset(['connection', 'keep-alive'])
+
+
+class Http2Transport(Transport):
+    """
+    Sends requests through an ``httpx.Client`` with HTTP/2 enabled, so
+    concurrent calls from many threads share one connection instead of each
+    needing its own. ``keep_alive=False`` has no effect with this transport.
+
+    Parameters
+    ----------
+    pool_connections : int, optional
+        Unused; accepted for compatibility with the other transports
+    pool_maxsize : int, optional
+        Maximum number of idle connections kept open, which only matters
+        when a server falls back to HTTP/1.1
+    pool_block : bool, optional
+        If True, at most ``pool_maxsize`` connections are opened and callers
+        wait for one to become free
+    prior_knowledge : bool, optional
+        If True, HTTP/2 is spoken without negotiation, which allows it over
+        plain ``http://`` endpoints but rules out falling back to HTTP/1.1
+    verify : bool, str or ssl.SSLContext, optional
+        How server certificates are verified, as accepted by ``httpx``
+    """
+
+    def __init__(self, pool_connections=1, pool_maxsize=10, pool_block=False,
+            prior_knowledge=False, verify=True):
+        self._limits = httpx.Limits(
+                max_connections=pool_maxsize if pool_block else None,
+                max_keepalive_connections=pool_maxsize)
+        self._prior_knowledge = prior_knowledge
+        self._verify = verify
+        self._client = None
+        self._lock = threading.Lock()
+
+    def post(self, url, body, headers, timeout):
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        headers = dict((name, value) for name, value in headers.items()
+                if name.lower() not in _HOP_BY_HOP_HEADERS)
+        try:
+            return self.client.post(url, content=body, headers=headers,
+                    timeout=httpx.Timeout(connect=connect_timeout, read=read_timeout,
+                            write=read_timeout, pool=connect_timeout))
+        except httpx.TimeoutException as e:
+            raise AndonTimeoutException("Timed out talking to Andon: {}".format(
+                    str(e) or e.__class__.__name__))
+        except httpx.TransportError as e:
+            raise AndonConnectionException(str(e) or e.__class__.__name__)
+
+    @property
+    def client(self):
+        """
+        The ``httpx.Client`` in use, created on first access.
+        """
+        client = self._client
+        if client is not None:
+            return client
+
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(http1=not self._prior_knowledge,
+                        http2=True, limits=self._limits, verify=self._verify)
+            return self._client
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    def after_fork(self):
+        # The parent's connection is shared with it; abandon it rather than
+        # sending a GOAWAY on the parent's behalf.
+        self._lock = threading.Lock()
+        self._client = None
@@ -0,0 +1,232 @@
+"""
+Transport built only on the standard library's ``http.client``. It keeps
+persistent connections to each host like the ``requests`` transport, but
+imports in a fraction of the time, which matters for short-lived scripts that
+send a handful of events and exit.
+"""
+
+import collections
+import datetime
+import json
+import select
+import socket
+import threading
+import time
+
+try:
+    import http.client as httplib
+    from urllib.parse import urlsplit
+except ImportError:
+    import httplib
+    from urlparse import urlsplit
+
+from .exceptions import AndonConnectionException
+from .exceptions import AndonTimeoutException
+from .transport import Transport
+
+
+class Response(object):
+    """
+    A response read completely from Andon, with the parts of the
+    ``requests.Response`` interface the client uses. ``connect_time`` and
+    ``tls_time`` are the seconds spent opening the TCP connection and on the
+    TLS handshake, or None if the request reused a pooled connection.
+    """
+
+    __slots__ = ('status_code', 'content', 'headers', 'elapsed', 'connect_time',
+            'tls_time')
+
+    def __init__(self, status_code, content, headers, elapsed, connect_time=None,
+            tls_time=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.elapsed = elapsed
+        self.connect_time = connect_time
+        self.tls_time = tls_time
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class HttpTransport(Transport):
+    """
+    Sends requests over pooled ``http.client`` connections. An idle
+    connection that the server has closed is detected and replaced before a
+    request is written to it; a request is never resent once written, since
+    Andon may have processed it.
+
+    Parameters
+    ----------
+    pool_connections : int, optional
+        Number of per-host connection pools to cache
+    pool_maxsize : int, optional
+        Maximum number of idle connections kept open to a single host
+    pool_block : bool, optional
+        If True, callers wait for a free connection once ``pool_maxsize``
+        connections are in use instead of opening a throwaway one
+    """
+
+    def __init__(self, pool_connections=1, pool_maxsize=10, pool_block=False):
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._pools = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def post(self, url, body, headers, timeout):
+        parts = urlsplit(url)
+        path = parts.path + ('?' + parts.query if parts.query else '')
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+        pool = self._get_pool(parts.scheme, parts.hostname, parts.port)
+        connection = pool.get()
+        connect_time = tls_time = None
+        try:
+            if connection.sock is None:
+                connection.timeout = connect_timeout
+                connect_time, tls_time = pool.connect(connection)
+            connection.sock.settimeout(read_timeout)
+
+            started = time.perf_counter()
+            connection.request('POST', path, body, headers)
+            response = connection.getresponse()
+            elapsed = time.perf_counter() - started
+            content = response.read()
+        except socket.timeout as e:
+            pool.discard(connection)
+            raise AndonTimeoutException("Timed out talking to {}: {}".format(parts.netloc, e))
+        except (OSError, httplib.HTTPException) as e:
+            pool.discard(connection)
+            raise AndonConnectionException(str(e) or e.__class__.__name__)
+        except BaseException:
+            pool.discard(connection)
+            raise
+
+        if response.will_close or headers.get('Connection') == 'close':
+            pool.discard(connection)
+        else:
+            pool.put(connection)
+        return Response(response.status, content, response.msg,
+                datetime.timedelta(seconds=elapsed), connect_time, tls_time)
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = self._pools, collections.OrderedDict()
+        for pool in pools.values():
+            pool.close()
+
+    def after_fork(self):
+        # Drop the parent's connections without closing the sockets the
+        # parent is still using.
+        self._lock = threading.Lock()
+        self._pools = collections.OrderedDict()
+
+    def _get_pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        pool = self._pools.get(key)
+        if pool is not None:
+            return pool
+
+        evicted = []
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = _HostPool(scheme, host, port, self._pool_maxsize, self._pool_block)
+                self._pools[key] = pool
+                while len(self._pools) > max(1, self._pool_connections):
+                    evicted.append(self._pools.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return pool
+
+
+class _HostPool(object):
+    """
+    Connections to a single host.
+    """
+
+    def __init__(self, scheme, host, port, maxsize, block):
+        self._host = host
+        self._https = scheme == 'https'
+        self._port = port or (443 if self._https else 80)
+        self._context = None
+        self._maxsize = maxsize
+        self._slots = threading.BoundedSemaphore(maxsize) if block else None
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._slots is not None:
+            self._slots.acquire()
+
+        with self._lock:
+            while self._idle:
+                connection = self._idle.pop()
+                if not _is_dropped(connection.sock):
+                    return connection
+                connection.close()
+
+        if not self._https:
+            return httplib.HTTPConnection(self._host, self._port)
+        if self._context is None:
+            import ssl
+            self._context = ssl.create_default_context()
+        return httplib.HTTPSConnection(self._host, self._port, context=self._context)
+
+    def connect(self, connection):
+        """
+        Opens a new connection, returning the seconds spent on the TCP
+        connection and on the TLS handshake (None over plain HTTP).
+        """
+        started = time.perf_counter()
+        # The TCP half of ``HTTPSConnection.connect``; the handshake is done
+        # separately below so that it can be timed on its own.
+        httplib.HTTPConnection.connect(connection)
+        connect_time = time.perf_counter() - started
+        if not self._https:
+            return connect_time, None
+
+        started = time.perf_counter()
+        connection.sock = self._context.wrap_socket(connection.sock,
+                server_hostname=self._host)
+        return connect_time, time.perf_counter() - started
+
+    def put(self, connection):
+        with self._lock:
+            if len(self._idle) < self._maxsize:
+                self._idle.append(connection)
+                connection = None
+        if connection is not None:
+            connection.close()
+        if self._slots is not None:
+            self._slots.release()
+
+    def discard(self, connection):
+        connection.close()
+        if self._slots is not None:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def _is_dropped(sock):
+    # An idle connection has nothing to read unless the server closed it.
+    if sock is None:
+        return False
+    try:
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            return bool(poller.poll(0))
+        return bool(select.select([sock], [], [], 0)[0])
+    except (OSError, ValueError):
+        return True
@@ -0,0 +1,497 @@
+"""
+Streaming import of historical process results from CSV or NDJSON files, such
+as MES exports. Rows are read one at a time and sent in parallel through
+``report_data``, so files of any size are imported in constant memory.
+
+Progress is saved to a checkpoint file, so running the same import again after
+an interruption resumes after the last recorded row. Rows Andon rejects are
+appended to a rejects file, in the input format, together with the type and
+message of the exception they failed with; a rejects file can itself be
+imported once the problem is fixed. Any other failure, such as Andon being
+unreachable, stops the import at the row that failed.
+
+Example
+-------
+.. highlight:: python
+    result = import_file(client, 'results.csv',
+            columns={'station_name': 'Station', 'process_time_seconds': 'CycleTime'},
+            defaults={'line_name': 'line 1'})
+    print(result.imported, result.rejected)
+
+Or from a shell::
+
+    andonapp-import results.csv --column station_name=Station --default line_name='line 1'
+"""
+
+import argparse
+import collections
+import csv
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import sys
+import threading
+
+from .bulk import dispatch
+from .retry import is_rejected
+
+logger = logging.getLogger(__name__)
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+
+FIELDS = ('line_name', 'station_name', 'pass_result', 'process_time_seconds',
+        'fail_reason', 'fail_notes')
+REQUIRED_FIELDS = FIELDS[:4]
+
+ERROR_FIELD = 'import_error'
+ERROR_MESSAGE_FIELD = 'import_error_message'
+
+_EXTENSIONS = {
+    '.csv': CSV,
+    '.ndjson': NDJSON,
+    '.jsonl': NDJSON,
+    '.json': NDJSON,
+}
+
+
+class ImportResult(collections.namedtuple('ImportResult',
+        ['imported', 'rejected', 'offset'])):
+    """
+    Outcome of an import run.
+
+    Attributes
+    ----------
+    imported : int
+        Rows sent to Andon by this run
+    rejected : int
+        Rows written to the rejects file by this run
+    offset : int
+        Byte offset in the input up to which every row has been handled
+    """
+
+    __slots__ = ()
+
+
+def import_file(client, path, format=None, columns=None, defaults=None,
+        checkpoint=None, rejects=None, max_workers=4, checkpoint_interval=100):
+    """
+    Sends every row of a CSV or NDJSON file to Andon with ``report_data``.
+
+    Each ``report_data`` parameter is read from the column (or NDJSON key)
+    named in ``columns``, or otherwise from a column named like the parameter
+    itself, either ``process_time_seconds`` or ``processTimeSeconds``.
+    Parameters missing from a row are taken from ``defaults``. Other columns
+    are ignored.
+
+    Rows Andon rejects as bad, invalid or referring to an unknown station,
+    and rows that can't be parsed, are written to the rejects file. Any
+    other failure stops the import and is raised once the requests in
+    progress have completed; running the import again resumes at the row
+    that failed.
+
+    The checkpoint records the file's path and the offset of the last row up
+    to which every row has been sent or rejected. It is written every
+    ``checkpoint_interval`` rows and when the import stops, including when it
+    is interrupted or fails. Rows after the last checkpoint that were sent
+    before the import stopped are sent again on resume.
+
+    Parameters
+    ----------
+    client : AndonAppClient
+        Client used to send the rows
+    path : str
+        File to import
+    format : str, optional
+        'csv' or 'ndjson'; guessed from the file extension if None
+    columns : dict, optional
+        Maps ``report_data`` parameter names to column names
+    defaults : dict, optional
+        Values for parameters a row doesn't provide
+    checkpoint : str, optional
+        Checkpoint file; defaults to ``path`` + '.checkpoint'
+    rejects : str, optional
+        File rejected rows are appended to; defaults to ``path`` with
+        '.rejects' inserted before the extension
+    max_workers : int, optional
+        Maximum number of requests in progress at once
+    checkpoint_interval : int, optional
+        Rows handled between checkpoint writes
+
+    Returns
+    -------
+    ImportResult
+        Counts of rows imported and rejected by this run
+
+    Raises
+    ------
+    ValueError
+        If the format is unknown, or the file doesn't match the checkpoint
+    AndonAppException
+        If a row failed for a reason other than Andon rejecting it
+    """
+    importer = _Importer(client, path, format or _guess_format(path),
+            columns, defaults, checkpoint, rejects, checkpoint_interval)
+    return importer.run(max_workers)
+
+
+class _Entry(object):
+    __slots__ = ('offset', 'raw', 'kwargs', 'exception', 'done')
+
+    def __init__(self, offset, raw, kwargs=None, exception=None):
+        self.offset = offset
+        self.raw = raw
+        self.kwargs = kwargs
+        self.exception = exception
+        self.done = kwargs is None
+
+
+class _Importer(object):
+    def __init__(self, client, path, format, columns, defaults,
+            checkpoint, rejects, checkpoint_interval):
+        if format not in (CSV, NDJSON):
+            raise ValueError("Unknown import format: {}".format(format))
+
+        self.client = client
+        self.path = path
+        self.format = format
+        self.columns = dict(columns or {})
+        self.defaults = dict(defaults or {})
+        self.checkpoint = checkpoint or path + '.checkpoint'
+        base, extension = os.path.splitext(path)
+        self.rejects = rejects or base + '.rejects' + extension
+        self.checkpoint_interval = checkpoint_interval
+
+        self.imported = 0
+        self.rejected = 0
+        self._offset = 0
+        self._header = None
+        self._rejects_file = None
+        self._rejects_writer = None
+        self._failure = None
+
+        # Rows are committed strictly in input order; entries wait here
+        # until every row before them has completed.
+        self._entries = collections.deque()
+        self._lock = threading.Lock()
+
+    def run(self, max_workers):
+        self._offset = self._read_checkpoint()
+        uncheckpointed = 0
+
+        with open(self.path, 'rb') as f:
+            rows = self._read(f)
+            results = dispatch(self._send, ({'entry': entry} for entry in rows),
+                    max_workers)
+            try:
+                for _ in results:
+                    if self._failure is not None:
+                        break
+                    uncheckpointed += self._commit()
+                    if uncheckpointed >= self.checkpoint_interval:
+                        self._save_checkpoint()
+                        uncheckpointed = 0
+            finally:
+                # Closing the dispatch waits for requests still in progress,
+                # so their rows are committed before the final checkpoint.
+                results.close()
+                self._commit()
+                self._save_checkpoint()
+                if self._rejects_file is not None:
+                    self._rejects_file.close()
+
+        if self._failure is not None:
+            raise self._failure
+        return ImportResult(self.imported, self.rejected, self._offset)
+
+    def _send(self, entry):
+        if entry.done:
+            # Rejected while reading; passed through so it is committed and
+            # checkpointed in turn.
+            return
+        if self._failure is not None:
+            # Rows queued behind a failed one are left for the next run.
+            return
+        try:
+            self.client.report_data(**entry.kwargs)
+        except Exception as e:
+            if not is_rejected(e):
+                # Left undone, so neither this row nor any after it is
+                # committed and the checkpoint stays before it.
+                self._failure = e
+                return
+            entry.exception = e
+        entry.done = True
+
+    def _commit(self):
+        count = 0
+        while True:
+            with self._lock:
+                if not self._entries or not self._entries[0].done:
+                    return count
+                entry = self._entries.popleft()
+            if entry.exception is None:
+                self.imported += 1
+            else:
+                self.rejected += 1
+                self._reject(entry)
+            self._offset = entry.offset
+            count += 1
+
+    def _enqueue(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def _read(self, f):
+        if self.format == CSV:
+            return self._read_csv(f)
+        return self._read_ndjson(f)
+
+    def _read_csv(self, f):
+        position = [0]
+
+        def lines():
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                position[0] = f.tell()
+                yield line.decode('utf-8-sig' if position[0] == len(line) else 'utf-8')
+
+        reader = csv.reader(lines())
+        self._header = next(reader, None)
+        if self._header is None:
+            return
+        if self._offset:
+            f.seek(self._offset)
+        mapping = self._mapping(self._header)
+
+        for row in reader:
+            if not any(row):
+                continue
+            values = dict((name, row[index]) for name, index in mapping.items()
+                    if index < len(row) and row[index] != '')
+            entry = self._entry(position[0], row, values)
+            self._enqueue(entry)
+            yield entry
+
+    def _read_ndjson(self, f):
+        f.seek(self._offset)
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            text = line.decode('utf-8', 'replace').strip()
+            try:
+                obj = json.loads(text)
+                if not isinstance(obj, dict):
+                    raise ValueError("Expected a JSON object")
+            except ValueError as e:
+                entry = _Entry(f.tell(), text, exception=e)
+            else:
+                mapping = self._mapping(obj)
+                values = dict((name, obj[key]) for name, key in mapping.items()
+                        if obj[key] is not None and obj[key] != '')
+                entry = self._entry(f.tell(), obj, values)
+            self._enqueue(entry)
+            yield entry
+
+    def _mapping(self, names):
+        """
+        Maps each parameter to the index (CSV) or key (NDJSON) it is read from.
+        """
+        if isinstance(names, dict):
+            position = dict((name, name) for name in names)
+        else:
+            position = dict((name, index) for index, name in enumerate(names))
+
+        mapping = {}
+        for field in FIELDS:
+            for column in (self.columns.get(field), field, _camel_case(field)):
+                if column in position:
+                    mapping[field] = position[column]
+                    break
+        return mapping
+
+    def _entry(self, offset, raw, values):
+        kwargs = dict(self.defaults)
+        kwargs.update(values)
+        try:
+            missing = [field for field in REQUIRED_FIELDS if kwargs.get(field) is None]
+            if missing:
+                raise ValueError("Missing {}".format(', '.join(missing)))
+            kwargs['process_time_seconds'] = _parse_number(kwargs['process_time_seconds'])
+        except ValueError as e:
+            return _Entry(offset, raw, exception=e)
+        return _Entry(offset, raw, kwargs)
+
+    def _reject(self, entry):
+        error = entry.exception.__class__.__name__
+        message = str(entry.exception)
+        if self._rejects_file is None:
+            self._open_rejects()
+
+        if self.format == CSV:
+            self._rejects_writer.writerow(list(entry.raw) + [error, message])
+        else:
+            obj = dict(entry.raw) if isinstance(entry.raw, dict) else {'line': entry.raw}
+            obj[ERROR_FIELD] = error
+            obj[ERROR_MESSAGE_FIELD] = message
+            self._rejects_file.write(json.dumps(obj) + '\n')
+
+    def _open_rejects(self):
+        exists = os.path.exists(self.rejects) and os.path.getsize(self.rejects) > 0
+        self._rejects_file = io.open(self.rejects, 'a', encoding='utf-8', newline='')
+        if self.format == CSV:
+            self._rejects_writer = csv.writer(self._rejects_file)
+            if not exists:
+                self._rejects_writer.writerow(
+                        list(self._header) + [ERROR_FIELD, ERROR_MESSAGE_FIELD])
+
+    def _read_checkpoint(self):
+        if not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint) as f:
+            state = json.load(f)
+        offset = state['offset']
+        if state.get('path') != os.path.abspath(self.path):
+            raise ValueError("{} is the checkpoint of {}, not {}; remove it to import "
+                    "{} from the start".format(self.checkpoint, state.get('path'),
+                    self.path, self.path))
+        if offset > os.path.getsize(self.path) or state.get('digest') != self._digest(offset):
+            raise ValueError("{} has changed since it was checkpointed; remove {} to "
+                    "import it from the start".format(self.path, self.checkpoint))
+        return offset
+
+    def _digest(self, offset):
+        """
+        Hashes the bytes leading up to ``offset``, so that a file rewritten
+        since its checkpoint is told apart from one that was only appended to.
+        """
+        start = max(0, offset - 4096)
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+    def _save_checkpoint(self):
+        # Rejects must be on disk before the checkpoint moves past them.
+        if self._rejects_file is not None:
+            self._rejects_file.flush()
+            os.fsync(self._rejects_file.fileno())
+
+        temp = self.checkpoint + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'path': os.path.abspath(self.path), 'offset': self._offset,
+                    'digest': self._digest(self._offset)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        getattr(os, 'replace', os.rename)(temp, self.checkpoint)
+
+
+def main(argv=None):
+    """
+    Entry point of the ``andonapp-import`` command.
+    """
+    from .andon_client import AndonAppClient
+    from .exceptions import AndonAppException
+    from .retry import RetryPolicy
+
+    parser = argparse.ArgumentParser(prog='andonapp-import',
+            description='Import process results from a CSV or NDJSON file into Andon.')
+    parser.add_argument('path', help='CSV or NDJSON file to import')
+    parser.add_argument('--org-name', default=os.environ.get('ANDON_ORG_NAME'),
+            help='Andon organization name (default: $ANDON_ORG_NAME)')
+    parser.add_argument('--api-token', default=os.environ.get('ANDON_API_TOKEN'),
+            help='Andon API token (default: $ANDON_API_TOKEN)')
+    parser.add_argument('--endpoint', help='Andon API base URL')
+    parser.add_argument('--format', choices=(CSV, NDJSON),
+            help='Input format (default: from the file extension)')
+    parser.add_argument('--column', action='append', default=[], metavar='PARAM=COLUMN',
+            help='Read a report_data parameter from a differently named column')
+    parser.add_argument('--default', action='append', default=[], metavar='PARAM=VALUE',
+            help='Value for a parameter missing from a row')
+    parser.add_argument('--checkpoint', metavar='PATH',
+            help='Checkpoint file (default: PATH.checkpoint)')
+    parser.add_argument('--rejects', metavar='PATH',
+            help='File rejected rows are appended to (default: PATH with .rejects)')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--max-attempts', type=int, default=3,
+            help='Attempts per row before the import stops')
+    args = parser.parse_args(argv)
+
+    if not args.org_name or not args.api_token:
+        parser.error('--org-name and --api-token are required')
+    try:
+        columns = _parse_assignments(args.column)
+        defaults = _parse_assignments(args.default)
+        format = args.format or _guess_format(args.path)
+    except ValueError as e:
+        parser.error(str(e))
+
+    client = AndonAppClient(args.org_name, args.api_token,
+            pool_maxsize=args.workers,
+            retry_policy=RetryPolicy(max_attempts=args.max_attempts))
+    if args.endpoint:
+        client.endpoint = args.endpoint
+
+    with client:
+        try:
+            result = import_file(client, args.path, format=format,
+                    columns=columns, defaults=defaults, checkpoint=args.checkpoint,
+                    rejects=args.rejects, max_workers=args.workers)
+        except AndonAppException as e:
+            sys.stderr.write('Import stopped: {}; run again to resume\n'.format(e))
+            return 2
+
+    print('Imported {} rows, rejected {}'.format(result.imported, result.rejected))
+    return 1 if result.rejected else 0
+
+
+def _guess_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError("Can't tell the format of {}; pass format='csv' "
+                "or format='ndjson'".format(path))
+    return _EXTENSIONS[extension]
+
+
+def _parse_assignments(values):
+    assignments = {}
+    for value in values:
+        name, sep, setting = value.partition('=')
+        if not sep or name not in FIELDS:
+            raise ValueError("Expected PARAM=VALUE with PARAM one of {}, got {!r}"
+                    .format(', '.join(FIELDS), value))
+        assignments[name] = setting
+    return assignments
+
+
+def _camel_case(name):
+    first, rest = name.split('_', 1)
+    return first + ''.join(part.title() for part in rest.split('_'))
+
+
+def _parse_number(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if not isinstance(value, float):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            pass
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid process time: {!r}".format(value))
+    if math.isnan(value) or math.isinf(value):
+        raise ValueError("Invalid process time: {!r}".format(value))
+    return value
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+"""
+Request instrumentation for ``AndonAppClient``. Hooks registered on the client
+receive a ``RequestInfo`` before and after every request sent to Andon,
+including each retry. ``Metrics`` is a ready-made hook that keeps counters and
+latency histograms which can be exported in Prometheus text format, and
+``StatsdSink`` pushes the same measurements to a statsd-compatible UDP
+listener.
+
+Example
+-------
+.. highlight:: python
+    metrics = Metrics()
+    client = AndonAppClient('orgName', 'apiToken', metrics=metrics)
+    client.add_request_hooks(after=StatsdSink('127.0.0.1', 8125))
+    ...
+    print(metrics.to_prometheus())
+"""
+
+import bisect
+import os
+import socket
+import threading
+
+
+class RequestInfo(object):
+    """
+    Details of one request to Andon. Timings are in seconds; those the
+    transport can't measure are None.
+
+    Attributes
+    ----------
+    path : str
+        API path, such as '/data/report'
+    payload_size : int
+        Size of the encoded request body in bytes
+    wire_size : int
+        Size of the body as sent, after any compression, in bytes
+    request : dict
+        The request being sent; hooks must not modify it
+    status_code : int
+        HTTP status of the response, or None if there was none
+    elapsed : float
+        Total time spent on the request
+    connect_time : float
+        Time spent opening the TCP connection; None if a pooled connection
+        was reused, and measured only by the 'http' transport
+    tls_time : float
+        Time spent on the TLS handshake, measured like ``connect_time``
+    server_time : float
+        Time from sending the request until the response headers arrived
+    exception : type
+        Class of the exception the request raised, or None
+    """
+
+    __slots__ = ('path', 'payload_size', 'wire_size', 'request', 'status_code',
+            'elapsed', 'connect_time', 'tls_time', 'server_time', 'exception')
+
+    def __init__(self, path, payload_size, wire_size=None, request=None):
+        self.path = path
+        self.payload_size = payload_size
+        self.wire_size = payload_size if wire_size is None else wire_size
+        self.request = request
+        self.status_code = None
+        self.elapsed = None
+        self.connect_time = None
+        self.tls_time = None
+        self.server_time = None
+        self.exception = None
+
+    @property
+    def outcome(self):
+        """
+        'ok', or the name of the exception class.
+        """
+        return 'ok' if self.exception is None else self.exception.__name__
+
+
+class Histogram(object):
+    """
+    Cumulative histogram with fixed bucket upper bounds.
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            yield bound, total
+
+
+class Metrics(object):
+    """
+    Request counters and latency histograms, labelled by API path. Pass an
+    instance to ``AndonAppClient`` as ``metrics``, or register it as an
+    ``after`` hook.
+
+    Parameters
+    ----------
+    buckets : sequence of float, optional
+        Upper bounds in seconds of the latency histogram buckets
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._requests = {}
+        self._bytes = {}
+        self._wire_bytes = {}
+        self._latency = {}
+        self._queue_depth = {}
+        self._queue_wait = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def __call__(self, info):
+        self.observe(info)
+
+    def observe(self, info):
+        """
+        Records a completed request.
+        """
+        key = (info.path, info.outcome)
+        self._check_pid()
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._bytes[info.path] = self._bytes.get(info.path, 0) + info.payload_size
+            self._wire_bytes[info.path] = self._wire_bytes.get(info.path, 0) + info.wire_size
+            histogram = self._latency.get(info.path)
+            if histogram is None:
+                histogram = self._latency[info.path] = Histogram(self.buckets)
+            if info.elapsed is not None:
+                histogram.observe(info.elapsed)
+
+    def set_queue_depth(self, priority, depth):
+        """
+        Records the number of events of a priority waiting in a reporter.
+        """
+        self._check_pid()
+        with self._lock:
+            self._queue_depth[priority] = depth
+
+    def observe_queue_wait(self, priority, seconds):
+        """
+        Records how long an event of a priority waited in a reporter.
+        """
+        self._check_pid()
+        with self._lock:
+            histogram = self._queue_wait.get(priority)
+            if histogram is None:
+                histogram = self._queue_wait[priority] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def requests(self, path=None, outcome=None):
+        """
+        Number of requests, optionally only those to ``path`` or with the
+        given outcome ('ok' or an exception class name).
+        """
+        self._check_pid()
+        with self._lock:
+            return sum(count for (p, o), count in self._requests.items()
+                    if (path is None or p == path) and (outcome is None or o == outcome))
+
+    def to_prometheus(self, prefix='andon'):
+        """
+        Renders all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        self._check_pid()
+        with self._lock:
+            lines.append('# HELP {}_requests_total Requests sent to Andon.'.format(prefix))
+            lines.append('# TYPE {}_requests_total counter'.format(prefix))
+            for (path, outcome), count in sorted(self._requests.items()):
+                lines.append('{}_requests_total{{path="{}",outcome="{}"}} {}'.format(
+                        prefix, path, outcome, count))
+
+            lines.append('# HELP {}_request_bytes_total Request body bytes sent to Andon.'.format(prefix))
+            lines.append('# TYPE {}_request_bytes_total counter'.format(prefix))
+            for path, count in sorted(self._bytes.items()):
+                lines.append('{}_request_bytes_total{{path="{}"}} {}'.format(prefix, path, count))
+
+            lines.append('# HELP {}_request_wire_bytes_total Request body bytes sent to Andon '
+                    'after compression.'.format(prefix))
+            lines.append('# TYPE {}_request_wire_bytes_total counter'.format(prefix))
+            for path, count in sorted(self._wire_bytes.items()):
+                lines.append('{}_request_wire_bytes_total{{path="{}"}} {}'.format(prefix, path, count))
+
+            name = '{}_request_duration_seconds'.format(prefix)
+            lines.append('# HELP {} Time spent on requests to Andon.'.format(name))
+            lines.append('# TYPE {} histogram'.format(name))
+            for path, histogram in sorted(self._latency.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append('{}_bucket{{path="{}",le="{}"}} {}'.format(
+                            name, path, _format_bound(bound), count))
+                lines.append('{}_bucket{{path="{}",le="+Inf"}} {}'.format(
+                        name, path, histogram.count))
+                lines.append('{}_sum{{path="{}"}} {}'.format(name, path, histogram.sum))
+                lines.append('{}_count{{path="{}"}} {}'.format(name, path, histogram.count))
+
+            if self._queue_depth:
+                lines.append('# HELP {}_queue_depth Events waiting in reporters.'.format(prefix))
+                lines.append('# TYPE {}_queue_depth gauge'.format(prefix))
+                for priority, depth in sorted(self._queue_depth.items()):
+                    lines.append('{}_queue_depth{{priority="{}"}} {}'.format(
+                            prefix, priority, depth))
+
+            name = '{}_queue_wait_seconds'.format(prefix)
+            if self._queue_wait:
+                lines.append('# HELP {} Time events waited in reporters.'.format(name))
+                lines.append('# TYPE {} histogram'.format(name))
+            for priority, histogram in sorted(self._queue_wait.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append('{}_bucket{{priority="{}",le="{}"}} {}'.format(
+                            name, priority, _format_bound(bound), count))
+                lines.append('{}_bucket{{priority="{}",le="+Inf"}} {}'.format(
+                        name, priority, histogram.count))
+                lines.append('{}_sum{{priority="{}"}} {}'.format(name, priority, histogram.sum))
+                lines.append('{}_count{{priority="{}"}} {}'.format(name, priority, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+    def _check_pid(self):
+        # One Metrics is typically shared by every thread of a pre-fork
+        # server's workers; don't let a child inherit a held lock.
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+
+class StatsdSink(object):
+    """
+    Request hook that sends a counter, a timer and a payload size histogram
+    for every request to a statsd-compatible UDP listener. Send failures are
+    ignored.
+
+    Parameters
+    ----------
+    host : str, optional
+        Host of the statsd listener
+    port : int, optional
+        Port of the statsd listener
+    prefix : str, optional
+        Prefix of every metric name
+    """
+
+    def __init__(self, host='127.0.0.1', port=8125, prefix='andon'):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __call__(self, info):
+        name = info.path.strip('/').replace('/', '_')
+        lines = ['{}.requests.{}.{}:1|c'.format(self.prefix, name, info.outcome),
+                '{}.request_bytes.{}:{}|h'.format(self.prefix, name, info.payload_size)]
+        if info.elapsed is not None:
+            lines.append('{}.request_time.{}:{:.3f}|ms'.format(
+                    self.prefix, name, info.elapsed * 1000))
+        try:
+            self._socket.sendto('\n'.join(lines).encode('utf-8'), self.address)
+        except (OSError, socket.error):
+            pass
+
+    def close(self):
+        self._socket.close()
+
+
+def _format_bound(bound):
+    return repr(float(bound))
@@ -0,0 +1,395 @@
+"""
+Clients for several organizations, such as the plants an integration service
+reports for, sharing one set of connections and one set of sender threads.
+Queued events are sent in weighted fair order, so a backlog in one
+organization can't starve the others.
+
+Example
+-------
+.. highlight:: python
+    with OrgPool(workers=8, transport='http2') as pool:
+        plant_a = pool.add('Plant A', token_a, weight=2)
+        plant_b = pool.add('Plant B', token_b)
+
+        plant_a.report_data(line_name='line 1',
+                station_name='station 1',
+                pass_result='PASS',
+                process_time_seconds=120)
+        pool.get('Plant B').update_station_status(line_name='line 1',
+                station_name='station 4',
+                status_color='RED')
+
+        print(pool.to_prometheus())
+"""
+
+import collections
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from .andon_client import AndonAppClient
+from .deadline import as_deadline
+from .events import ReportEvent
+from .events import StatusEvent
+from .ring_buffer import RingBuffer
+from .transport import Transport
+from .transport import get_transport
+from .work_queue import BLOCK
+from .work_queue import WorkQueue
+
+
+class OrgPool(WorkQueue):
+    """
+    Hands out an ``OrgClient`` per organization. Every organization's client
+    sends through the same transport, so connections to Andon are shared, and
+    calls are queued per organization and sent by one shared set of worker
+    threads.
+
+    Whenever several organizations have events waiting, each gets a share of
+    the sends proportional to its ``weight`` (self-clocked weighted fair
+    queuing). Each organization's events are still sent in the order they
+    were queued, and an organization that has been idle starts with no credit
+    saved up.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of threads sending events for all organizations
+    max_queue_size : int, optional
+        Maximum number of events waiting per organization
+    when_full : str, optional
+        What to do when an organization's queue is full -- 'block',
+        'drop_oldest' or 'raise', as for ``BufferedReporter``
+    transport : str or Transport, optional
+        Transport shared by every organization, as for ``AndonAppClient``
+    pool_connections : int, optional
+        Number of per-host connection pools to cache
+    pool_maxsize : int, optional
+        Maximum number of connections kept open to a single host
+    pool_block : bool, optional
+        If True, senders wait for a free connection once ``pool_maxsize``
+        connections are in use
+    client_options
+        Other ``AndonAppClient`` options used for every organization. Options
+        holding per-organization state, such as ``spool``, ``status_cache``,
+        ``dedup`` or ``circuit_breaker``, should be given to ``add`` instead.
+    """
+
+    DEFAULT_WORKERS = 4
+    DEFAULT_MAX_QUEUE_SIZE = 1000
+
+    THREAD_NAME = 'andon-org-pool'
+    NAME = 'Pool'
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+            when_full=BLOCK, transport=None,
+            pool_connections=AndonAppClient.DEFAULT_POOL_CONNECTIONS,
+            pool_maxsize=AndonAppClient.DEFAULT_POOL_MAXSIZE,
+            pool_block=False, **client_options):
+        self._orgs = collections.OrderedDict()
+        WorkQueue.__init__(self, max_queue_size, workers, when_full)
+
+        self._transport = _SharedTransport(get_transport(transport,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block))
+        self._client_options = client_options
+
+    def __contains__(self, org_name):
+        return org_name in self._orgs
+
+    def __len__(self):
+        return len(self._orgs)
+
+    def add(self, org_name, api_token, weight=1, **client_options):
+        """
+        Creates the client for an organization.
+
+        Parameters
+        ----------
+        org_name : str
+            Organization name within Andon
+        api_token : str
+            The organization's API token
+        weight : float, optional
+            Share of the sends the organization gets relative to others with
+            events waiting
+        client_options
+            ``AndonAppClient`` options for this organization only, overriding
+            the pool's
+
+        Returns
+        -------
+        OrgClient
+            The organization's client
+
+        Raises
+        ------
+        ValueError
+            If the organization was already added or the weight isn't
+            positive
+        """
+        if weight <= 0:
+            raise ValueError("Weight must be positive: {}".format(weight))
+
+        options = dict(self._client_options)
+        options.update(client_options)
+        options['transport'] = self._transport
+        endpoint = options.pop('endpoint', None)
+        client = AndonAppClient(org_name, api_token, **options)
+        if endpoint is not None:
+            client.endpoint = endpoint
+
+        with self._lock:
+            if org_name in self._orgs:
+                raise ValueError("Organization already added: {}".format(org_name))
+            org = self._orgs[org_name] = OrgClient(self, org_name, client, weight)
+        return org
+
+    def get(self, org_name):
+        """
+        The client of an added organization.
+
+        Raises
+        ------
+        KeyError
+            If the organization hasn't been added
+        """
+        return self._orgs[org_name]
+
+    def stats(self):
+        """
+        Per organization, keyed by name: events waiting ('queued'), sent,
+        failed and dropped, failures by exception class name ('errors'), total
+        seconds spent sending ('send_time'), and events sent per second since
+        the organization was added ('throughput').
+        """
+        with self._lock:
+            return dict((name, org._stats()) for name, org in self._orgs.items())
+
+    def to_prometheus(self, prefix='andon'):
+        """
+        Renders per-organization counters in the Prometheus text exposition
+        format.
+        """
+        stats = self.stats()
+        lines = ['# HELP {}_org_events_total Events completed per organization.'.format(prefix),
+                '# TYPE {}_org_events_total counter'.format(prefix)]
+        for name, org in sorted(stats.items()):
+            lines.append('{}_org_events_total{{org="{}",outcome="ok"}} {}'.format(
+                    prefix, _escape(name), org['sent']))
+            for error, count in sorted(org['errors'].items()):
+                lines.append('{}_org_events_total{{org="{}",outcome="{}"}} {}'.format(
+                        prefix, _escape(name), error, count))
+            if org['dropped']:
+                lines.append('{}_org_events_total{{org="{}",outcome="dropped"}} {}'.format(
+                        prefix, _escape(name), org['dropped']))
+
+        lines.append('# HELP {}_org_queue_depth Events waiting per organization.'.format(prefix))
+        lines.append('# TYPE {}_org_queue_depth gauge'.format(prefix))
+        for name, org in sorted(stats.items()):
+            lines.append('{}_org_queue_depth{{org="{}"}} {}'.format(
+                    prefix, _escape(name), org['queued']))
+
+        lines.append('# HELP {}_org_send_seconds_total Time spent sending per organization.'.format(prefix))
+        lines.append('# TYPE {}_org_send_seconds_total counter'.format(prefix))
+        for name, org in sorted(stats.items()):
+            lines.append('{}_org_send_seconds_total{{org="{}"}} {}'.format(
+                    prefix, _escape(name), org['send_time']))
+        return '\n'.join(lines) + '\n'
+
+    def close(self, timeout=None):
+        """
+        Stops accepting events, sends everything still queued, stops the
+        worker threads and closes the shared connections.
+
+        Returns
+        -------
+        bool
+            False if the timeout expired before the queues drained
+        """
+        drained = WorkQueue.close(self, timeout)
+        for org in list(self._orgs.values()):
+            org.client.close()
+        self._transport.close_shared()
+        return drained
+
+    def _reset(self):
+        self._ready = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        for org in self._orgs.values():
+            org._reset()
+
+    def _is_full(self, org):
+        return len(org._queue) >= self._max_queue_size
+
+    def _queue_name(self, org):
+        return 'Queue of {}'.format(org.org_name)
+
+    def _drop_oldest(self, org):
+        # The organization keeps its place in the schedule; its next event
+        # simply inherits the dropped one's turn.
+        org._dropped += 1
+        return org._queue.popleft()[1]
+
+    def _enqueue(self, event, org):
+        # An organization's events finish 1/weight apart, starting no earlier
+        # than the tag of the event sent last.
+        tag = max(self._virtual_time, org._last_tag) + 1.0 / org.weight
+        org._last_tag = tag
+        org._queue.append((tag, event))
+        if not org._scheduled:
+            heapq.heappush(self._ready, (tag, next(self._sequence), org))
+            org._scheduled = True
+
+    def _has_waiting(self):
+        return bool(self._ready)
+
+    def _dequeue(self):
+        # Each organization with events waiting has one entry, for its oldest
+        # event.
+        org = heapq.heappop(self._ready)[2]
+        tag, event = org._queue.popleft()
+        if org._queue:
+            heapq.heappush(self._ready, (org._queue[0][0], next(self._sequence), org))
+        else:
+            org._scheduled = False
+        self._virtual_time = max(self._virtual_time, tag)
+        return org, event
+
+    def _send(self, org, event):
+        event.send(org.client, event.deadline)
+
+    def _record(self, org, error, elapsed):
+        org._record(error, elapsed)
+
+
+class OrgClient(object):
+    """
+    One organization's handle on an ``OrgPool``. Calls are queued and return
+    immediately; they accept the same ``callback`` and ``deadline`` as
+    ``BufferedReporter`` calls. ``client`` is the organization's
+    ``AndonAppClient``, for calls that should be sent synchronously over the
+    shared connections.
+    """
+
+    def __init__(self, pool, org_name, client, weight):
+        self.org_name = org_name
+        self.client = client
+        self.weight = weight
+        self._pool = pool
+        self._added = time.time()
+        self._reset()
+        self._sent = 0
+        self._failed = 0
+        self._dropped = 0
+        self._errors = {}
+        self._send_time = 0.0
+
+    def report_data(self, line_name, station_name,
+            pass_result, process_time_seconds,
+            fail_reason=None, fail_notes=None, callback=None, deadline=None,
+            event_id=None):
+        """
+        Queues a ``report_data`` call. See ``AndonAppClient.report_data``.
+
+        Raises
+        ------
+        AndonQueueFullException
+            If the organization's queue is full and the policy is 'raise'
+        AndonDeadlineExceededException
+            If the policy is 'block' and the deadline passes before there is
+            room in the queue
+        """
+        self._pool._put(ReportEvent(line_name, station_name, pass_result,
+                process_time_seconds, fail_reason, fail_notes, event_id, callback,
+                as_deadline(deadline)), self)
+
+    def update_station_status(self, line_name, station_name,
+            status_color, status_reason=None, status_notes=None, callback=None,
+            deadline=None):
+        """
+        Queues an ``update_station_status`` call. See
+        ``AndonAppClient.update_station_status``.
+
+        Raises
+        ------
+        AndonQueueFullException
+            If the organization's queue is full and the policy is 'raise'
+        AndonDeadlineExceededException
+            If the policy is 'block' and the deadline passes before there is
+            room in the queue
+        """
+        self._pool._put(StatusEvent(line_name, station_name, status_color,
+                status_reason, status_notes, callback, as_deadline(deadline)), self)
+
+    def stats(self):
+        """
+        This organization's entry of ``OrgPool.stats()``.
+        """
+        with self._pool._lock:
+            return self._stats()
+
+    def _reset(self):
+        self._queue = RingBuffer(self._pool._max_queue_size)
+        self._scheduled = False
+        self._last_tag = 0.0
+
+    def _record(self, error, elapsed):
+        self._send_time += elapsed
+        if error is None:
+            self._sent += 1
+            return
+        self._failed += 1
+        name = error.__class__.__name__
+        self._errors[name] = self._errors.get(name, 0) + 1
+
+    def _stats(self):
+        return {
+            'queued': len(self._queue),
+            'sent': self._sent,
+            'failed': self._failed,
+            'dropped': self._dropped,
+            'errors': dict(self._errors),
+            'send_time': self._send_time,
+            'throughput': self._sent / max(time.time() - self._added, 1e-9)
+        }
+
+
+class _SharedTransport(Transport):
+    """
+    Hands one transport to many clients. Closing a client leaves the shared
+    connections open, and only the first client to notice a fork resets the
+    transport, so it doesn't discard connections another client has just
+    opened in the child.
+    """
+
+    def __init__(self, transport):
+        self._transport = transport
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def post(self, url, body, headers, timeout):
+        return self._transport.post(url, body, headers, timeout)
+
+    def close(self):
+        pass
+
+    def close_shared(self):
+        self._transport.close()
+
+    def after_fork(self):
+        if self._pid == os.getpid():
+            return
+        # Only ever taken in a child, so it can't have been inherited held.
+        with self._lock:
+            if self._pid != os.getpid():
+                self._transport.after_fork()
+                self._pid = os.getpid()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
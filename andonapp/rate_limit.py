@@ -0,0 +1,190 @@
+"""
+Token-bucket rate limiting for requests to Andon. Requests over the limit are
+delayed rather than failed, smoothing bursts such as a whole line restarting
+at once.
+
+Example
+-------
+.. highlight:: python
+    limiter = RateLimiter(rate=20, burst=40, per_station_rate=2)
+    client = AndonAppClient('orgName', 'apiToken', rate_limiter=limiter)
+"""
+
+import os
+import threading
+import time
+
+from .exceptions import AndonDeadlineExceededException
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket holding up to ``burst`` tokens and refilled at
+    ``rate`` tokens per second. Callers reserve a token and are told how long
+    to wait for it, so waiting callers are served in arrival order.
+
+    Parameters
+    ----------
+    rate : float
+        Tokens added per second
+    burst : float, optional
+        Bucket capacity; defaults to ``rate``, and is at least one token
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst if burst is not None else rate))
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def reserve(self, now=None):
+        """
+        Takes a token and returns the seconds until it is available.
+        """
+        self._check_pid()
+        with self._lock:
+            if now is None:
+                now = time.time()
+            elapsed = max(0.0, now - self._updated)
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def cancel(self):
+        """
+        Returns a reserved token that won't be used.
+        """
+        self._check_pid()
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def _check_pid(self):
+        # Limiters are often created before a pre-fork server forks; a lock
+        # some thread held at that moment would never be released in the
+        # child.
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+
+class RateLimiter(object):
+    """
+    Limits requests globally, per line and per station, delaying each request
+    until every applicable bucket has a token. One limiter may be shared by
+    any number of threads and clients.
+
+    Parameters
+    ----------
+    rate : float, optional
+        Requests per second across all stations; unlimited if None
+    burst : float, optional
+        Requests allowed in a burst across all stations
+    per_line_rate : float, optional
+        Requests per second for each line; unlimited if None
+    per_line_burst : float, optional
+        Requests allowed in a burst for each line
+    per_station_rate : float, optional
+        Requests per second for each station; unlimited if None
+    per_station_burst : float, optional
+        Requests allowed in a burst for each station
+    """
+
+    def __init__(self, rate=None, burst=None,
+            per_line_rate=None, per_line_burst=None,
+            per_station_rate=None, per_station_burst=None):
+        self._global = TokenBucket(rate, burst) if rate else None
+        self._per_line = (per_line_rate, per_line_burst)
+        self._per_station = (per_station_rate, per_station_burst)
+        self._line_buckets = {}
+        self._station_buckets = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+        self.delayed = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+
+    def reserve(self, line_name, station_name):
+        """
+        Reserves a request slot and returns the seconds to wait for it,
+        without waiting.
+        """
+        return self._reserve(line_name, station_name, None)[0]
+
+    def acquire(self, line_name, station_name, timeout=None):
+        """
+        Waits until a request for the station may be sent.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Longest acceptable wait; if the slot is further away it is given
+            back and ``AndonDeadlineExceededException`` is raised at once
+
+        Returns
+        -------
+        float
+            Seconds spent waiting
+        """
+        delay, buckets = self._reserve(line_name, station_name, timeout)
+        if timeout is not None and delay > timeout:
+            for bucket in buckets:
+                bucket.cancel()
+            raise AndonDeadlineExceededException(
+                    "Rate limited for {:.3f}s, past the deadline".format(delay))
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def _reserve(self, line_name, station_name, timeout):
+        self._check_pid()
+        now = time.time()
+        delay = 0.0
+        buckets = []
+        if self._global is not None:
+            buckets.append(self._global)
+        if self._per_line[0]:
+            buckets.append(self._bucket(self._line_buckets, line_name, self._per_line))
+        if self._per_station[0]:
+            buckets.append(self._bucket(self._station_buckets,
+                    (line_name, station_name), self._per_station))
+        for bucket in buckets:
+            delay = max(delay, bucket.reserve(now))
+
+        if delay and (timeout is None or delay <= timeout):
+            with self._lock:
+                self.delayed += 1
+                self.total_delay += delay
+                self.max_delay = max(self.max_delay, delay)
+        return delay, buckets
+
+    def stats(self):
+        """
+        Number of delayed requests and the total and longest delay in seconds.
+        """
+        self._check_pid()
+        with self._lock:
+            return {
+                'delayed': self.delayed,
+                'total_delay': self.total_delay,
+                'max_delay': self.max_delay
+            }
+
+    def _bucket(self, buckets, key, settings):
+        bucket = buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = TokenBucket(*settings)
+        return bucket
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
@@ -0,0 +1,233 @@
+"""
+Buffered, non-blocking reporting on top of ``AndonAppClient``. Calls return as
+soon as the event is queued, and a pool of background threads sends them.
+
+Example
+-------
+.. highlight:: python
+    with client.reporter(workers=2) as reporter:
+        reporter.report_data(line_name='line 1',
+                station_name='station 1',
+                pass_result='PASS',
+                process_time_seconds=120)
+"""
+
+import time
+
+from .deadline import as_deadline
+from .events import ReportEvent
+from .events import StatusEvent
+from .ring_buffer import RingBuffer
+# The when_full policies are imported from here by existing code.
+from .work_queue import BLOCK, DROP_OLDEST, RAISE
+from .work_queue import WorkQueue
+
+ALARM = 'alarm'
+STATUS = 'status'
+REPORT = 'report'
+PRIORITIES = (ALARM, STATUS, REPORT)
+
+ALARM_COLORS = ('RED', 'YELLOW')
+
+
+class BufferedReporter(WorkQueue):
+    """
+    Queues ``report_data`` and ``update_station_status`` calls in a bounded
+    in-memory buffer that is drained by background worker threads, so the
+    caller never waits on Andon.
+
+    Each call accepts an optional ``callback`` that is invoked from a worker
+    thread once the event completes. It receives None on success, or the
+    exception raised while sending. Events dropped from a full buffer complete
+    with an ``AndonQueueFullException``. Exceptions raised by callbacks are
+    logged and otherwise ignored.
+
+    Each call also accepts an optional ``deadline``, in seconds, covering the
+    time the event spends waiting for room in the buffer, waiting in it, and
+    being sent. Events still queued when their deadline passes complete with
+    an ``AndonDeadlineExceededException`` without being sent, and what is left
+    of the deadline is passed on to the client.
+
+    Events are sent by priority: RED and YELLOW status updates ('alarm')
+    first, then other status updates ('status'), then ``report_data`` calls
+    ('report'), so an alarm doesn't wait behind a backlog of reports. Status
+    updates for a station are still sent in the order they were made. To
+    keep lower priorities from starving, an event that has waited longer
+    than ``max_starvation`` seconds is sent before newer higher-priority ones,
+    and a full buffer drops the oldest event of the lowest priority first.
+
+    If the process forks, the child starts with an empty buffer and its own
+    worker threads the first time it queues an event; events queued before the
+    fork are sent only by the parent.
+
+    Parameters
+    ----------
+    client : AndonAppClient
+        Client used to send the events
+    max_queue_size : int, optional
+        Maximum number of events waiting to be sent
+    workers : int, optional
+        Number of background threads sending events
+    when_full : str, optional
+        What to do when the buffer is full -- 'block' waits for room,
+        'drop_oldest' discards the oldest waiting event, and 'raise' raises an
+        ``AndonQueueFullException``
+    callback : callable, optional
+        Default completion callback for events queued without one
+    max_starvation : float, optional
+        Seconds an event may wait before it is sent ahead of higher-priority
+        events
+    metrics : Metrics, optional
+        Receives per-priority queue depths and wait times; defaults to the
+        client's ``metrics``
+    preallocate : bool, optional
+        If True, room for ``max_queue_size`` events of each priority is
+        allocated up front instead of as the buffer fills
+    """
+
+    DEFAULT_MAX_QUEUE_SIZE = 1000
+    DEFAULT_WORKERS = 1
+    DEFAULT_MAX_STARVATION = 5.0
+
+    THREAD_NAME = 'andon-reporter'
+    NAME = 'Reporter'
+
+    def __init__(self, client, max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+            workers=DEFAULT_WORKERS, when_full=BLOCK, callback=None,
+            max_starvation=DEFAULT_MAX_STARVATION, metrics=None, preallocate=False):
+        self._client = client
+        self._callback = callback
+        self._max_starvation = max_starvation
+        self._metrics = metrics if metrics is not None else getattr(client, 'metrics', None)
+        self._preallocate = preallocate
+        WorkQueue.__init__(self, max_queue_size, workers, when_full)
+
+    def report_data(self, line_name, station_name,
+            pass_result, process_time_seconds,
+            fail_reason=None, fail_notes=None, callback=None, deadline=None,
+            event_id=None):
+        """
+        Queues a ``report_data`` call. See ``AndonAppClient.report_data``.
+
+        Raises
+        ------
+        AndonQueueFullException
+            If the buffer is full and the policy is 'raise'
+        AndonDeadlineExceededException
+            If the policy is 'block' and the deadline passes before there is
+            room in the buffer
+        """
+        self._put(ReportEvent(line_name, station_name, pass_result,
+                process_time_seconds, fail_reason, fail_notes, event_id,
+                callback or self._callback, as_deadline(deadline)))
+
+    def update_station_status(self, line_name, station_name,
+            status_color, status_reason=None, status_notes=None, callback=None,
+            deadline=None):
+        """
+        Queues an ``update_station_status`` call. See
+        ``AndonAppClient.update_station_status``.
+
+        Raises
+        ------
+        AndonQueueFullException
+            If the buffer is full and the policy is 'raise'
+        AndonDeadlineExceededException
+            If the policy is 'block' and the deadline passes before there is
+            room in the buffer
+        """
+        self._put(StatusEvent(line_name, station_name, status_color,
+                status_reason, status_notes, callback or self._callback,
+                as_deadline(deadline)))
+
+    @property
+    def queue_size(self):
+        """
+        Number of events waiting to be sent.
+        """
+        with self._lock:
+            return self._size
+
+    def stats(self):
+        """
+        For each priority, the number of events waiting, the number taken
+        off the queue so far, and the total and longest time they waited in
+        seconds.
+        """
+        with self._lock:
+            return dict((priority, {
+                'depth': len(self._queues[priority]),
+                'dispatched': self._dispatched[priority],
+                'wait_total': self._wait_total[priority],
+                'wait_max': self._wait_max[priority]
+            }) for priority in PRIORITIES)
+
+    def _reset(self):
+        self._queues = dict((priority, RingBuffer(self._max_queue_size, self._preallocate))
+                for priority in PRIORITIES)
+        self._size = 0
+        self._queued_statuses = {}
+        self._dispatched = dict.fromkeys(PRIORITIES, 0)
+        self._wait_total = dict.fromkeys(PRIORITIES, 0.0)
+        self._wait_max = dict.fromkeys(PRIORITIES, 0.0)
+
+    def _is_full(self, target):
+        return self._size >= self._max_queue_size
+
+    def _drop_oldest(self, target):
+        return self._pop(next(p for p in reversed(PRIORITIES) if self._queues[p]))
+
+    def _enqueue(self, event, target):
+        key = event.key
+        if key is None:
+            priority = REPORT
+        elif event.status_color in ALARM_COLORS and not self._queued_statuses.get(key):
+            priority = ALARM
+        else:
+            # Behind an earlier update for the station, so they stay in order.
+            priority = STATUS
+            self._queued_statuses[key] = self._queued_statuses.get(key, 0) + 1
+
+        event.queued_at = time.time()
+        self._queues[priority].append(event)
+        self._size += 1
+        if self._metrics is not None:
+            self._metrics.set_queue_depth(priority, len(self._queues[priority]))
+
+    def _has_waiting(self):
+        return self._size > 0
+
+    def _dequeue(self):
+        now = time.time()
+        priority = self._next_priority(now)
+        event = self._pop(priority)
+
+        wait = now - event.queued_at
+        self._dispatched[priority] += 1
+        self._wait_total[priority] += wait
+        self._wait_max[priority] = max(self._wait_max[priority], wait)
+        if self._metrics is not None:
+            self._metrics.observe_queue_wait(priority, wait)
+        return priority, event
+
+    def _send(self, priority, event):
+        event.send(self._client, event.deadline)
+
+    def _next_priority(self, now):
+        waiting = [priority for priority in PRIORITIES if self._queues[priority]]
+        oldest = min(waiting, key=lambda priority: self._queues[priority][0].queued_at)
+        if now - self._queues[oldest][0].queued_at > self._max_starvation:
+            return oldest
+        return waiting[0]
+
+    def _pop(self, priority):
+        event = self._queues[priority].popleft()
+        self._size -= 1
+        if priority == STATUS:
+            key = event.key
+            self._queued_statuses[key] -= 1
+            if not self._queued_statuses[key]:
+                del self._queued_statuses[key]
+        if self._metrics is not None:
+            self._metrics.set_queue_depth(priority, len(self._queues[priority]))
+        return event
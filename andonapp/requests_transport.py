@@ -0,0 +1,79 @@
+"""
+Transport sending requests through a pooled ``requests`` session.
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .exceptions import AndonConnectionException
+from .exceptions import AndonTimeoutException
+from .transport import Transport
+
+
+class RequestsTransport(Transport):
+    """
+    Sends requests over a ``requests.Session`` whose ``HTTPAdapter`` keeps a
+    pool of keep-alive connections.
+
+    Parameters
+    ----------
+    pool_connections : int, optional
+        Number of per-host connection pools to cache
+    pool_maxsize : int, optional
+        Maximum number of connections kept open to a single host
+    pool_block : bool, optional
+        If True, callers wait for a free connection once ``pool_maxsize``
+        connections are in use instead of opening a throwaway one
+    """
+
+    def __init__(self, pool_connections=1, pool_maxsize=10, pool_block=False):
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._session = None
+        self._lock = threading.Lock()
+
+    def post(self, url, body, headers, timeout):
+        try:
+            return self.session.post(url, data=body, headers=headers, timeout=timeout)
+        except requests.exceptions.Timeout as e:
+            raise AndonTimeoutException(str(e))
+        except requests.exceptions.ConnectionError as e:
+            raise AndonConnectionException(str(e))
+
+    @property
+    def session(self):
+        """
+        The ``requests.Session`` in use, created on first access.
+        """
+        session = self._session
+        if session is not None:
+            return session
+
+        with self._lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def close(self):
+        with self._lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+    def after_fork(self):
+        # The parent's connections and lock are unusable here; drop them
+        # without closing the sockets the parent is still using.
+        self._lock = threading.Lock()
+        self._session = None
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self._pool_connections,
+                pool_maxsize=self._pool_maxsize,
+                pool_block=self._pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
@@ -0,0 +1,268 @@
+"""
+Retry policies and circuit breaking for requests to Andon. Failures are
+classified by exception type: connection failures, throttling and Andon
+internal errors are retried, while requests Andon rejects are raised
+immediately.
+
+Example
+-------
+.. highlight:: python
+    client = AndonAppClient('orgName', 'apiToken',
+            retry_policy=RetryPolicy(max_attempts=5),
+            circuit_breaker=CircuitBreaker(failure_threshold=10))
+"""
+
+import os
+import random
+import threading
+import time
+
+from .exceptions import AndonBadRequestException
+from .exceptions import AndonCircuitOpenException
+from .exceptions import AndonConnectionException
+from .exceptions import AndonDeadlineExceededException
+from .exceptions import AndonHttpErrorException
+from .exceptions import AndonInternalErrorException
+from .exceptions import AndonInvalidRequestException
+from .exceptions import AndonResourceNotFoundException
+from .exceptions import AndonThrottledException
+
+RETRYABLE_EXCEPTIONS = (AndonConnectionException, AndonInternalErrorException)
+
+# Failures with which Andon rejects a request itself, so sending it again can
+# never succeed.
+REJECTED_EXCEPTIONS = (AndonBadRequestException, AndonInvalidRequestException,
+        AndonResourceNotFoundException)
+
+
+# Raised by the client itself, without a request reaching Andon.
+_LOCAL_EXCEPTIONS = (AndonCircuitOpenException, AndonDeadlineExceededException)
+
+
+def is_retryable(exception):
+    """
+    Whether a failed request may succeed if sent again.
+    """
+    return (isinstance(exception, RETRYABLE_EXCEPTIONS)
+            and not isinstance(exception, _LOCAL_EXCEPTIONS))
+
+
+def is_rejected(exception):
+    """
+    Whether Andon rejected a request outright, as opposed to a failure that
+    may clear up, such as throttling, an outage, a revoked token or a 4xx
+    error page from a proxy.
+    """
+    return (isinstance(exception, REJECTED_EXCEPTIONS)
+            and not isinstance(exception, AndonHttpErrorException))
+
+
+class RetryBudget(object):
+    """
+    Caps retries to a fraction of overall traffic so that retries can't
+    multiply the load on a struggling server. Every request deposits ``ratio``
+    tokens, up to ``max_tokens``, and every retry spends one.
+
+    Parameters
+    ----------
+    ratio : float, optional
+        Retries allowed per request in the long run
+    max_tokens : float, optional
+        Retries that may be spent in a burst
+    """
+
+    def __init__(self, ratio=0.2, max_tokens=10):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = float(max_tokens)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+    def deposit(self):
+        self._check_pid()
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self):
+        self._check_pid()
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _check_pid(self):
+        # A lock held by another thread when the process forked stays locked
+        # in the child forever; the child starts over with a new one.
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+
+class RetryPolicy(object):
+    """
+    Retries failed requests with exponential backoff.
+
+    Parameters
+    ----------
+    max_attempts : int, optional
+        Total attempts per request, including the first
+    backoff_base : float, optional
+        Seconds to wait before the first retry; doubled on each retry
+    backoff_max : float, optional
+        Upper limit on the wait between attempts
+    jitter : bool, optional
+        If True, each wait is drawn uniformly between 0 and the backoff so
+        that many clients don't retry in lockstep
+    budget : RetryBudget, optional
+        Shared limit on the number of retries
+    """
+
+    def __init__(self, max_attempts=3, backoff_base=0.1, backoff_max=5.0,
+            jitter=True, budget=None):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.budget = budget
+
+    def backoff(self, retry):
+        """
+        Seconds to wait before the given retry, counting from 1.
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (retry - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def call(self, func, circuit_breaker=None, sleep=time.sleep, deadline=None):
+        """
+        Calls ``func`` until it succeeds, fails with an exception that isn't
+        retryable, or the attempts or budget run out. When Andon throttles a
+        request with a Retry-After header, the next attempt waits at least
+        that long, even past ``backoff_max``. With a ``deadline``,
+        ``AndonDeadlineExceededException`` is raised instead of retrying once
+        the backoff would run past it.
+        """
+        if self.budget is not None:
+            self.budget.deposit()
+
+        attempt = 1
+        while True:
+            if deadline is not None:
+                deadline.check()
+            if circuit_breaker is not None:
+                circuit_breaker.before_call()
+            try:
+                result = func()
+            except Exception as e:
+                retryable = is_retryable(e)
+                if circuit_breaker is None:
+                    pass
+                elif isinstance(e, _LOCAL_EXCEPTIONS):
+                    circuit_breaker.release()
+                else:
+                    circuit_breaker.record(retryable)
+                if (not retryable
+                        or attempt >= self.max_attempts
+                        or (self.budget is not None and not self.budget.withdraw())):
+                    raise
+                delay = self.backoff(attempt)
+                if isinstance(e, AndonThrottledException) and e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                if deadline is not None and delay >= deadline.remaining():
+                    raise AndonDeadlineExceededException(
+                            "Deadline exceeded after {} attempts: {}".format(attempt, e))
+            else:
+                if circuit_breaker is not None:
+                    circuit_breaker.record(False)
+                return result
+
+            sleep(delay)
+            attempt += 1
+
+
+class CircuitBreaker(object):
+    """
+    Fails requests fast while Andon is known to be down. After
+    ``failure_threshold`` consecutive retryable failures the circuit opens and
+    requests raise ``AndonCircuitOpenException`` without being sent. Once
+    ``reset_timeout`` seconds pass a single trial request is let through; if
+    it succeeds the circuit closes, otherwise it opens again.
+
+    Parameters
+    ----------
+    failure_threshold : int, optional
+        Consecutive failures that open the circuit
+    reset_timeout : float, optional
+        Seconds the circuit stays open before a trial request
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    @property
+    def state(self):
+        return self._state
+
+    def before_call(self):
+        """
+        Raises ``AndonCircuitOpenException`` if the request must not be sent.
+        """
+        self._check_pid()
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if (self._state == self.OPEN
+                    and time.time() - self._opened_at >= self.reset_timeout):
+                self._state = self.HALF_OPEN
+                return
+            raise AndonCircuitOpenException("Andon is unavailable; circuit is open")
+
+    def record(self, failed):
+        """
+        Records the outcome of a request that was sent. ``failed`` is True
+        only for failures indicating that Andon is down.
+        """
+        self._check_pid()
+        with self._lock:
+            if not failed:
+                self._state = self.CLOSED
+                self._failures = 0
+                return
+
+            self._failures += 1
+            if (self._state == self.HALF_OPEN
+                    or self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+    def release(self):
+        """
+        Records that a request let through by ``before_call`` ended without
+        reaching Andon, such as when its deadline passed first. A trial
+        request's turn passes to the next one.
+        """
+        self._check_pid()
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
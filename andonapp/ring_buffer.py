@@ -0,0 +1,85 @@
+"""
+Bounded FIFO queue backed by a circular list, used for the events waiting in
+a ``BufferedReporter``.
+"""
+
+
+class RingBuffer(object):
+    """
+    FIFO queue of at most ``capacity`` items stored in a circular list, so
+    appending and popping don't allocate once the list has reached the size
+    the queue needs.
+
+    The list doubles in size as the queue grows, up to ``capacity`` slots, and
+    never shrinks. With ``preallocate``, all ``capacity`` slots (8 bytes each)
+    are allocated up front instead, so a queue filling up during an outage
+    can't fail for lack of memory partway through.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of items
+    preallocate : bool, optional
+        If True, room for ``capacity`` items is allocated immediately
+    """
+
+    INITIAL_SIZE = 16
+
+    def __init__(self, capacity, preallocate=False):
+        self.capacity = capacity
+        self._items = [None] * (capacity if preallocate else min(capacity, self.INITIAL_SIZE))
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("RingBuffer index out of range")
+        return self._items[(self._head + index) % len(self._items)]
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self._items[(self._head + index) % len(self._items)]
+
+    def append(self, item):
+        """
+        Adds ``item`` at the end.
+
+        Raises
+        ------
+        IndexError
+            If the buffer holds ``capacity`` items
+        """
+        if self._size == len(self._items):
+            if self._size >= self.capacity:
+                raise IndexError("RingBuffer is full")
+            self._grow()
+        self._items[(self._head + self._size) % len(self._items)] = item
+        self._size += 1
+
+    def popleft(self):
+        """
+        Removes and returns the first item.
+
+        Raises
+        ------
+        IndexError
+            If the buffer is empty
+        """
+        if not self._size:
+            raise IndexError("pop from an empty RingBuffer")
+        item = self._items[self._head]
+        self._items[self._head] = None
+        self._head = (self._head + 1) % len(self._items)
+        self._size -= 1
+        return item
+
+    def _grow(self):
+        items = list(self)
+        size = max(1, min(self.capacity, len(self._items) * 2))
+        self._items = items + [None] * (size - len(items))
+        self._head = 0
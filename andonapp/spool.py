@@ -0,0 +1,258 @@
+"""
+Durable on-disk spool for events that couldn't be delivered to Andon. Events
+are kept in an embedded SQLite database so they survive process restarts, and
+are replayed in order once Andon is reachable again.
+
+Example
+-------
+.. highlight:: python
+    client = AndonAppClient('orgName', 'apiToken',
+            spool=Spool('/var/lib/andon/spool.db'))
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from .exceptions import AndonThrottledException
+from .retry import is_rejected
+
+logger = logging.getLogger(__name__)
+
+
+class Spool(object):
+    """
+    Write-ahead store for events that failed to send. Events are replayed
+    oldest first, no faster than ``max_replay_rate`` per second. Events Andon
+    rejects as bad, invalid or referring to an unknown station are discarded;
+    any other failure leaves the event in place and stops the replay until the
+    next attempt. When Andon throttles a replay with a Retry-After header,
+    the next attempt waits at least that long.
+
+    The spool may be shared by threads, and by processes using the same file,
+    such as the children of a pre-fork server. After a fork, the child reopens
+    the database and, if the parent was replaying, starts its own replay
+    thread. Only one process replays at a time: a replay takes a lease stored
+    in the database, and other processes skip their turn while it is held. A
+    lease left by a process that died expires after ``lease_timeout``
+    seconds.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite database file; created if it doesn't exist
+    max_replay_rate : float, optional
+        Maximum number of events replayed per second
+    replay_interval : float, optional
+        Seconds between attempts to replay the backlog
+    lease_timeout : float, optional
+        Seconds after which another process may take over the replay from one
+        that stopped renewing its lease
+    """
+
+    DEFAULT_MAX_REPLAY_RATE = 10
+    DEFAULT_REPLAY_INTERVAL = 5
+    DEFAULT_LEASE_TIMEOUT = 120
+
+    def __init__(self, path, max_replay_rate=DEFAULT_MAX_REPLAY_RATE,
+            replay_interval=DEFAULT_REPLAY_INTERVAL, lease_timeout=DEFAULT_LEASE_TIMEOUT):
+        self.path = path
+        self.max_replay_rate = max_replay_rate
+        self.replay_interval = replay_interval
+        self.lease_timeout = lease_timeout
+
+        self._replay_send = None
+        self._open()
+
+    def _open(self):
+        self._pid = os.getpid()
+        self._owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False,
+                isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS events ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'created REAL NOT NULL, '
+                'path TEXT NOT NULL, '
+                'body TEXT NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS replay_lease ('
+                'id INTEGER PRIMARY KEY CHECK (id = 0), '
+                'owner TEXT NOT NULL, '
+                'expires REAL NOT NULL)')
+
+        self._replay_thread = None
+        self._replay_stop = None
+        self._resume_at = 0
+
+    def _check_pid(self):
+        # SQLite connections and threads don't survive a fork; the child
+        # abandons the parent's and opens its own.
+        if self._pid != os.getpid():
+            self._open()
+            if self._replay_send is not None:
+                self.start_replay(self._replay_send)
+
+    @property
+    def backlog_size(self):
+        """
+        Number of events waiting to be replayed, including those spooled by
+        other processes.
+        """
+        self._check_pid()
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    @property
+    def backlog_age(self):
+        """
+        Seconds since the oldest waiting event was spooled, or 0 when empty.
+        """
+        self._check_pid()
+        with self._lock:
+            row = self._db.execute(
+                    'SELECT created FROM events ORDER BY id LIMIT 1').fetchone()
+        return 0 if row is None else max(0, time.time() - row[0])
+
+    def append(self, path, request):
+        """
+        Durably stores an event to be sent to ``path`` later.
+        """
+        body = json.dumps(request)
+        self._check_pid()
+        with self._lock:
+            self._db.execute('INSERT INTO events (created, path, body) VALUES (?, ?, ?)',
+                    (time.time(), path, body))
+
+    def replay(self, send, max_events=None):
+        """
+        Sends spooled events in order by calling ``send(path, request)``,
+        pacing them to ``max_replay_rate``. Returns at once if another process
+        is replaying.
+
+        Returns
+        -------
+        int
+            Number of events removed from the spool
+        """
+        return self._replay(send, max_events, None)
+
+    def _replay(self, send, max_events, stop):
+        self._check_pid()
+        if time.time() < self._resume_at:
+            return 0
+        interval = 1.0 / self.max_replay_rate if self.max_replay_rate else 0
+        removed = 0
+        try:
+            while max_events is None or removed < max_events:
+                if stop is not None and stop.is_set():
+                    break
+                # Taken, or renewed, before every event so that it can't
+                # expire while this process is still replaying.
+                if not self._take_lease():
+                    break
+                with self._lock:
+                    row = self._db.execute(
+                            'SELECT id, path, body FROM events ORDER BY id LIMIT 1').fetchone()
+                if row is None:
+                    break
+
+                started = time.time()
+                event_id, path, body = row
+                try:
+                    send(path, json.loads(body))
+                except Exception as e:
+                    if not is_rejected(e):
+                        logger.debug("Stopping spool replay: %r", e)
+                        if isinstance(e, AndonThrottledException) and e.retry_after:
+                            self._resume_at = time.time() + e.retry_after
+                        break
+                    logger.warning("Discarding spooled event Andon rejected: %s", e)
+
+                with self._lock:
+                    self._db.execute('DELETE FROM events WHERE id = ?', (event_id,))
+                removed += 1
+
+                elapsed = time.time() - started
+                if elapsed < interval:
+                    time.sleep(interval - elapsed)
+        finally:
+            self._release_lease()
+
+        self._compact()
+        return removed
+
+    def start_replay(self, send):
+        """
+        Starts a background thread that replays the backlog with ``send``
+        every ``replay_interval`` seconds.
+        """
+        self._check_pid()
+        with self._lock:
+            self._replay_send = send
+            if self._replay_thread is not None:
+                return
+            self._replay_stop = threading.Event()
+            self._replay_thread = threading.Thread(target=self._run_replay,
+                    args=(send, self._replay_stop), name='andon-spool-replay')
+            self._replay_thread.daemon = True
+            self._replay_thread.start()
+
+    def stop_replay(self):
+        """
+        Stops the background replay thread, if running.
+        """
+        with self._lock:
+            self._replay_send = None
+            thread, self._replay_thread = self._replay_thread, None
+            if self._replay_stop is not None:
+                self._replay_stop.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def close(self):
+        """
+        Stops replaying and closes the database.
+        """
+        self.stop_replay()
+        with self._lock:
+            self._db.close()
+
+    def _run_replay(self, send, stop):
+        while not stop.is_set():
+            if self.backlog_size:
+                self._replay(send, None, stop)
+            stop.wait(self.replay_interval)
+
+    def _take_lease(self):
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute('BEGIN IMMEDIATE')
+            except sqlite3.OperationalError:
+                # Another process held the database past the busy timeout.
+                return False
+            try:
+                row = self._db.execute(
+                        'SELECT owner, expires FROM replay_lease').fetchone()
+                if row is not None and row[0] != self._owner and row[1] > now:
+                    return False
+                self._db.execute('INSERT OR REPLACE INTO replay_lease (id, owner, expires) '
+                        'VALUES (0, ?, ?)', (self._owner, now + self.lease_timeout))
+                return True
+            finally:
+                self._db.execute('COMMIT')
+
+    def _release_lease(self):
+        with self._lock:
+            self._db.execute('DELETE FROM replay_lease WHERE owner = ?', (self._owner,))
+
+    def _compact(self):
+        with self._lock:
+            if self._db.execute('SELECT 1 FROM events LIMIT 1').fetchone() is None:
+                self._db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
@@ -0,0 +1,159 @@
+"""
+Last-known station status cache that keeps redundant ``update_station_status``
+calls off the network.
+
+Example
+-------
+.. highlight:: python
+    client = AndonAppClient('orgName', 'apiToken',
+            status_cache=StatusCache(refresh_ttl=300, coalesce_window=2))
+"""
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StatusCache(object):
+    """
+    Remembers the last status sent for each (line, station) and suppresses
+    updates that wouldn't change it. An unchanged status is still sent once
+    ``refresh_ttl`` seconds have passed since it was last sent.
+
+    With a ``coalesce_window``, the first update for a station is held for
+    that many seconds and any further updates in the meantime replace it, so
+    a burst of flips reaches Andon as a single update with the final status.
+    Held updates are sent from a background timer; failures are logged and
+    clear the cached status so the next update goes through. Updates still
+    held when the process forks are sent by the parent only.
+
+    Parameters
+    ----------
+    refresh_ttl : float, optional
+        Seconds after which an unchanged status is sent again; never if None
+    coalesce_window : float, optional
+        Seconds to hold an update for coalescing; 0 sends immediately
+    """
+
+    def __init__(self, refresh_ttl=None, coalesce_window=0):
+        self.refresh_ttl = refresh_ttl
+        self.coalesce_window = coalesce_window
+
+        self.sent = 0
+        self.suppressed = 0
+        self.coalesced = 0
+
+        self._last = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def stats(self):
+        """
+        Counts of updates sent, suppressed as unchanged, and collapsed into a
+        later update.
+        """
+        with self._lock:
+            return {
+                'sent': self.sent,
+                'suppressed': self.suppressed,
+                'coalesced': self.coalesced
+            }
+
+    def get(self, line_name, station_name):
+        """
+        The last status request sent for a station, or None.
+        """
+        with self._lock:
+            last = self._last.get((line_name, station_name))
+        return None if last is None else last[0]
+
+    def update(self, request, send):
+        """
+        Sends a status update request with ``send(request)`` unless it is
+        unchanged or held for coalescing.
+        """
+        key = (request['lineName'], request['stationName'])
+        if self._pid != os.getpid():
+            self._after_fork()
+
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending[0] = request
+                pending[1] = send
+                self.coalesced += 1
+                return
+
+            if self._is_unchanged(key, request):
+                self.suppressed += 1
+                return
+
+            if self.coalesce_window:
+                timer = threading.Timer(self.coalesce_window, self._send_pending, (key,))
+                timer.daemon = True
+                self._pending[key] = [request, send, timer]
+                timer.start()
+                return
+
+        self._send(key, request, send)
+
+    def flush(self):
+        """
+        Sends all held updates now.
+        """
+        with self._lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._send_pending(key)
+
+    def clear(self):
+        """
+        Forgets all cached statuses, so the next update for every station is
+        sent.
+        """
+        with self._lock:
+            self._last.clear()
+
+    def _after_fork(self):
+        # Timers don't survive a fork, so held updates belong to the parent.
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pid = os.getpid()
+
+    def _send_pending(self, key):
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return
+            request, send, timer = pending
+            timer.cancel()
+            if self._is_unchanged(key, request):
+                self.suppressed += 1
+                return
+
+        try:
+            self._send(key, request, send)
+        except Exception:
+            logger.exception("Failed to send status update for %s", key)
+
+    def _send(self, key, request, send):
+        try:
+            send(request)
+        except Exception:
+            with self._lock:
+                self._last.pop(key, None)
+            raise
+
+        with self._lock:
+            self._last[key] = (request, time.time())
+            self.sent += 1
+
+    def _is_unchanged(self, key, request):
+        last = self._last.get(key)
+        if last is None or last[0] != request:
+            return False
+        return self.refresh_ttl is None or time.time() - last[1] < self.refresh_ttl
@@ -0,0 +1,302 @@
+"""
+Recording of the requests a client sends, and replay of a recording against
+another endpoint, such as a local stub, to load test with a real shift's
+traffic shape instead of synthetic loops.
+
+A recording is a log with one JSON object per request, optionally gzip
+compressed::
+
+    {"t": 1697541234.512, "p": "/data/report", "r": {...}, "o": "ok", "s": 200, "l": 0.0213}
+
+holding the time the request started, its path, its body without null
+fields, its outcome ('ok' or an exception class name), the HTTP status, and
+its latency in seconds.
+
+Example
+-------
+.. highlight:: python
+    recorder = Recorder('shift.ndjson.gz')
+    client.add_request_hooks(after=recorder)
+    ...
+    recorder.close()
+
+    result = replay('shift.ndjson.gz', 'http://127.0.0.1:8080/public/api/v1',
+            speed=10, concurrency=50)
+    print(result.rate, result.latency['p99'], result.outcomes)
+
+Or from a shell::
+
+    andonapp-replay shift.ndjson.gz --endpoint http://127.0.0.1:8080/public/api/v1 --speed 10
+"""
+
+import argparse
+import collections
+import gzip
+import json
+import os
+import threading
+import time
+
+from .bulk import dispatch
+from .encoding import compact, gzip_body
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+class Recorder(object):
+    """
+    Request hook writing every request the client sends to a log. Retries are
+    recorded as separate requests, since they are load on Andon too.
+
+    Records are written in batches of ``buffer_size``, each with a single
+    append, so several processes, such as forked workers, can record to the
+    same file. Records not yet written are lost if the process dies; call
+    ``flush()`` or ``close()`` to write them.
+
+    Parameters
+    ----------
+    path : str
+        File the records are appended to
+    compress : bool, optional
+        Whether to gzip the log; defaults to True if ``path`` ends in '.gz'
+    buffer_size : int, optional
+        Number of records held before they are written
+    """
+
+    DEFAULT_BUFFER_SIZE = 1000
+
+    def __init__(self, path, compress=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self.compress = path.endswith('.gz') if compress is None else compress
+        self.buffer_size = buffer_size
+        self.recorded = 0
+        self._file = open(path, 'ab', buffering=0)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __call__(self, info):
+        record = {
+            't': round(time.time() - (info.elapsed or 0), 3),
+            'p': info.path,
+            'r': compact(info.request) if info.request is not None else None,
+            'o': info.outcome,
+            's': info.status_code,
+            'l': None if info.elapsed is None else round(info.elapsed, 4)
+        }
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+        if self._pid != os.getpid():
+            # The parent writes what it had buffered before the fork.
+            self._lock = threading.Lock()
+            self._pending = []
+            self._pid = os.getpid()
+
+        with self._lock:
+            self._pending.append(line)
+            self.recorded += 1
+            if len(self._pending) >= self.buffer_size:
+                self._write()
+
+    def flush(self):
+        """
+        Writes the records held in memory.
+        """
+        with self._lock:
+            self._write()
+
+    def close(self):
+        with self._lock:
+            self._write()
+            self._file.close()
+
+    def _write(self):
+        if not self._pending:
+            return
+        data = ('\n'.join(self._pending) + '\n').encode('utf-8')
+        self._pending = []
+        # Each batch is a complete gzip member; readers see the members of a
+        # file as one stream.
+        self._file.write(gzip_body(data) if self.compress else data)
+
+
+def read_log(path):
+    """
+    Yields the records of a log, compressed or not, as dicts.
+    """
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == _GZIP_MAGIC
+    opener = gzip.open if compressed else open
+    with opener(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line.decode('utf-8'))
+
+
+class ReplayResult(collections.namedtuple('ReplayResult',
+        ['requests', 'duration', 'rate', 'recorded_rate', 'latency', 'outcomes', 'max_lag'])):
+    """
+    Outcome of a replay.
+
+    Attributes
+    ----------
+    requests : int
+        Requests sent
+    duration : float
+        Seconds from the first request being sent to the last completing
+    rate : float
+        Requests completed per second
+    recorded_rate : float
+        Requests per second in the recording, after applying the speed
+    latency : dict
+        'mean', 'p50', 'p90', 'p99' and 'max' request latency in seconds
+    outcomes : dict
+        Number of requests per outcome -- 'ok' or an exception class name
+    max_lag : float
+        Longest a request was sent after its scheduled time, in seconds;
+        more than a little means ``concurrency`` was too low to keep up
+    """
+
+    __slots__ = ()
+
+
+def replay(path, endpoint, speed=1.0, concurrency=10, transport=None,
+        api_token='replay'):
+    """
+    Sends every request of a log to ``endpoint`` with the timing it was
+    recorded with. Each request is sent once, with its recorded body.
+
+    Parameters
+    ----------
+    path : str
+        Log written by a ``Recorder``
+    endpoint : str
+        Base URL to send to, in place of Andon's
+    speed : float, optional
+        How many times faster than recorded to send, or None to send as
+        fast as ``concurrency`` allows
+    concurrency : int, optional
+        Maximum number of requests in progress at once
+    transport : str or Transport, optional
+        Transport to send with, as for ``AndonAppClient``
+    api_token : str, optional
+        Token sent with every request
+
+    Returns
+    -------
+    ReplayResult
+    """
+    from .andon_client import AndonAppClient
+
+    client = AndonAppClient('replay', api_token, pool_maxsize=concurrency,
+            transport=transport)
+    client.endpoint = endpoint
+
+    latencies = []
+    lags = []
+    span = [None, None]
+
+    def send(record, due):
+        started = time.perf_counter()
+        if due is not None:
+            lags.append(max(0.0, started - due))
+        try:
+            client.send(record['p'], record['r'])
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    def schedule():
+        started = None
+        for record in read_log(path):
+            if started is None:
+                started = time.perf_counter()
+                span[0] = record['t']
+            span[1] = record['t']
+            due = None
+            if speed:
+                due = started + (record['t'] - span[0]) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield {'record': record, 'due': due}
+
+    outcomes = collections.Counter()
+    started = time.perf_counter()
+    with client:
+        for result in dispatch(send, schedule(), concurrency, ordered=False):
+            outcomes[_outcome(result.exception)] += 1
+    duration = time.perf_counter() - started
+
+    requests = sum(outcomes.values())
+    recorded = None
+    if span[0] is not None and span[1] > span[0] and speed:
+        recorded = requests / ((span[1] - span[0]) / speed)
+    return ReplayResult(requests, duration, requests / duration if duration else 0.0,
+            recorded, _summarize(latencies), dict(outcomes), max(lags) if lags else 0.0)
+
+
+def main(argv=None):
+    """
+    Entry point of the ``andonapp-replay`` command.
+    """
+    parser = argparse.ArgumentParser(prog='andonapp-replay',
+            description='Replay recorded Andon traffic against another endpoint.')
+    parser.add_argument('path', help='Log written by a Recorder')
+    parser.add_argument('--endpoint', required=True,
+            help='Base URL to send to, such as a local stub server')
+    parser.add_argument('--speed', default='1',
+            help="Multiple of the recorded rate, or 'max' to send as fast as possible")
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--transport', help="'requests', 'http' or 'http2'")
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+    args = parser.parse_args(argv)
+
+    try:
+        speed = None if args.speed == 'max' else float(args.speed)
+    except ValueError:
+        parser.error("--speed must be a number or 'max'")
+
+    result = replay(args.path, args.endpoint, speed=speed,
+            concurrency=args.concurrency, transport=args.transport)
+    if args.json:
+        print(json.dumps(result._asdict(), indent=2))
+        return 0 if result.outcomes.keys() <= {'ok'} else 1
+
+    print('Replayed {} requests in {:.1f}s: {:.1f}/s{}'.format(result.requests,
+            result.duration, result.rate,
+            '' if result.recorded_rate is None else
+            ' (recorded {:.1f}/s)'.format(result.recorded_rate)))
+    print('Latency ms: mean {mean:.1f}, p50 {p50:.1f}, p90 {p90:.1f}, p99 {p99:.1f}, '
+            'max {max:.1f}'.format(**dict((key, value * 1000)
+                    for key, value in result.latency.items())))
+    print('Outcomes: ' + ', '.join('{} {}'.format(outcome, count)
+            for outcome, count in sorted(result.outcomes.items())))
+    print('Max lag behind schedule: {:.1f}ms'.format(result.max_lag * 1000))
+    return 0 if result.outcomes.keys() <= {'ok'} else 1
+
+
+def _outcome(exception):
+    return 'ok' if exception is None else exception.__class__.__name__
+
+
+def _summarize(latencies):
+    if not latencies:
+        return dict.fromkeys(('mean', 'p50', 'p90', 'p99', 'max'), 0.0)
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+    return {
+        'mean': sum(ordered) / len(ordered),
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'p99': percentile(99),
+        'max': ordered[-1]
+    }
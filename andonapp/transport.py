@@ -0,0 +1,116 @@
+"""
+HTTP transports that carry ``AndonAppClient`` requests. A transport is
+created on first use, so its HTTP library is only imported once a request is
+actually sent.
+
+Three transports are included:
+
+* ``'requests'`` -- pooled connections through the ``requests`` library
+* ``'http'`` -- persistent connections using only the standard library's
+  ``http.client``, which starts up considerably faster
+* ``'http2'`` -- concurrent requests multiplexed over one HTTP/2 connection
+  through ``httpx``, which must be installed with the ``http2`` extra
+
+Example
+-------
+.. highlight:: python
+    client = AndonAppClient('orgName', 'apiToken', transport='http')
+"""
+
+import importlib
+
+TRANSPORTS = {
+    'requests': ('.requests_transport', 'RequestsTransport'),
+    'http': ('.http_transport', 'HttpTransport'),
+    'http2': ('.http2_transport', 'Http2Transport'),
+}
+
+
+class Transport(object):
+    """
+    Sends POST requests to Andon. Implementations must be safe to use from
+    multiple threads.
+
+    Transports are created with the client's pooling options as keyword
+    arguments: ``pool_connections``, ``pool_maxsize`` and ``pool_block``.
+    """
+
+    def post(self, url, body, headers, timeout):
+        """
+        Sends ``body`` to ``url`` and returns the response once it has been
+        read completely.
+
+        Parameters
+        ----------
+        url : str
+            Full URL to post to
+        body : bytes
+            Encoded request body
+        headers : dict
+            Request headers
+        timeout : tuple
+            (connect, read) timeouts in seconds; None waits forever
+
+        Returns
+        -------
+        response
+            An object with ``status_code``, ``headers``, ``text``, ``json()``
+            and ``elapsed`` (a ``timedelta``), like a ``requests.Response``
+
+        Raises
+        ------
+        AndonTimeoutException
+            If a timeout expires
+        AndonConnectionException
+            If Andon can't be reached or the connection is dropped
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Closes all pooled connections. The transport may still be used
+        afterwards.
+        """
+
+    def after_fork(self):
+        """
+        Called in a child process before its first request. Connections
+        inherited from the parent must be dropped without being closed.
+        """
+
+
+def get_transport(transport=None, **options):
+    """
+    Returns a transport instance.
+
+    Parameters
+    ----------
+    transport : str or Transport, optional
+        'requests', 'http' or 'http2' to create a transport by name, an existing
+        transport, or None for 'requests' when it is installed and 'http'
+        otherwise
+    options
+        Pooling options passed to a transport created by name
+
+    Raises
+    ------
+    ValueError
+        If the named transport is unknown or its library isn't installed
+    """
+    if transport is None:
+        try:
+            return get_transport('requests', **options)
+        except ValueError:
+            return get_transport('http', **options)
+
+    if not isinstance(transport, str):
+        return transport
+
+    if transport not in TRANSPORTS:
+        raise ValueError("Unknown transport: {}".format(transport))
+    module_name, class_name = TRANSPORTS[transport]
+    try:
+        module = importlib.import_module(module_name, __package__)
+    except ImportError as e:
+        raise ValueError("The {} transport is unavailable: {}".format(transport, e))
+    return getattr(module, class_name)(**options)
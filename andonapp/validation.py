@@ -0,0 +1,143 @@
+"""
+Client-side validation of requests, so malformed events are rejected locally
+with the same exceptions Andon would raise instead of after a round trip.
+
+Example
+-------
+.. highlight:: python
+    registry = StationRegistry(lambda: [('line 1', 'station 1')], ttl=600)
+    client = AndonAppClient('orgName', 'apiToken',
+            validator=Validator(registry))
+"""
+
+import threading
+import time
+
+from .exceptions import AndonInvalidRequestException
+from .exceptions import AndonResourceNotFoundException
+
+PASS_RESULTS = frozenset(('PASS', 'FAIL'))
+STATUS_COLORS = frozenset(('GREEN', 'YELLOW', 'RED'))
+
+try:
+    _STRING_TYPES = (str, unicode)
+except NameError:
+    _STRING_TYPES = (str,)
+
+_NUMBER_TYPES = (int, float)
+_INFINITY = float('inf')
+
+
+class StationRegistry(object):
+    """
+    Cached set of known (line, station) names, reloaded from ``loader`` once
+    ``ttl`` seconds have passed. If a reload fails the previous names are kept.
+
+    Parameters
+    ----------
+    loader : callable
+        Returns an iterable of (line_name, station_name) pairs
+    ttl : float, optional
+        Seconds before the names are reloaded; never if None
+    """
+
+    def __init__(self, loader, ttl=300):
+        self._loader = loader
+        self.ttl = ttl
+        self._stations = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Reloads the names now.
+        """
+        stations = frozenset(self._loader())
+        with self._lock:
+            self._stations = stations
+            self._loaded_at = time.time()
+
+    def __contains__(self, key):
+        stations = self._stations
+        if stations is None or (self.ttl is not None
+                and time.time() - self._loaded_at >= self.ttl):
+            try:
+                self.refresh()
+            except Exception:
+                if self._stations is None:
+                    raise
+                with self._lock:
+                    self._loaded_at = time.time()
+            stations = self._stations
+        return key in stations
+
+
+class Validator(object):
+    """
+    Checks requests before they are sent and raises
+    ``AndonInvalidRequestException`` for malformed ones. With a
+    ``StationRegistry``, requests for unknown stations raise
+    ``AndonResourceNotFoundException``.
+
+    Parameters
+    ----------
+    registry : StationRegistry, optional
+        Known line and station names
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry
+
+    def validate_report(self, request):
+        """
+        Validates a ``report_data`` request.
+        """
+        self._validate_station(request)
+
+        pass_result = request['passResult']
+        if pass_result not in PASS_RESULTS:
+            raise AndonInvalidRequestException(
+                    "'{}' is not a valid pass result.".format(pass_result))
+
+        process_time = request['processTimeSeconds']
+        # The chained comparison is False for NaN as well as for negative and
+        # infinite times, none of which can be sent as JSON Andon accepts.
+        if (process_time.__class__ not in _NUMBER_TYPES
+                or not 0 <= process_time < _INFINITY):
+            raise AndonInvalidRequestException(
+                    "processTimeSeconds must be a non-negative finite number")
+
+        _validate_optional_string(request, 'failReason')
+        _validate_optional_string(request, 'failNotes')
+
+    def validate_status(self, request):
+        """
+        Validates an ``update_station_status`` request.
+        """
+        self._validate_station(request)
+
+        status_color = request['statusColor']
+        if status_color not in STATUS_COLORS:
+            raise AndonInvalidRequestException(
+                    "'{}' is not a valid status color.".format(status_color))
+
+        _validate_optional_string(request, 'statusReason')
+        _validate_optional_string(request, 'statusNotes')
+
+    def _validate_station(self, request):
+        line_name = request['lineName']
+        if not line_name or not isinstance(line_name, _STRING_TYPES):
+            raise AndonInvalidRequestException("lineName may not be empty")
+
+        station_name = request['stationName']
+        if not station_name or not isinstance(station_name, _STRING_TYPES):
+            raise AndonInvalidRequestException("stationName may not be empty")
+
+        if self.registry is not None and (line_name, station_name) not in self.registry:
+            raise AndonResourceNotFoundException("Station not found.")
+
+
+def _validate_optional_string(request, name):
+    value = request[name]
+    if value is not None and not isinstance(value, _STRING_TYPES):
+        raise AndonInvalidRequestException("{} must be a string".format(name))
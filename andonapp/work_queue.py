@@ -0,0 +1,247 @@
+"""
+Bounded queue of events drained by background worker threads, shared by
+``BufferedReporter`` and ``OrgPool``. It handles what to do when the queue is
+full, flushing, closing and forking; subclasses decide how events are held
+and in what order they are sent.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from .exceptions import AndonAppException
+from .exceptions import AndonDeadlineExceededException
+from .exceptions import AndonQueueFullException
+
+logger = logging.getLogger(__name__)
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+RAISE = 'raise'
+
+
+class WorkQueue(object):
+    """
+    Base class for queues of ``ReportEvent`` and ``StatusEvent`` objects sent
+    by ``workers`` background threads.
+
+    Each event's ``callback`` is invoked from a worker thread once the event
+    completes, with None on success or the exception raised while sending.
+    Events dropped from a full queue complete with an
+    ``AndonQueueFullException``. An event's ``deadline`` covers waiting for
+    room in the queue, waiting in it and being sent.
+
+    If the process forks, the child starts with empty queues and its own
+    worker threads the first time it queues an event.
+
+    Subclasses implement ``_reset``, ``_is_full``, ``_drop_oldest``,
+    ``_enqueue``, ``_has_waiting``, ``_dequeue`` and ``_send``, all but
+    ``_send`` called with the lock held.
+
+    Parameters
+    ----------
+    max_queue_size : int
+        Maximum number of events waiting, as counted by ``_is_full``
+    workers : int
+        Number of background threads sending events
+    when_full : str
+        What to do when the queue is full -- 'block' waits for room,
+        'drop_oldest' discards the oldest waiting event, and 'raise' raises an
+        ``AndonQueueFullException``
+    """
+
+    # Used in the names of worker threads and in error messages.
+    THREAD_NAME = 'andon-queue'
+    NAME = 'Queue'
+
+    def __init__(self, max_queue_size, workers, when_full):
+        if when_full not in (BLOCK, DROP_OLDEST, RAISE):
+            raise ValueError("Unknown when_full policy: {}".format(when_full))
+
+        self._max_queue_size = max_queue_size
+        self._workers = workers
+        self._when_full = when_full
+        self._closed = False
+        self._start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def flush(self, timeout=None):
+        """
+        Waits until every queued event has completed.
+
+        Returns
+        -------
+        bool
+            False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while self._unfinished:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._all_done.wait(remaining)
+            return True
+
+    def close(self, timeout=None):
+        """
+        Stops accepting events, sends everything still queued and stops the
+        worker threads.
+
+        Returns
+        -------
+        bool
+            False if the timeout expired before the queue drained
+        """
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in self._threads:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            thread.join(remaining)
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._unfinished = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._all_done = threading.Condition(self._lock)
+        self._reset()
+
+        self._threads = []
+        for i in range(self._workers):
+            thread = threading.Thread(target=self._run,
+                    name='{}-{}'.format(self.THREAD_NAME, i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _put(self, event, target=None):
+        if self._pid != os.getpid() and not self._closed:
+            self._start()
+
+        deadline = event.deadline
+        dropped = None
+
+        with self._lock:
+            if self._closed:
+                raise AndonAppException("{} is closed".format(self.NAME))
+
+            if self._is_full(target):
+                if self._when_full == RAISE:
+                    raise AndonQueueFullException("{} is full ({} events)".format(
+                            self._queue_name(target), self._max_queue_size))
+                elif self._when_full == DROP_OLDEST:
+                    dropped = self._drop_oldest(target)
+                    self._unfinished -= 1
+                else:
+                    while self._is_full(target) and not self._closed:
+                        if deadline is not None and deadline.expired:
+                            raise AndonDeadlineExceededException(
+                                    "Deadline exceeded waiting for room in the queue")
+                        self._not_full.wait(None if deadline is None else deadline.remaining())
+                    if self._closed:
+                        raise AndonAppException("{} is closed".format(self.NAME))
+
+            self._enqueue(event, target)
+            self._unfinished += 1
+            self._not_empty.notify()
+
+        if dropped is not None:
+            _complete(dropped.callback, AndonQueueFullException(
+                    "Dropped oldest event from full queue"))
+
+    def _take(self):
+        with self._lock:
+            while not self._has_waiting():
+                if self._closed:
+                    return None, None
+                self._not_empty.wait()
+
+            target, event = self._dequeue()
+            self._not_full.notify_all()
+            return target, event
+
+    def _run(self):
+        while True:
+            target, event = self._take()
+            if event is None:
+                return
+
+            error = None
+            started = time.perf_counter()
+            try:
+                if event.deadline is not None:
+                    event.deadline.check()
+                self._send(target, event)
+            except Exception as e:
+                error = e
+            elapsed = time.perf_counter() - started
+            _complete(event.callback, error)
+
+            with self._lock:
+                self._record(target, error, elapsed)
+                self._unfinished -= 1
+                if not self._unfinished:
+                    self._all_done.notify_all()
+
+    def _reset(self):
+        """
+        Creates empty queues, on start and in a forked child.
+        """
+        raise NotImplementedError
+
+    def _is_full(self, target):
+        """
+        Whether there is no room for another event for ``target``.
+        """
+        raise NotImplementedError
+
+    def _queue_name(self, target):
+        return 'Queue'
+
+    def _drop_oldest(self, target):
+        """
+        Removes and returns the event to drop to make room for ``target``.
+        """
+        raise NotImplementedError
+
+    def _enqueue(self, event, target):
+        raise NotImplementedError
+
+    def _has_waiting(self):
+        raise NotImplementedError
+
+    def _dequeue(self):
+        """
+        Removes the next event to send and returns it with its target.
+        """
+        raise NotImplementedError
+
+    def _send(self, target, event):
+        raise NotImplementedError
+
+    def _record(self, target, error, elapsed):
+        """
+        Called with the outcome of every event sent.
+        """
+
+
+def _complete(callback, error):
+    if callback is None:
+        return
+    try:
+        callback(error)
+    except Exception:
+        logger.exception("Event callback %r failed", callback)
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Andon client. These aren't part of the installed package;
+run them from a source checkout, for example ``python -m benchmarks.hot_path``.
+"""
@@ -0,0 +1,104 @@
+"""
+Measures the client-side CPU cost of a single ``report_data`` call, with the
+network replaced by an adapter that answers instantly. The legacy path
+rebuilds headers and the URL on every call and lets ``requests`` serialize the
+payload; the current path sends prebuilt bytes.
+
+The paths are measured in alternating rounds and the fastest round of each is
+reported, which keeps scheduler noise out of the comparison.
+
+Usage::
+
+    python -m benchmarks.hot_path [--calls N] [--rounds N] [--encoder json|ujson|orjson]
+"""
+
+import argparse
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+from andonapp import AndonAppClient
+
+
+class NullAdapter(BaseAdapter):
+    """
+    Transport adapter that returns an empty 200 response without any I/O.
+    """
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{}'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def legacy_report_data(client, line_name, station_name,
+        pass_result, process_time_seconds,
+        fail_reason=None, fail_notes=None):
+    request = {
+        'orgName': client._org_name,
+        'lineName': line_name,
+        'stationName': station_name,
+        'passResult': pass_result,
+        'processTimeSeconds': process_time_seconds,
+        'failReason': fail_reason,
+        'failNotes': fail_notes
+    }
+
+    headers = {
+        'Content-Type': 'application/json; charset=utf-8',
+        'Authorization': client._auth_header_value
+    }
+
+    url = client.endpoint + client.REPORT_DATA_PATH
+    response = client._get_transport().session.post(url, json=request, headers=headers)
+
+    if response.status_code != requests.codes.ok:
+        client._process_error_response(response)
+
+
+def measure(report, calls):
+    started = time.process_time()
+    for _ in range(calls):
+        report('line 1', 'station 1', 'PASS', 100)
+    return (time.process_time() - started) / calls
+
+
+def create_client(encoder):
+    client = AndonAppClient('Demo', 'api-token', json_encoder=encoder,
+            transport='requests')
+    client._get_transport().session.mount('https://', NullAdapter())
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--encoder', default=None)
+    args = parser.parse_args(argv)
+
+    client = create_client(args.encoder)
+    paths = {
+        'legacy': lambda *a: legacy_report_data(client, *a),
+        'current': client.report_data
+    }
+    best = dict((name, float('inf')) for name in paths)
+    for _ in range(args.rounds):
+        for name, report in paths.items():
+            best[name] = min(best[name], measure(report, args.calls))
+    legacy, current = best['legacy'], best['current']
+
+    print('legacy:  {:8.2f} us/call'.format(legacy * 1e6))
+    print('current: {:8.2f} us/call ({:+.1f}%)'.format(current * 1e6,
+            (current - legacy) / legacy * 100))
+
+
+if __name__ == '__main__':
+    main()
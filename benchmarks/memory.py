@@ -0,0 +1,117 @@
+"""
+Measures the memory held per queued event: as request dicts like those
+``report_data`` builds, as ``ReportEvent``/``StatusEvent`` objects, and as
+the events waiting in a ``BufferedReporter`` whose workers are stalled, as
+during an outage. Line and station names are built afresh for every event, as
+they are when events arrive over the network or from a file.
+
+Usage::
+
+    python -m benchmarks.memory [--events N] [--stations N]
+"""
+
+import argparse
+import collections
+import gc
+import json
+import tracemalloc
+
+from andonapp.events import ReportEvent, StatusEvent
+from andonapp.reporter import BufferedReporter
+
+
+def calls(events, stations):
+    for n in range(events):
+        line_name = 'line {}'.format(n % stations // 50)
+        station_name = 'station {}'.format(n % stations)
+        if n % 10:
+            yield 'report_data', (line_name, station_name, 'PASS' if n % 7 else 'FAIL',
+                    n % 300, None, None)
+        else:
+            yield 'update_station_status', (line_name, station_name,
+                    ('GREEN', 'YELLOW', 'RED')[n % 3], None, None)
+
+
+def as_dict(method, args):
+    if method == 'report_data':
+        return {
+            'orgName': 'Demo',
+            'lineName': args[0],
+            'stationName': args[1],
+            'passResult': args[2],
+            'processTimeSeconds': args[3],
+            'failReason': args[4],
+            'failNotes': args[5]
+        }
+    return {
+        'orgName': 'Demo',
+        'lineName': args[0],
+        'stationName': args[1],
+        'statusColor': args[2],
+        'statusReason': args[3],
+        'statusNotes': args[4]
+    }
+
+
+def as_event(method, args):
+    if method == 'report_data':
+        return ReportEvent(*args)
+    return StatusEvent(*args)
+
+
+def measure(fill, events, stations):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = fill(calls(events, stations))
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del held
+    return size / float(events)
+
+
+def fill_dicts(calls):
+    return collections.deque(as_dict(method, args) for method, args in calls)
+
+
+def fill_events(calls):
+    return collections.deque(as_event(method, args) for method, args in calls)
+
+
+def fill_reporter(calls):
+    reporter = BufferedReporter(client=None, max_queue_size=10 ** 9, workers=0)
+    for method, args in calls:
+        getattr(reporter, method)(*args)
+    return reporter
+
+
+def run(events, stations):
+    return [{
+        'representation': name,
+        'bytes_per_event': measure(fill, events, stations)
+    } for name, fill in [
+        ('request dicts', fill_dicts),
+        ('event objects', fill_events),
+        ('BufferedReporter queue', fill_reporter),
+    ]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--stations', type=int, default=500)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run(args.events, args.stations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print('{:<24} {:>16}'.format('representation', 'bytes per event'))
+    for result in results:
+        print('{:<24} {:>16.1f}'.format(result['representation'], result['bytes_per_event']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Throughput and latency benchmarks for each way of sending events with the
+client, run against the local stub server. Every scenario reports p50/p95/p99
+latency and events per second, and the results can be written as JSON for
+regression tracking.
+
+Usage::
+
+    python -m benchmarks.run [--events N] [--latency 0.005] [--scenario sync ...]
+        [--error INTERNAL_ERROR=0.01] [--drop-rate 0.001] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import threading
+import time
+
+from andonapp import AndonAppClient, AsyncAndonAppClient
+
+from .stub_server import StubServer, parse_errors
+
+API_PATH = '/public/api/v1'
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(name, latencies, errors, duration):
+    latencies = sorted(latencies)
+    return {
+        'scenario': name,
+        'events': len(latencies),
+        'errors': errors,
+        'duration_seconds': duration,
+        'events_per_second': len(latencies) / duration if duration else 0,
+        'latency_ms': {
+            'p50': percentile(latencies, 0.50) * 1000,
+            'p95': percentile(latencies, 0.95) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': (latencies[-1] if latencies else 0) * 1000
+        }
+    }
+
+
+def events(count):
+    for i in range(count):
+        if i % 10:
+            yield {
+                'line_name': 'line 1',
+                'station_name': 'station {}'.format(i % 20),
+                'pass_result': 'PASS',
+                'process_time_seconds': 60 + i % 30
+            }
+        else:
+            yield {
+                'line_name': 'line 1',
+                'station_name': 'station {}'.format(i % 20),
+                'pass_result': 'FAIL',
+                'process_time_seconds': 60 + i % 30,
+                'fail_reason': 'Test Failure',
+                'fail_notes': 'notes'
+            }
+
+
+class Recorder(object):
+    """
+    Collects latencies and error counts from any number of threads.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, latency, error=None):
+        with self._lock:
+            self.latencies.append(latency)
+            if error is not None:
+                name = error.__class__.__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def timed_call(recorder, func, **kwargs):
+    started = time.perf_counter()
+    error = None
+    try:
+        func(**kwargs)
+    except Exception as e:
+        error = e
+    recorder.add(time.perf_counter() - started, error)
+
+
+def scenario_sync(client_factory, count, concurrency):
+    """
+    One thread calling report_data in a loop.
+    """
+    recorder = Recorder()
+    with client_factory() as client:
+        for event in events(count):
+            timed_call(recorder, client.report_data, **event)
+    return recorder
+
+
+def scenario_threads(client_factory, count, concurrency):
+    """
+    ``concurrency`` threads sharing one client.
+    """
+    recorder = Recorder()
+    source = events(count)
+    lock = threading.Lock()
+
+    def work(client):
+        while True:
+            with lock:
+                event = next(source, None)
+            if event is None:
+                return
+            timed_call(recorder, client.report_data, **event)
+
+    with client_factory() as client:
+        threads = [threading.Thread(target=work, args=(client,)) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return recorder
+
+
+def scenario_reporter(client_factory, count, concurrency):
+    """
+    Buffered reporter with ``concurrency`` workers; latency runs from enqueue
+    to completion.
+    """
+    recorder = Recorder()
+    with client_factory() as client:
+        with client.reporter(workers=concurrency, max_queue_size=count) as reporter:
+            for event in events(count):
+                started = time.perf_counter()
+                callback = (lambda started: lambda error: recorder.add(
+                        time.perf_counter() - started, error))(started)
+                reporter.report_data(callback=callback, **event)
+    return recorder
+
+
+def scenario_bulk(client_factory, count, concurrency):
+    """
+    report_many with ``concurrency`` workers; latency runs from submission to
+    the result being yielded.
+    """
+    recorder = Recorder()
+    submitted = {}
+
+    def stamped():
+        for index, event in enumerate(events(count)):
+            submitted[index] = time.perf_counter()
+            yield event
+
+    with client_factory() as client:
+        for result in client.report_many(stamped(), max_workers=concurrency):
+            recorder.add(time.perf_counter() - submitted.pop(result.index), result.exception)
+    return recorder
+
+
+def scenario_async(client_factory, count, concurrency):
+    """
+    AsyncAndonAppClient with ``concurrency`` requests in flight.
+    """
+    recorder = Recorder()
+
+    async def send(client, event):
+        started = time.perf_counter()
+        error = None
+        try:
+            await client.report_data(**event)
+        except Exception as e:
+            error = e
+        recorder.add(time.perf_counter() - started, error)
+
+    async def run():
+        template = client_factory()
+        client = AsyncAndonAppClient('Demo', 'api-token',
+                pool_maxsize=concurrency, max_in_flight=concurrency)
+        client.endpoint = template.endpoint
+        template.close()
+        async with client:
+            await asyncio.gather(*[send(client, event) for event in events(count)])
+
+    asyncio.run(run())
+    return recorder
+
+
+SCENARIOS = {
+    'sync': scenario_sync,
+    'threads': scenario_threads,
+    'reporter': scenario_reporter,
+    'bulk': scenario_bulk,
+    'async': scenario_async,
+}
+
+
+def run(scenarios, count, concurrency, server_options, client_options=None):
+    """
+    Runs each named scenario against a fresh stub server and returns the
+    machine-readable results.
+    """
+    results = []
+    for name in scenarios:
+        with StubServer(**server_options) as server:
+            def client_factory():
+                client = AndonAppClient('Demo', 'api-token', pool_maxsize=concurrency,
+                        **(client_options or {}))
+                client.endpoint = server.endpoint + API_PATH
+                return client
+
+            started = time.perf_counter()
+            recorder = SCENARIOS[name](client_factory, count, concurrency)
+            duration = time.perf_counter() - started
+
+        result = summarize(name, recorder.latencies, recorder.errors, duration)
+        result['connections'] = len(server.connections)
+        results.append(result)
+
+    return {
+        'timestamp': time.time(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'events': count,
+        'concurrency': concurrency,
+        'server': server_options,
+        'results': results
+    }
+
+
+def format_results(report):
+    lines = ['{:<10} {:>8} {:>10} {:>9} {:>9} {:>9} {:>7}'.format(
+            'scenario', 'events', 'events/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors')]
+    for result in report['results']:
+        lines.append('{:<10} {:>8} {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>7}'.format(
+                result['scenario'], result['events'], result['events_per_second'],
+                result['latency_ms']['p50'], result['latency_ms']['p95'],
+                result['latency_ms']['p99'], sum(result['errors'].values())))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Andon client against a local stub.')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+            help='Scenario to run; may be repeated. Defaults to all.')
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--latency-jitter', type=float, default=0)
+    parser.add_argument('--error', action='append', metavar='NAME=RATE')
+    parser.add_argument('--drop-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    server_options = {
+        'latency': args.latency,
+        'latency_jitter': args.latency_jitter,
+        'errors': parse_errors(args.error),
+        'drop_rate': args.drop_rate,
+        'seed': args.seed
+    }
+    scenarios = args.scenario or sorted(SCENARIOS)
+    report = run(scenarios, args.events, args.concurrency, server_options)
+
+    print(format_results(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
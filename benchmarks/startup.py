@@ -0,0 +1,73 @@
+"""
+Measures what a short-lived script pays to send its first event: the time to
+``import andonapp`` and the latency of the first ``report_data`` call, which
+includes importing the transport and opening a connection. Each sample runs
+in a fresh interpreter against the local stub server, and the median of the
+samples is reported for every transport.
+
+Usage::
+
+    python -m benchmarks.startup [--samples N] [--transport requests --transport http]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from .stub_server import StubServer
+
+SCRIPT = '''
+import time
+started = time.perf_counter()
+import andonapp
+imported = time.perf_counter()
+client = andonapp.AndonAppClient('Demo', 'api-token', transport={transport!r})
+client.endpoint = {endpoint!r}
+client.report_data('line 1', 'station 1', 'PASS', 100)
+finished = time.perf_counter()
+print(imported - started, finished - imported)
+'''
+
+
+def sample(transport, endpoint):
+    output = subprocess.check_output([sys.executable, '-c',
+            SCRIPT.format(transport=transport, endpoint=endpoint)])
+    return [float(value) for value in output.split()]
+
+
+def run(transports, samples):
+    results = []
+    with StubServer() as server:
+        endpoint = server.endpoint + '/public/api/v1'
+        for transport in transports:
+            imports, first_calls = zip(*(sample(transport, endpoint) for _ in range(samples)))
+            results.append({
+                'transport': transport,
+                'import_ms': statistics.median(imports) * 1000,
+                'first_call_ms': statistics.median(first_calls) * 1000
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=10)
+    parser.add_argument('--transport', action='append', dest='transports')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run(args.transports or ['requests', 'http'], args.samples)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print('{:<10} {:>10} {:>14} {:>10}'.format('transport', 'import ms', 'first call ms', 'total ms'))
+    for result in results:
+        print('{:<10} {:>10.1f} {:>14.1f} {:>10.1f}'.format(result['transport'],
+                result['import_ms'], result['first_call_ms'],
+                result['import_ms'] + result['first_call_ms']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Local stand-in for the Andon API used by the benchmarks and the tests. It
+implements ``/data/report`` and ``/station/update`` with configurable latency,
+injected error responses in the shapes understood by
+``raise_from_error_response``, and dropped connections.
+
+Usage::
+
+    python -m benchmarks.stub_server --port 8080 --latency 0.02 \\
+        --error INTERNAL_ERROR=0.01 --error status:401=0.001 --drop-rate 0.001
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+PATHS = ('/data/report', '/station/update')
+
+# Error bodies keyed by the names accepted in ``errors``. Andon reports most
+# failures with an errorType; authentication and unexpected failures come back
+# in Spring's status shape.
+ERRORS = {
+    'BAD_REQUEST': (400, {'errorType': 'BAD_REQUEST', 'errorMessage': 'Bad request'}),
+    'INVALID_REQUEST': (400, {'errorType': 'INVALID_REQUEST', 'errorMessage': 'Invalid request'}),
+    'RESOURCE_NOT_FOUND': (400, {'errorType': 'RESOURCE_NOT_FOUND', 'errorMessage': 'Station not found.'}),
+    'UNAUTHORIZED_REQUEST': (401, {'errorType': 'UNAUTHORIZED_REQUEST', 'errorMessage': 'Unauthorized'}),
+    'INTERNAL_ERROR': (500, {'errorType': 'INTERNAL_ERROR', 'errorMessage': 'Internal error'}),
+    'status:400': (400, {'status': 400, 'error': 'Bad Request', 'message': 'Bad request'}),
+    'status:401': (401, {'status': 401, 'error': 'Unauthorized', 'message': 'Unauthorized'}),
+    'status:500': (500, {'status': 500, 'error': 'Internal Server Error', 'message': 'Internal error'}),
+    'status:503': (503, {'status': 503, 'error': 'Service Unavailable', 'message': 'Unavailable'}),
+}
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP/1.1 server imitating the Andon API, used by the benchmarks
+    and by tests that need a real socket. Every request is recorded along with
+    the client address of the connection it arrived on.
+
+    Parameters
+    ----------
+    host : str, optional
+        Address to listen on
+    port : int, optional
+        Port to listen on; 0 picks a free port
+    latency : float, optional
+        Seconds to wait before answering each request
+    latency_jitter : float, optional
+        Extra random wait of up to this many seconds
+    errors : dict, optional
+        Maps names in ``ERRORS`` to the fraction of requests answered with
+        that error
+    drop_rate : float, optional
+        Fraction of requests whose connection is closed without an answer
+    seed : int, optional
+        Seed for the random choices, for repeatable runs
+    status : int, optional
+        Status of every other answer
+    body : dict or bytes, optional
+        Body of every other answer; bytes are sent as an HTML page, like a
+        proxy's error page
+    headers : dict, optional
+        Headers added to every answer
+    rejected_encodings : tuple, optional
+        Content-Encodings answered with 415
+    ssl_context : ssl.SSLContext, optional
+        Accept connections over TLS
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, latency_jitter=0,
+            errors=None, drop_rate=0, seed=None, status=200, body=None, headers=None,
+            rejected_encodings=(), ssl_context=None):
+        HTTPServer.__init__(self, (host, port), StubHandler)
+        self.tls = ssl_context is not None
+        if self.tls:
+            self.socket = ssl_context.wrap_socket(self.socket, server_side=True)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.errors = dict(errors or {})
+        self.drop_rate = drop_rate
+        self.status = status
+        self.body = body if body is not None else {}
+        self.headers = dict(headers or {})
+        self.rejected_encodings = rejected_encodings
+
+        unknown = set(self.errors) - set(ERRORS)
+        if unknown:
+            raise ValueError("Unknown errors: {}".format(', '.join(sorted(unknown))))
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.counts = {}
+        self.connections = set()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def endpoint(self):
+        return '{}://{}:{}'.format('https' if self.tls else 'http', *self.server_address[:2])
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def record(self, client_address, path, headers, body):
+        with self._lock:
+            self.connections.add(client_address)
+            self.requests.append((path, headers, body))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finish(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def choose_outcome(self):
+        """
+        Picks how to answer the next request: 'ok', 'drop', or an error name,
+        along with how long to wait first.
+        """
+        with self._lock:
+            roll = self._random.random()
+            delay = self.latency + self._random.random() * self.latency_jitter
+
+        outcome = 'ok'
+        if roll < self.drop_rate:
+            outcome = 'drop'
+        else:
+            roll -= self.drop_rate
+            for name, rate in sorted(self.errors.items()):
+                if roll < rate:
+                    outcome = name
+                    break
+                roll -= rate
+
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        return outcome, delay
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        # Headers and body are flushed separately; without this, delayed ACKs
+        # add ~40ms to every response.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        self.server.record(self.client_address, self.path, dict(self.headers), body)
+
+        try:
+            if self.path.split('?', 1)[0].rsplit('/public/api/v1', 1)[-1] not in PATHS:
+                self._respond(404, {'status': 404, 'error': 'Not Found', 'message': 'Not found'})
+                return
+
+            outcome, delay = self.server.choose_outcome()
+            if delay:
+                time.sleep(delay)
+        finally:
+            self.server.finish()
+
+        if outcome == 'drop':
+            self.close_connection = True
+        elif outcome != 'ok':
+            self._respond(*ERRORS[outcome])
+        elif self.headers.get('Content-Encoding') in self.server.rejected_encodings:
+            self._respond(415, {'status': 415, 'error': 'Unsupported Media Type',
+                    'message': 'Unsupported Media Type'})
+        else:
+            self._respond(self.server.status, self.server.body)
+
+    def _respond(self, status, body):
+        if isinstance(body, bytes):
+            payload, content_type = body, 'text/html'
+        else:
+            payload, content_type = json.dumps(body).encode('utf-8'), 'application/json'
+        self.send_response(status)
+        for name, value in self.server.headers.items():
+            self.send_header(name, value)
+        if status in (204, 304):
+            # Responses that never have a body, so no Content-Length either.
+            self.end_headers()
+            return
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def parse_errors(values):
+    errors = {}
+    for value in values or ():
+        name, _, rate = value.partition('=')
+        errors[name] = float(rate)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local Andon API stub.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--latency-jitter', type=float, default=0)
+    parser.add_argument('--error', action='append', metavar='NAME=RATE',
+            help='Answer RATE of requests with error NAME ({})'.format(', '.join(sorted(ERRORS))))
+    parser.add_argument('--drop-rate', type=float, default=0)
+    args = parser.parse_args(argv)
+
+    server = StubServer(args.host, args.port, args.latency, args.latency_jitter,
+            parse_errors(args.error), args.drop_rate)
+    print('Serving Andon stub on {}/public/api/v1'.format(server.endpoint))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
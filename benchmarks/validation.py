@@ -0,0 +1,52 @@
+"""
+Measures the per-event cost of client-side validation.
+
+Usage::
+
+    python -m benchmarks.validation [--number N]
+"""
+
+import argparse
+import timeit
+
+from andonapp.validation import StationRegistry, Validator
+
+REPORT = {
+    'orgName': 'Demo',
+    'lineName': 'line 1',
+    'stationName': 'station 1',
+    'passResult': 'FAIL',
+    'processTimeSeconds': 100,
+    'failReason': 'Test Failure',
+    'failNotes': 'notes'
+}
+
+STATUS = {
+    'orgName': 'Demo',
+    'lineName': 'line 1',
+    'stationName': 'station 1',
+    'statusColor': 'RED',
+    'statusReason': 'Missing parts',
+    'statusNotes': None
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark request validation.')
+    parser.add_argument('--number', type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    registry = StationRegistry(lambda: [('line {}'.format(l), 'station {}'.format(s))
+            for l in range(10) for s in range(50)], ttl=None)
+    cases = [
+        ('report', Validator().validate_report, REPORT),
+        ('status', Validator().validate_status, STATUS),
+        ('report+registry', Validator(registry).validate_report, REPORT),
+    ]
+    for name, validate, request in cases:
+        seconds = min(timeit.repeat(lambda: validate(request), number=args.number, repeat=3))
+        print('{:<16} {:6.2f} us/event'.format(name, seconds / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares the request body bytes sent per event in the default payload shape,
+with null fields left out (``compact=True``), and compact and gzip-compressed
+(``compress_threshold``), over a mix of passing reports, failing reports with
+notes, and status updates. Sizes are of bodies only; HTTP headers are the same
+in every mode apart from ``Content-Encoding``.
+
+Usage::
+
+    python -m benchmarks.wire_size [--notes-length N] [--json]
+"""
+
+import argparse
+import json
+
+from andonapp.encoding import compact, get_encoder, gzip_body
+
+
+def events(notes_length):
+    notes = ('Operator notes. ' * (notes_length // 16 + 1))[:notes_length]
+    return {
+        'report (pass)': {
+            'orgName': 'Demo', 'lineName': 'line 1', 'stationName': 'station 1',
+            'passResult': 'PASS', 'processTimeSeconds': 120,
+            'failReason': None, 'failNotes': None
+        },
+        'report (fail)': {
+            'orgName': 'Demo', 'lineName': 'line 1', 'stationName': 'station 1',
+            'passResult': 'FAIL', 'processTimeSeconds': 120,
+            'failReason': 'Torque out of range', 'failNotes': notes or None
+        },
+        'status': {
+            'orgName': 'Demo', 'lineName': 'line 1', 'stationName': 'station 1',
+            'statusColor': 'RED', 'statusReason': 'Missing parts', 'statusNotes': None
+        },
+    }
+
+
+def run(notes_length, encoder=None):
+    encode = get_encoder(encoder)
+    results = []
+    for name, request in events(notes_length).items():
+        body = encode(request)
+        compact_body = encode(compact(request))
+        results.append({
+            'event': name,
+            'default': len(body),
+            'compact': len(compact_body),
+            'compact_gzip': len(gzip_body(compact_body))
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--notes-length', type=int, default=400,
+            help='Length of the notes on failing reports')
+    parser.add_argument('--encoder', help="JSON encoder, such as 'json' or 'orjson'")
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args(argv)
+
+    results = run(args.notes_length, args.encoder)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print('{:<14} {:>8} {:>8} {:>13}'.format('event', 'default', 'compact', 'compact+gzip'))
+    for result in results:
+        print('{:<14} {:>8} {:>8} {:>13}'.format(result['event'], result['default'],
+                result['compact'], result['compact_gzip']))
+
+
+if __name__ == '__main__':
+    main()
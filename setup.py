@@ -26,6 +26,12 @@ REQUIRED = [
     'requests'
 ]
 
+# What packages are optional?
+EXTRAS = {
+    'async': ['httpx'],
+    'http2': ['httpx[http2]'],
+}
+
 # The rest you shouldn't have to touch too much :)
 # ------------------------------------------------
 # Except, perhaps the License and Trove Classifiers!
@@ -94,9 +100,17 @@ setup(
     author_email=EMAIL,
     python_requires=REQUIRES_PYTHON,
     url=URL,
-    packages=find_packages(exclude=('tests',)),
+    packages=find_packages(exclude=('tests', 'benchmarks')),
 	test_suite='tests',
     install_requires=REQUIRED,
+    extras_require=EXTRAS,
+    entry_points={
+        'console_scripts': [
+            'andonapp-agent=andonapp.agent:main',
+            'andonapp-import=andonapp.importer:main',
+            'andonapp-replay=andonapp.traffic:main',
+        ],
+    },
     include_package_data=True,
     license='MIT',
     classifiers=[
@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from andonapp import AndonAppClient
+from andonapp.agent import Agent, format_event, parse_event, send_line, send_report, send_status
+from benchmarks.stub_server import StubServer
+
+
+class TestEventFormat(unittest.TestCase):
+    def test_parse_report(self):
+        self.assertEqual(('report_data', {
+            'line_name': 'line 1',
+            'station_name': 'station 1',
+            'pass_result': 'FAIL',
+            'process_time_seconds': 120,
+            'fail_reason': 'Test Failure',
+            'fail_notes': None
+        }), parse_event('report|line 1|station 1|FAIL|120|Test Failure\n'))
+
+    def test_parse_short_status(self):
+        self.assertEqual(('update_station_status', {
+            'line_name': 'line 1',
+            'station_name': 'station 1',
+            'status_color': 'RED',
+            'status_reason': None,
+            'status_notes': None
+        }), parse_event('S|line 1|station 1|RED'))
+
+    def test_parse_fractional_process_time(self):
+        self.assertEqual(1.5, parse_event('R|l|s|PASS|1.5')[1]['process_time_seconds'])
+
+    def test_round_trips_escaped_fields(self):
+        line = format_event('update_station_status', line_name='line|1',
+                station_name='station\\1', status_color='YELLOW',
+                status_notes='two\nlines')
+
+        self.assertEqual('status|line\\|1|station\\\\1|YELLOW||two\\nlines', line)
+        self.assertEqual({
+            'line_name': 'line|1',
+            'station_name': 'station\\1',
+            'status_color': 'YELLOW',
+            'status_reason': None,
+            'status_notes': 'two\nlines'
+        }, parse_event(line)[1])
+
+    def test_round_trips_control_characters(self):
+        notes = 'cr\rvt\x0bfs\x1cnel\x85ls\u2028crlf\r\n'
+        line = format_event('report_data', line_name='line 1', station_name='station 1',
+                pass_result='FAIL', process_time_seconds=3, fail_notes=notes)
+
+        self.assertEqual([line], line.split('\n'))
+        self.assertNotIn('\r', line)
+        self.assertEqual(notes, parse_event(line)[1]['fail_notes'])
+
+    def test_rejects_malformed_lines(self):
+        for line in ('report|line 1|station 1|PASS', 'x|a|b|c', 'R|l|s|PASS|soon',
+                'R|l|s|PASS|nan', 'R|l|s|PASS|inf', 'R|l|s|PASS|-Infinity',
+                'S|l|s|RED|a|b|c'):
+            with self.assertRaises(ValueError):
+                parse_event(line)
+
+
+class TestAgent(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.client = AndonAppClient('Demo', 'api-token')
+        self.client.endpoint = self.server.endpoint
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_forwards_udp_events(self):
+        agent = Agent(self.client, ('127.0.0.1', 0)).start()
+
+        send_report('line 1', 'station 1', 'PASS', 120, address=agent.address)
+        send_status('line 1', 'station 1', 'RED', 'Missing parts', address=agent.address)
+        send_line('bogus\nR|line 1|station 2|FAIL|30', address=agent.address)
+        self._wait_for(lambda: agent.received == 4 and agent.flush(1))
+        agent.stop(1)
+
+        self.assertEqual(1, agent.malformed)
+        self.assertEqual(3, agent.sent)
+        bodies = sorted((path, json.loads(body.decode('utf-8')).get('stationName'))
+                for path, headers, body in self.server.requests)
+        self.assertEqual([('/data/report', 'station 1'), ('/data/report', 'station 2'),
+                ('/station/update', 'station 1')], bodies)
+
+    def test_splits_datagrams_on_newlines_only(self):
+        agent = Agent(self.client, ('127.0.0.1', 0))
+
+        agent.handle('R|line 1|station 1|FAIL|30||jammed\rcleared\u2028ok\r\n'
+                'S|line 1|station 1|GREEN||\x1c\x0b\n'.encode('utf-8'))
+        agent.flush(1)
+        agent.stop(1)
+
+        self.assertEqual(2, agent.received)
+        self.assertEqual(0, agent.malformed)
+        bodies = [json.loads(body.decode('utf-8')) for path, headers, body in self.server.requests]
+        notes = sorted(body.get('failNotes') or body.get('statusNotes') for body in bodies)
+        self.assertEqual(['\x1c\x0b', 'jammed\rcleared\u2028ok'], notes)
+
+    def test_forwards_unix_socket_events(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'agent.sock')
+        agent = Agent(self.client, path).start()
+
+        send_status('line 1', 'station 1', 'GREEN', address=path)
+        self._wait_for(lambda: agent.received == 1 and agent.flush(1))
+        agent.stop(1)
+        shutil.rmtree(directory)
+
+        self.assertEqual(1, agent.sent)
+
+    def _wait_for(self, condition):
+        for _ in range(200):
+            if condition():
+                return
+            time.sleep(0.01)
+        self.fail('Condition not met')
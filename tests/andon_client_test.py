@@ -1,7 +1,11 @@
+import json
 import unittest
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 from andonapp import AndonAppClient
+from andonapp.board import Board
 from andonapp.exceptions import *
+from andonapp.retry import RetryPolicy
+from benchmarks.stub_server import StubServer
 
 
 class TestAndonClient(unittest.TestCase):
@@ -20,7 +24,7 @@ class TestAndonClient(unittest.TestCase):
             'Authorization': 'Bearer ' + self.api_token
         }
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_report_data_when_valid_pass_request(self, mock_post):
         self._expect_post(mock_post, 200, {})
 
@@ -41,7 +45,7 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.report_data_url, request)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_report_data_when_valid_fail_request(self, mock_post):
         self._expect_post(mock_post, 200, {})
 
@@ -64,7 +68,7 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.report_data_url, request)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_fail_report_data_when_missing_line_name(self, mock_post):
         self._expect_post(mock_post, 400, {
                 'errorType': 'INVALID_REQUEST',
@@ -91,7 +95,7 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.report_data_url, request)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_fail_report_data_when_station_not_found(self, mock_post):
         self._expect_post(mock_post, 400, {
                 'errorType': 'RESOURCE_NOT_FOUND',
@@ -118,7 +122,7 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.report_data_url, request)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_fail_report_data_when_invalid_pass_result(self, mock_post):
         self._expect_post(mock_post, 400, {
                 'errorType': 'INVALID_REQUEST',
@@ -145,7 +149,7 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.report_data_url, request)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_fail_report_data_when_unauthorized(self, mock_post):
         self._expect_post(mock_post, 401, {
                 'timestamp': '2018-03-07T16:15:19.033+0000',
@@ -175,7 +179,7 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.report_data_url, request)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_fail_report_data_when_unknown_failure(self, mock_post):
         self._expect_post(mock_post, 404, {})
 
@@ -199,7 +203,7 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.report_data_url, request)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_update_station_status_success(self, mock_post):
         self._expect_post(mock_post, 200, {})
 
@@ -220,7 +224,7 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.update_status_url, request)
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_update_station_status_to_green_when_valid(self, mock_post):
         self._expect_post(mock_post, 200, {})
 
@@ -241,9 +245,103 @@ class TestAndonClient(unittest.TestCase):
 
         self._assert_post_called(mock_post, self.update_status_url, request)
 
+    @patch('requests.Session.post')
+    def test_sends_to_changed_endpoint(self, mock_post):
+        self._expect_post(mock_post, 200, {})
+
+        self.client.endpoint = 'http://localhost:8080/api'
+        self.client.update_station_status('line 1', 'station 1', 'GREEN')
+
+        self.assertEqual('http://localhost:8080/api/station/update', mock_post.call_args[0][0])
+
+    @patch('requests.Session.post')
+    def test_uses_custom_json_encoder(self, mock_post):
+        self._expect_post(mock_post, 200, {})
+
+        client = AndonAppClient(self.org_name, self.api_token,
+                json_encoder=lambda request: b'{"custom":true}')
+        client.report_data('line 1', 'station 1', 'PASS', 100)
+
+        self.assertEqual(b'{"custom":true}', mock_post.call_args[1]['data'])
+
+    def test_reuses_pooled_connection_across_calls(self):
+        with StubServer() as server:
+            with AndonAppClient(self.org_name, self.api_token) as client:
+                client.endpoint = server.endpoint
+                client.report_data('line 1', 'station 1', 'PASS', 100)
+                client.update_station_status('line 1', 'station 1', 'GREEN')
+                client.report_data('line 1', 'station 1', 'FAIL', 100)
+
+        self.assertEqual(3, len(server.requests))
+        self.assertEqual(1, len(server.connections))
+
+    def test_opens_new_connection_per_call_without_keep_alive(self):
+        with StubServer() as server:
+            with AndonAppClient(self.org_name, self.api_token, keep_alive=False) as client:
+                client.endpoint = server.endpoint
+                client.report_data('line 1', 'station 1', 'PASS', 100)
+                client.report_data('line 1', 'station 1', 'PASS', 100)
+
+        self.assertEqual(2, len(server.connections))
+
+    def test_close_discards_pool(self):
+        with StubServer() as server:
+            client = AndonAppClient(self.org_name, self.api_token)
+            client.endpoint = server.endpoint
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+            client.close()
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+            client.close()
+
+        self.assertEqual(2, len(server.connections))
+
+    def test_reporter_sends_through_client(self):
+        with StubServer() as server:
+            with AndonAppClient(self.org_name, self.api_token) as client:
+                client.endpoint = server.endpoint
+                with client.reporter(workers=2) as reporter:
+                    reporter.report_data('line 1', 'station 1', 'PASS', 100)
+                    reporter.update_station_status('line 1', 'station 1', 'RED')
+
+        self.assertEqual(['/data/report', '/station/update'],
+                sorted(request[0] for request in server.requests))
+
+    def test_send_prepared_request(self):
+        request = {
+            'orgName': self.org_name,
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'statusColor': 'RED'
+        }
+        with StubServer(status=500, body={
+                    'errorType': 'INTERNAL_ERROR',
+                    'errorMessage': 'oops'
+                }) as server:
+            board = Board()
+            client = AndonAppClient(self.org_name, self.api_token, board=board,
+                    retry_policy=RetryPolicy(max_attempts=2, backoff_base=0))
+            client.endpoint = server.endpoint
+
+            with self.assertRaises(AndonInternalErrorException):
+                client.send(AndonAppClient.UPDATE_STATUS_PATH, request)
+            server.status = 200
+            client.send(AndonAppClient.UPDATE_STATUS_PATH, request)
+            client.close()
+
+        self.assertEqual(3, len(server.requests))
+        self.assertEqual(request, json.loads(server.requests[-1][2].decode('utf-8')))
+        self.assertEqual('RED', board.get('line 1', 'station 1').status_color)
+
+    def test_send_rejects_unknown_path(self):
+        with self.assertRaises(ValueError):
+            self.client.send('/station/delete', {})
+
     def _expect_post(self, mock, status_code, response):
         mock.return_value.status_code = status_code
         mock.return_value.json = lambda: response
 
     def _assert_post_called(self, mock, url, request):
-        mock.assert_called_with(url, json=request, headers=self.headers)
+        mock.assert_called_with(url, data=ANY, headers=self.headers, timeout=(
+                AndonAppClient.DEFAULT_CONNECT_TIMEOUT, AndonAppClient.DEFAULT_READ_TIMEOUT))
+        body = mock.call_args[1]['data']
+        self.assertEqual(request, json.loads(body.decode('utf-8')))
@@ -0,0 +1,157 @@
+import asyncio
+import gzip
+import json
+import unittest
+from andonapp import AsyncAndonAppClient
+from andonapp.exceptions import *
+from benchmarks.stub_server import StubServer
+
+
+class TestAsyncAndonClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.org_name = 'Demo'
+        self.api_token = 'api-token'
+
+        self.server = StubServer().start()
+        self.client = AsyncAndonAppClient(self.org_name, self.api_token)
+        self.client.endpoint = self.server.endpoint + '/public/api/v1'
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.server.stop()
+
+    async def test_report_data(self):
+        await self.client.report_data(line_name='line 1',
+                station_name='station 1',
+                pass_result='FAIL',
+                process_time_seconds=200,
+                fail_reason='Test Failure',
+                fail_notes='notes')
+
+        path, headers, body = self.server.requests[0]
+        self.assertEqual('/public/api/v1/data/report', path)
+        self.assertEqual('Bearer ' + self.api_token, headers['Authorization'])
+        self.assertEqual({
+            'orgName': self.org_name,
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'passResult': 'FAIL',
+            'processTimeSeconds': 200,
+            'failReason': 'Test Failure',
+            'failNotes': 'notes'
+        }, json.loads(body.decode('utf-8')))
+
+    async def test_update_station_status(self):
+        await self.client.update_station_status(line_name='line 1',
+                station_name='station 1',
+                status_color='YELLOW',
+                status_reason='Missing Parts')
+
+        path, headers, body = self.server.requests[0]
+        self.assertEqual('/public/api/v1/station/update', path)
+        self.assertEqual({
+            'orgName': self.org_name,
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'statusColor': 'YELLOW',
+            'statusReason': 'Missing Parts',
+            'statusNotes': None
+        }, json.loads(body.decode('utf-8')))
+
+    async def test_reuses_pooled_connection_across_calls(self):
+        for _ in range(3):
+            await self.client.report_data('line 1', 'station 1', 'PASS', 100)
+
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual(1, len(self.server.connections))
+
+    async def test_limits_requests_in_flight(self):
+        self.server.latency = 0.05
+        client = AsyncAndonAppClient(self.org_name, self.api_token, max_in_flight=2)
+        client.endpoint = self.server.endpoint
+
+        await asyncio.gather(*[
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+            for _ in range(6)])
+        await client.close()
+
+        self.assertEqual(6, len(self.server.requests))
+        self.assertEqual(2, self.server.max_in_flight)
+
+    async def test_fail_when_invalid_request(self):
+        self.server.status = 400
+        self.server.body = {
+            'errorType': 'INVALID_REQUEST',
+            'errorMessage': "'PAS' is not a valid pass result."
+        }
+
+        with self.assertRaisesRegex(AndonInvalidRequestException, 'PAS'):
+            await self.client.report_data('line 1', 'station 1', 'PAS', 100)
+
+    async def test_fail_when_unauthorized(self):
+        self.server.status = 401
+        self.server.body = {
+            'status': 401,
+            'error': 'Unauthorized',
+            'message': 'Unauthorized'
+        }
+
+        with self.assertRaises(AndonUnauthorizedRequestException):
+            await self.client.update_station_status('line 1', 'station 1', 'RED')
+
+    async def test_fail_when_unreachable(self):
+        client = AsyncAndonAppClient(self.org_name, self.api_token)
+        client.endpoint = 'http://127.0.0.1:1'
+
+        with self.assertRaises(AndonConnectionException):
+            await client.report_data('line 1', 'station 1', 'PASS', 100)
+
+    async def test_fail_when_unknown_failure(self):
+        self.server.status = 404
+
+        with self.assertRaisesRegex(AndonAppException, 'Status 404'):
+            await self.client.report_data('line 1', 'station 1', 'PASS', 100)
+
+    async def test_no_content_response_does_not_wait_for_body(self):
+        self.server.status = 204
+        client = AsyncAndonAppClient(self.org_name, self.api_token, read_timeout=2)
+        client.endpoint = self.server.endpoint
+
+        started = asyncio.get_running_loop().time()
+        with self.assertRaisesRegex(AndonAppException, 'Status 204'):
+            await client.report_data('line 1', 'station 1', 'PASS', 100)
+        await client.close()
+
+        self.assertLess(asyncio.get_running_loop().time() - started, 1)
+
+    async def test_fail_when_proxy_error_page(self):
+        self.server.status = 503
+        self.server.body = b'<html><body>503 Service Unavailable</body></html>'
+
+        with self.assertRaisesRegex(AndonInternalErrorException, 'Status 503'):
+            await self.client.report_data('line 1', 'station 1', 'PASS', 100)
+
+    async def test_fail_when_throttled(self):
+        self.server.status = 429
+        self.server.body = b'<html><body>429 Too Many Requests</body></html>'
+        self.server.headers = {'Retry-After': '5'}
+
+        with self.assertRaises(AndonThrottledException) as context:
+            await self.client.report_data('line 1', 'station 1', 'PASS', 100)
+        self.assertEqual(5, context.exception.retry_after)
+
+    async def test_compact_compressed_bodies(self):
+        self.server.rejected_encodings = ('gzip',)
+        client = AsyncAndonAppClient(self.org_name, self.api_token,
+                compact=True, compress_threshold=0)
+        client.endpoint = self.client.endpoint
+
+        await client.report_data('line 1', 'station 1', 'PASS', 100)
+        await client.report_data('line 1', 'station 1', 'PASS', 100)
+        await client.close()
+
+        (_, rejected_headers, rejected), (_, _, resent), (_, headers, body) = self.server.requests
+        self.assertEqual('gzip', rejected_headers['Content-Encoding'])
+        self.assertEqual(resent, gzip.decompress(rejected))
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertNotIn('failReason', json.loads(body.decode('utf-8')))
@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import patch
+from andonapp import AndonAppClient
+from andonapp.board import Board
+from andonapp.exceptions import *
+
+
+def status(station, color, reason=None):
+    return {'lineName': 'line 1', 'stationName': station, 'statusColor': color,
+            'statusReason': reason, 'statusNotes': None}
+
+
+def report(station, result, seconds):
+    return {'lineName': 'line 1', 'stationName': station, 'passResult': result,
+            'processTimeSeconds': seconds, 'failReason': None, 'failNotes': None}
+
+
+class TestBoard(unittest.TestCase):
+    def setUp(self):
+        self.board = Board()
+        self.changes = []
+
+    def test_tracks_status_and_report(self):
+        self.board.apply_status(status('station 1', 'RED', 'Missing parts'))
+        self.board.apply_report(report('station 1', 'FAIL', 30))
+
+        state = self.board.get('line 1', 'station 1')
+        self.assertEqual(('line 1', 'station 1', 'RED', 'Missing parts', None),
+                state[:5])
+        self.assertEqual(('FAIL', 30), (state.pass_result, state.process_time_seconds))
+        self.assertIsNotNone(state.status_time)
+        self.assertIsNone(self.board.get('line 1', 'station 2'))
+
+    def test_snapshot_filters_by_line(self):
+        self.board.apply_status(status('station 1', 'GREEN'))
+        self.board.apply_status(dict(status('station 1', 'RED'), lineName='line 2'))
+
+        self.assertEqual(2, len(self.board.snapshot()))
+        self.assertEqual(['RED'], [state.status_color
+                for state in self.board.snapshot('line 2').values()])
+
+    def test_snapshot_is_a_copy(self):
+        snapshot = self.board.snapshot()
+        self.board.apply_status(status('station 1', 'GREEN'))
+
+        self.assertEqual({}, snapshot)
+
+    def test_subscribers_see_changes(self):
+        self.board.subscribe(lambda old, new: self.changes.append((old, new)))
+
+        self.board.apply_status(status('station 1', 'GREEN'))
+        self.board.apply_status(status('station 1', 'GREEN'))
+        self.board.apply_status(status('station 1', 'YELLOW'))
+        self.board.apply_report(report('station 1', 'PASS', 10))
+
+        self.assertEqual(3, len(self.changes))
+        self.assertIsNone(self.changes[0][0])
+        self.assertEqual(('GREEN', 'YELLOW'),
+                (self.changes[1][0].status_color, self.changes[1][1].status_color))
+        self.assertEqual('PASS', self.changes[2][1].pass_result)
+
+    def test_filtered_subscription_and_unsubscribe(self):
+        unsubscribe = self.board.subscribe(
+                lambda old, new: self.changes.append(new.station_name),
+                line_name='line 1', station_name='station 2')
+
+        self.board.apply_status(status('station 1', 'RED'))
+        self.board.apply_status(status('station 2', 'RED'))
+        unsubscribe()
+        self.board.apply_status(status('station 2', 'GREEN'))
+
+        self.assertEqual(['station 2'], self.changes)
+
+    def test_failing_subscriber_does_not_stop_others(self):
+        def fail(old, new):
+            raise RuntimeError('boom')
+        self.board.subscribe(fail)
+        self.board.subscribe(lambda old, new: self.changes.append(new))
+
+        with self.assertLogs('andonapp.board', 'ERROR'):
+            self.board.apply_status(status('station 1', 'RED'))
+        self.assertEqual(1, len(self.changes))
+
+
+class TestClientBoard(unittest.TestCase):
+    def setUp(self):
+        self.client = AndonAppClient('Demo', 'api-token', board=Board())
+
+    @patch('requests.Session.post')
+    def test_applies_delivered_events(self, mock_post):
+        mock_post.return_value.status_code = 200
+
+        self.client.update_station_status('line 1', 'station 1', 'RED', 'Jam')
+        self.client.report_data('line 1', 'station 1', 'PASS', 12)
+
+        state = self.client.board.get('line 1', 'station 1')
+        self.assertEqual(('RED', 'Jam', 'PASS', 12), (state.status_color,
+                state.status_reason, state.pass_result, state.process_time_seconds))
+
+    @patch('requests.Session.post')
+    def test_ignores_failed_events(self, mock_post):
+        mock_post.return_value.status_code = 400
+        mock_post.return_value.json.return_value = {
+                'errorType': 'RESOURCE_NOT_FOUND', 'errorMessage': 'Station not found.'}
+
+        with self.assertRaises(AndonResourceNotFoundException):
+            self.client.update_station_status('line 1', 'station 9', 'RED')
+        self.assertEqual(0, len(self.client.board))
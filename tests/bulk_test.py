@@ -0,0 +1,100 @@
+import itertools
+import threading
+import time
+import unittest
+from andonapp import AndonAppClient
+from andonapp.bulk import dispatch
+from andonapp.exceptions import *
+from benchmarks.stub_server import StubServer
+
+
+class TestDispatch(unittest.TestCase):
+    def test_yields_results_in_input_order(self):
+        def call(n):
+            time.sleep(0.01 * (5 - n))
+            if n == 2:
+                raise AndonInvalidRequestException('bad')
+
+        results = list(dispatch(call, ({'n': n} for n in range(5)), 4))
+
+        self.assertEqual([0, 1, 2, 3, 4], [result.index for result in results])
+        self.assertEqual([True, True, False, True, True], [result.ok for result in results])
+        self.assertIsInstance(results[2].exception, AndonInvalidRequestException)
+        self.assertEqual({'n': 2}, results[2].item)
+
+    def test_yields_results_in_completion_order(self):
+        def call(n):
+            time.sleep(0.05 if n == 0 else 0)
+
+        results = list(dispatch(call, ({'n': n} for n in range(3)), 3, ordered=False))
+
+        self.assertEqual(0, results[-1].index)
+        self.assertEqual([0, 1, 2], sorted(result.index for result in results))
+
+    def test_consumes_input_lazily(self):
+        consumed = []
+
+        def items():
+            for n in itertools.count():
+                consumed.append(n)
+                yield {'n': n}
+
+        results = dispatch(lambda n: None, items(), 2)
+        for result in itertools.islice(results, 3):
+            pass
+        results.close()
+
+        self.assertLess(len(consumed), 10)
+
+    def test_bounds_parallelism(self):
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def call(n):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.01)
+            with lock:
+                state['active'] -= 1
+
+        list(dispatch(call, ({'n': n} for n in range(20)), 3))
+
+        self.assertEqual(3, state['peak'])
+
+
+class TestClientBulk(unittest.TestCase):
+    def test_report_many(self):
+        events = ({
+            'line_name': 'line 1',
+            'station_name': 'station 1',
+            'pass_result': 'PASS',
+            'process_time_seconds': n
+        } for n in range(10))
+
+        with StubServer() as server:
+            with AndonAppClient('Demo', 'api-token') as client:
+                client.endpoint = server.endpoint
+                results = list(client.report_many(events, max_workers=4))
+
+        self.assertEqual(list(range(10)), [result.index for result in results])
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(10, len(server.requests))
+        self.assertLessEqual(len(server.connections), 4)
+
+    def test_update_many_reports_failures(self):
+        updates = [{
+            'line_name': 'line 1',
+            'station_name': 'station 1',
+            'status_color': 'PURPLE'
+        }]
+
+        with StubServer(status=400, body={
+                    'errorType': 'INVALID_REQUEST',
+                    'errorMessage': 'bad color'
+                }) as server:
+            with AndonAppClient('Demo', 'api-token') as client:
+                client.endpoint = server.endpoint
+                results = list(client.update_many(updates))
+
+        self.assertIsInstance(results[0].exception, AndonInvalidRequestException)
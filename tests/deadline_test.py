@@ -0,0 +1,96 @@
+import time
+import unittest
+from andonapp import AndonAppClient, AsyncAndonAppClient
+from andonapp.deadline import Deadline, as_deadline
+from andonapp.exceptions import *
+from andonapp.retry import RetryPolicy
+from benchmarks.stub_server import StubServer
+
+
+class TestDeadline(unittest.TestCase):
+    def test_remaining_and_expiry(self):
+        deadline = Deadline(0.05)
+
+        self.assertFalse(deadline.expired)
+        self.assertTrue(0 < deadline.remaining() <= 0.05)
+        deadline.check()
+        time.sleep(0.06)
+        self.assertTrue(deadline.expired)
+        self.assertEqual(0.0, deadline.remaining())
+        with self.assertRaises(AndonDeadlineExceededException):
+            deadline.check()
+
+    def test_clip(self):
+        deadline = Deadline(1)
+
+        self.assertEqual(0.5, deadline.clip(0.5))
+        self.assertLessEqual(deadline.clip(10), 1)
+        self.assertLessEqual(deadline.clip(None), 1)
+
+    def test_clip_raises_once_expired(self):
+        deadline = Deadline(0)
+
+        with self.assertRaises(AndonDeadlineExceededException):
+            deadline.clip(1)
+        with self.assertRaises(AndonDeadlineExceededException):
+            deadline.clip(None)
+
+    def test_as_deadline(self):
+        deadline = Deadline(1)
+
+        self.assertIsNone(as_deadline(None))
+        self.assertIs(deadline, as_deadline(deadline))
+        self.assertIsInstance(as_deadline(2), Deadline)
+
+    def test_deadline_exceeded_is_a_timeout(self):
+        self.assertTrue(issubclass(AndonDeadlineExceededException, AndonTimeoutException))
+        self.assertTrue(issubclass(AndonTimeoutException, AndonConnectionException))
+
+
+class TestClientTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(latency=0.3).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_read_timeout(self):
+        client = AndonAppClient('Demo', 'api-token', read_timeout=0.05)
+        client.endpoint = self.server.endpoint
+
+        with self.assertRaises(AndonTimeoutException):
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+        client.close()
+
+    def test_deadline_bounds_retries(self):
+        client = AndonAppClient('Demo', 'api-token',
+                retry_policy=RetryPolicy(max_attempts=5, backoff_base=0.01))
+        client.endpoint = self.server.endpoint
+
+        started = time.monotonic()
+        with self.assertRaises(AndonTimeoutException):
+            client.update_station_status('line 1', 'station 1', 'RED', deadline=0.1)
+        client.close()
+
+        self.assertLess(time.monotonic() - started, 0.25)
+
+
+class TestAsyncClientTimeouts(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = StubServer(latency=0.3).start()
+
+    async def asyncTearDown(self):
+        self.server.stop()
+
+    async def test_read_timeout(self):
+        async with AsyncAndonAppClient('Demo', 'api-token', read_timeout=0.05) as client:
+            client.endpoint = self.server.endpoint
+            with self.assertRaises(AndonTimeoutException):
+                await client.report_data('line 1', 'station 1', 'PASS', 100)
+
+    async def test_deadline(self):
+        async with AsyncAndonAppClient('Demo', 'api-token') as client:
+            client.endpoint = self.server.endpoint
+            with self.assertRaises(AndonDeadlineExceededException):
+                await client.update_station_status('line 1', 'station 1', 'RED',
+                        deadline=0.05)
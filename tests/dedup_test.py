@@ -0,0 +1,109 @@
+import time
+import unittest
+from unittest.mock import patch
+from andonapp import AndonAppClient
+from andonapp.dedup import DedupIndex
+from andonapp.exceptions import *
+from andonapp.reporter import BufferedReporter
+
+
+class TestDedupIndex(unittest.TestCase):
+    def setUp(self):
+        self.request = {
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'passResult': 'PASS',
+            'processTimeSeconds': 120
+        }
+
+    def test_flags_repeats(self):
+        index = DedupIndex()
+        key = index.fingerprint(self.request)
+
+        self.assertTrue(index.add(key))
+        self.assertFalse(index.add(key))
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1}, index.stats())
+
+    def test_fingerprint_covers_every_field(self):
+        index = DedupIndex()
+        other = dict(self.request, processTimeSeconds=121)
+
+        self.assertEqual(index.fingerprint(dict(self.request)), index.fingerprint(self.request))
+        self.assertNotEqual(index.fingerprint(self.request), index.fingerprint(other))
+
+    def test_event_id_replaces_fields(self):
+        index = DedupIndex()
+        other = dict(self.request, processTimeSeconds=121)
+
+        self.assertEqual(index.fingerprint(self.request, 'event 1'),
+                index.fingerprint(other, 'event 1'))
+        self.assertNotEqual(index.fingerprint(self.request, 'event 1'),
+                index.fingerprint(self.request, 'event 2'))
+
+    def test_forgets_after_window(self):
+        index = DedupIndex(window=0.02)
+        index.add('a')
+        time.sleep(0.03)
+
+        self.assertTrue(index.add('a'))
+        self.assertEqual(1, len(index))
+
+    def test_bounded_size_evicts_oldest(self):
+        index = DedupIndex(max_size=2)
+        for key in ('a', 'b', 'c'):
+            index.add(key)
+
+        self.assertEqual(2, len(index))
+        self.assertEqual(1, index.evictions)
+        self.assertTrue(index.add('a'))
+        self.assertFalse(index.add('c'))
+
+
+class TestClientDedup(unittest.TestCase):
+    def setUp(self):
+        self.dedup = DedupIndex()
+        self.client = AndonAppClient('Demo', 'api-token', dedup=self.dedup)
+
+    @patch('requests.Session.post')
+    def test_drops_repeated_reports(self, mock_post):
+        mock_post.return_value.status_code = 200
+
+        self.client.report_data('line 1', 'station 1', 'PASS', 120)
+        self.client.report_data('line 1', 'station 1', 'PASS', 120)
+        self.client.report_data('line 1', 'station 1', 'PASS', 121)
+
+        self.assertEqual(2, mock_post.call_count)
+        self.assertEqual(1, self.dedup.hits)
+
+    @patch('requests.Session.post')
+    def test_event_ids(self, mock_post):
+        mock_post.return_value.status_code = 200
+
+        self.client.report_data('line 1', 'station 1', 'PASS', 120, event_id=1)
+        self.client.report_data('line 1', 'station 1', 'PASS', 120, event_id=2)
+        self.client.report_data('line 1', 'station 1', 'PASS', 125, event_id=1)
+
+        self.assertEqual(2, mock_post.call_count)
+
+    @patch('requests.Session.post')
+    def test_failed_reports_may_be_sent_again(self, mock_post):
+        mock_post.return_value.status_code = 500
+        mock_post.return_value.json.return_value = {
+                'errorType': 'INTERNAL_ERROR', 'errorMessage': 'oops'}
+
+        with self.assertRaises(AndonInternalErrorException):
+            self.client.report_data('line 1', 'station 1', 'PASS', 120)
+        mock_post.return_value.status_code = 200
+        self.client.report_data('line 1', 'station 1', 'PASS', 120)
+
+        self.assertEqual(2, mock_post.call_count)
+
+    @patch('requests.Session.post')
+    def test_reporter_passes_event_id(self, mock_post):
+        mock_post.return_value.status_code = 200
+
+        with BufferedReporter(self.client) as reporter:
+            reporter.report_data('line 1', 'station 1', 'PASS', 120, event_id='a')
+            reporter.report_data('line 1', 'station 1', 'PASS', 130, event_id='a')
+
+        self.assertEqual(1, mock_post.call_count)
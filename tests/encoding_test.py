@@ -0,0 +1,136 @@
+import gzip
+import json
+import unittest
+from andonapp import AndonAppClient
+from andonapp.encoding import compact, get_encoder, gzip_body
+from andonapp.exceptions import AndonAppException
+from andonapp.metrics import Metrics
+from benchmarks.stub_server import StubServer
+
+REQUEST = {
+    'orgName': 'Demo',
+    'lineName': 'line 1',
+    'stationName': 'Station é',
+    'passResult': 'PASS',
+    'processTimeSeconds': 100,
+    'failReason': None,
+    'failNotes': None
+}
+
+
+class TestEncoding(unittest.TestCase):
+    def test_json_encoder(self):
+        body = get_encoder('json')(REQUEST)
+
+        self.assertIsInstance(body, bytes)
+        self.assertEqual(REQUEST, json.loads(body.decode('utf-8')))
+
+    def test_default_encoder_round_trips(self):
+        body = get_encoder()(REQUEST)
+
+        self.assertEqual(REQUEST, json.loads(body.decode('utf-8')))
+
+    def test_optional_encoders_round_trip(self):
+        for name in ('orjson', 'ujson'):
+            try:
+                encode = get_encoder(name)
+            except ValueError:
+                continue
+            self.assertEqual(REQUEST, json.loads(encode(REQUEST).decode('utf-8')))
+
+    def test_callable_encoder(self):
+        encode = lambda request: b'{}'
+
+        self.assertIs(encode, get_encoder(encode))
+
+    def test_unknown_encoder(self):
+        with self.assertRaises(ValueError):
+            get_encoder('yaml')
+
+
+class TestCompactBodies(unittest.TestCase):
+    def test_compact_drops_null_fields(self):
+        self.assertEqual({
+            'orgName': 'Demo',
+            'lineName': 'line 1',
+            'stationName': 'Station é',
+            'passResult': 'PASS',
+            'processTimeSeconds': 100
+        }, compact(REQUEST))
+
+    def test_compact_keeps_falsy_values(self):
+        request = {'processTimeSeconds': 0, 'failNotes': ''}
+
+        self.assertEqual(request, compact(request))
+
+    def test_gzip_body_round_trips(self):
+        body = get_encoder('json')(REQUEST)
+
+        self.assertEqual(body, gzip.decompress(gzip_body(body)))
+        self.assertEqual(gzip_body(body), gzip_body(body))
+
+
+class TestClientCompression(unittest.TestCase):
+    def report(self, client, fail_notes=None):
+        client.report_data('line 1', 'station 1', 'FAIL', 100,
+                fail_reason='Jam', fail_notes=fail_notes)
+
+    def test_compact_client_omits_null_fields(self):
+        with StubServer() as server:
+            client = AndonAppClient('Demo', 'api-token', compact=True)
+            client.endpoint = server.endpoint
+            self.report(client)
+            client.close()
+
+        body = json.loads(server.requests[0][2].decode('utf-8'))
+        self.assertNotIn('failNotes', body)
+        self.assertEqual('Jam', body['failReason'])
+
+    def test_compresses_bodies_above_threshold(self):
+        metrics = Metrics()
+        notes = 'operator notes ' * 50
+
+        with StubServer() as server:
+            client = AndonAppClient('Demo', 'api-token', compress_threshold=256,
+                    metrics=metrics)
+            client.endpoint = server.endpoint
+            self.report(client)
+            self.report(client, fail_notes=notes)
+            client.close()
+
+        small, large = server.requests
+        self.assertNotIn('Content-Encoding', small[1])
+        self.assertEqual('gzip', large[1]['Content-Encoding'])
+        self.assertEqual(notes, json.loads(gzip.decompress(large[2]).decode('utf-8'))['failNotes'])
+
+        text = metrics.to_prometheus()
+        wire = int(text.split('andon_request_wire_bytes_total{path="/data/report"} ')[1].split()[0])
+        sent = int(text.split('andon_request_bytes_total{path="/data/report"} ')[1].split()[0])
+        self.assertEqual(len(small[2]) + len(large[2]), wire)
+        self.assertLess(wire, sent)
+
+    def test_falls_back_when_server_rejects_gzip(self):
+        with StubServer(rejected_encodings=('gzip',)) as server:
+            client = AndonAppClient('Demo', 'api-token', compress_threshold=0)
+            client.endpoint = server.endpoint
+            self.report(client)
+            self.report(client)
+            client.close()
+
+        encodings = [headers.get('Content-Encoding') for _, headers, _ in server.requests]
+        self.assertEqual(['gzip', None, None], encodings)
+
+    def test_keeps_compressing_when_body_is_rejected_anyway(self):
+        with StubServer(status=400, body={
+                    'errorType': 'INVALID_REQUEST',
+                    'errorMessage': 'bad'
+                }) as server:
+            client = AndonAppClient('Demo', 'api-token', compress_threshold=0)
+            client.endpoint = server.endpoint
+            for _ in range(2):
+                with self.assertRaises(AndonAppException):
+                    self.report(client)
+            client.close()
+
+        encodings = [headers.get('Content-Encoding') for _, headers, _ in server.requests]
+        self.assertEqual(['gzip', None, 'gzip', None], encodings)
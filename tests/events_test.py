@@ -0,0 +1,73 @@
+import unittest
+from andonapp.events import ReportEvent, StatusEvent
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.calls = []
+
+    def report_data(self, *args, **kwargs):
+        self.calls.append(('report_data', args, kwargs))
+
+    def update_station_status(self, *args, **kwargs):
+        self.calls.append(('update_station_status', args, kwargs))
+
+
+class TestEvents(unittest.TestCase):
+    def test_interns_names_and_values(self):
+        first = ReportEvent(''.join(['line ', '1']), ''.join(['station ', '1']), 'PASS', 100)
+        second = ReportEvent(''.join(['line ', '1']), ''.join(['station ', '1']),
+                ''.join(['PA', 'SS']), 100)
+
+        self.assertIs(first.line_name, second.line_name)
+        self.assertIs(first.station_name, second.station_name)
+        self.assertIs(first.pass_result, second.pass_result)
+
+    def test_has_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            ReportEvent('line 1', 'station 1', 'PASS', 100).extra = 1
+        with self.assertRaises(AttributeError):
+            StatusEvent('line 1', 'station 1', 'RED').__dict__
+
+    def test_report_event(self):
+        client = FakeClient()
+        event = ReportEvent('line 1', 'station 1', 'FAIL', 100, 'Jam', 'notes',
+                event_id='plc-7:1')
+
+        event.send(client, deadline='deadline')
+
+        self.assertIsNone(event.key)
+        self.assertEqual([('report_data', ('line 1', 'station 1', 'FAIL', 100, 'Jam', 'notes'),
+                {'deadline': 'deadline', 'event_id': 'plc-7:1'})], client.calls)
+        self.assertEqual({
+            'orgName': 'Demo',
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'passResult': 'FAIL',
+            'processTimeSeconds': 100,
+            'failReason': 'Jam',
+            'failNotes': 'notes'
+        }, event.to_request('Demo'))
+
+    def test_status_event(self):
+        client = FakeClient()
+        event = StatusEvent('line 1', 'station 1', 'RED', 'Missing parts')
+
+        event.send(client)
+
+        self.assertEqual(('line 1', 'station 1'), event.key)
+        self.assertEqual([('update_station_status',
+                ('line 1', 'station 1', 'RED', 'Missing parts', None), {})], client.calls)
+        self.assertEqual({
+            'orgName': 'Demo',
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'statusColor': 'RED',
+            'statusReason': 'Missing parts',
+            'statusNotes': None
+        }, event.to_request('Demo'))
+
+    def test_non_string_names(self):
+        event = ReportEvent(1, 2, 'PASS', 100)
+
+        self.assertEqual((1, 2), (event.line_name, event.station_name))
@@ -1,3 +1,5 @@
+import email.utils
+import time
 import unittest
 from andonapp.exceptions import *
 
@@ -73,6 +75,16 @@ class TestExceptions(unittest.TestCase):
                     'path': '/public/api/v1/data/report'
                 })
 
+    def test_http_error_when_other_4xx_code_spring(self):
+        with self.assertRaises(AndonHttpErrorException) as context:
+            raise_from_error_response({
+                    'status': 404,
+                    'error': 'Not Found',
+                    'message': 'No message available',
+                    'path': '/public/api/v1/data/nowhere'
+                })
+        self.assertEqual(404, context.exception.status_code)
+
     def test_raise_internal_error_when_500_code(self):
         with self.assertRaisesRegexp(AndonInternalErrorException, 'error') as context:
             raise_from_error_response({
@@ -82,3 +94,37 @@ class TestExceptions(unittest.TestCase):
                     'message': 'error',
                     'path': '/public/api/v1/data/report'
                 })
+
+    def test_raise_from_status(self):
+        for status, exception in [(401, AndonUnauthorizedRequestException),
+                (400, AndonHttpErrorException),
+                (404, AndonHttpErrorException),
+                (408, AndonThrottledException),
+                (429, AndonThrottledException),
+                (502, AndonInternalErrorException),
+                (503, AndonInternalErrorException),
+                (302, AndonAppException)]:
+            with self.assertRaises(exception) as context:
+                raise_from_status(status, 'Status {}'.format(status))
+            self.assertEqual(exception, context.exception.__class__)
+
+    def test_throttled_status_carries_retry_after(self):
+        with self.assertRaises(AndonThrottledException) as context:
+            raise_from_status(429, 'Status 429', '3')
+        self.assertEqual(3, context.exception.retry_after)
+
+        with self.assertRaises(AndonThrottledException) as context:
+            raise_from_error_response({'status': 429, 'message': 'Slow down'}, '7')
+        self.assertEqual(7, context.exception.retry_after)
+
+        with self.assertRaises(AndonThrottledException) as context:
+            raise_from_status(408, 'Status 408')
+        self.assertIsNone(context.exception.retry_after)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(120, parse_retry_after('120'))
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertEqual(0, parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'))
+        later = email.utils.formatdate(time.time() + 60, usegmt=True)
+        self.assertTrue(55 <= parse_retry_after(later) <= 60)
@@ -0,0 +1,228 @@
+import json
+import os
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+from andonapp import AndonAppClient
+from andonapp.aggregator import AggregatorClient, AggregatorServer
+from andonapp.dedup import DedupIndex
+from andonapp.exceptions import *
+from andonapp.metrics import Metrics, RequestInfo
+from andonapp.rate_limit import RateLimiter
+from andonapp.retry import CircuitBreaker, RetryBudget
+from andonapp.spool import Spool
+from benchmarks.stub_server import StubServer
+
+
+def run_in_child(func):
+    """
+    Runs ``func`` in a forked child and returns its exit status: 0 when it
+    returned normally, 1 when it raised.
+    """
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            # A deadlocked child fails instead of hanging the test run.
+            signal.alarm(10)
+            func()
+            code = 0
+        finally:
+            os._exit(code)
+    return os.waitpid(pid, 0)[1] >> 8
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+class TestForkSafety(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.client = AndonAppClient('Demo', 'api-token')
+        self.client.endpoint = self.server.endpoint
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_child_opens_its_own_connection(self):
+        self.client.report_data('line 1', 'station 1', 'PASS', 1)
+
+        status = run_in_child(lambda: self.client.report_data('line 1', 'station 1', 'PASS', 2))
+        self.client.report_data('line 1', 'station 1', 'PASS', 3)
+
+        self.assertEqual(0, status)
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual(2, len(self.server.connections))
+
+    def test_child_opens_its_own_http_transport_connection(self):
+        client = AndonAppClient('Demo', 'api-token', transport='http')
+        client.endpoint = self.server.endpoint
+        client.report_data('line 1', 'station 1', 'PASS', 1)
+
+        status = run_in_child(lambda: client.report_data('line 1', 'station 1', 'PASS', 2))
+        client.report_data('line 1', 'station 1', 'PASS', 3)
+        client.close()
+
+        self.assertEqual(0, status)
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual(2, len(self.server.connections))
+
+    def test_child_reporter_restarts_workers(self):
+        reporter = self.client.reporter()
+        reporter.report_data('line 1', 'station 1', 'PASS', 1)
+        reporter.flush(1)
+
+        def child():
+            reporter.report_data('line 1', 'station 1', 'PASS', 2)
+            if not reporter.flush(1):
+                raise RuntimeError('not flushed')
+
+        status = run_in_child(child)
+        reporter.close()
+
+        self.assertEqual(0, status)
+        self.assertEqual(2, len(self.server.requests))
+
+    def test_child_reopens_spool(self):
+        directory = tempfile.mkdtemp()
+        spool = Spool(os.path.join(directory, 'spool.db'))
+        spool.append('/data/report', {'n': 1})
+
+        status = run_in_child(lambda: spool.append('/data/report', {'n': 2}))
+        spool.close()
+        spool = Spool(os.path.join(directory, 'spool.db'))
+
+        self.assertEqual(0, status)
+        self.assertEqual(2, spool.backlog_size)
+        spool.close()
+        shutil.rmtree(directory)
+
+    def test_parent_and_child_replay_spool_once(self):
+        directory = tempfile.mkdtemp()
+        spool = Spool(os.path.join(directory, 'spool.db'), max_replay_rate=0,
+                replay_interval=0.05)
+        for i in range(20):
+            spool.append('/data/report', {'orgName': 'Demo', 'lineName': 'line 1',
+                    'stationName': 'station 1', 'passResult': 'PASS',
+                    'processTimeSeconds': i})
+        self.server.latency = 0.01
+        spool.start_replay(self.client._deliver)
+
+        def child():
+            # The child restarts the replay thread the parent was running.
+            while spool.backlog_size:
+                time.sleep(0.01)
+            spool.close()
+
+        status = run_in_child(child)
+        while spool.backlog_size:
+            time.sleep(0.01)
+        spool.close()
+        shutil.rmtree(directory)
+
+        self.assertEqual(0, status)
+        sent = [json.loads(body.decode('utf-8'))['processTimeSeconds']
+                for path, headers, body in self.server.requests]
+        self.assertEqual(list(range(20)), sorted(sent))
+
+    def test_child_does_not_inherit_held_locks(self):
+        limiter = RateLimiter(rate=1000, per_station_rate=1000)
+        limiter.reserve('line 1', 'station 1')
+        shared = [Metrics(), limiter, CircuitBreaker(), RetryBudget()]
+        for obj in shared:
+            obj._lock.acquire()
+
+        def child():
+            shared[0].observe(RequestInfo('/data/report', 100))
+            shared[1].reserve('line 1', 'station 1')
+            shared[2].record(False)
+            shared[3].withdraw()
+
+        status = run_in_child(child)
+        for obj in shared:
+            obj._lock.release()
+
+        self.assertEqual(0, status)
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+class TestAggregator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'andon.sock')
+        self.server = StubServer().start()
+        self.client = AndonAppClient('Demo', 'api-token', pool_maxsize=2)
+        self.client.endpoint = self.server.endpoint
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_workers_share_one_pool(self):
+        with AggregatorServer(self.client, self.path):
+            aggregator = AggregatorClient(self.path, timeout=5)
+
+            def child():
+                for i in range(3):
+                    aggregator.report_data('line 1', 'station 1', 'PASS', i)
+                aggregator.update_station_status('line 1', 'station 1', 'GREEN')
+
+            statuses = [run_in_child(child) for _ in range(3)]
+
+        self.assertEqual([0, 0, 0], statuses)
+        self.assertEqual(12, len(self.server.requests))
+        self.assertLessEqual(len(self.server.connections), 2)
+
+    def test_raises_client_exception(self):
+        self.server.status = 400
+        self.server.body = {
+            'errorType': 'INVALID_REQUEST',
+            'errorMessage': "'PAS' is not a valid pass result."
+        }
+
+        with AggregatorServer(self.client, self.path):
+            with AggregatorClient(self.path, timeout=5) as aggregator:
+                with self.assertRaisesRegex(AndonInvalidRequestException, 'PAS'):
+                    aggregator.report_data('line 1', 'station 1', 'PAS', 1)
+
+    def test_passes_event_id(self):
+        self.client.dedup = DedupIndex()
+
+        with AggregatorServer(self.client, self.path):
+            with AggregatorClient(self.path, timeout=5) as aggregator:
+                aggregator.report_data('line 1', 'station 1', 'PASS', 1, event_id='e-1')
+                aggregator.report_data('line 1', 'station 1', 'PASS', 2, event_id='e-1')
+
+        self.assertEqual(1, len(self.server.requests))
+
+    def test_deadline_bounds_wait_for_aggregator(self):
+        self.server.latency = 0.5
+
+        with AggregatorServer(self.client, self.path):
+            with AggregatorClient(self.path, timeout=5) as aggregator:
+                started = time.time()
+                with self.assertRaises(AndonDeadlineExceededException):
+                    aggregator.report_data('line 1', 'station 1', 'PASS', 1, deadline=0.1)
+                self.assertLess(time.time() - started, 0.4)
+
+                # The late reply isn't mistaken for the next call's.
+                self.server.latency = 0
+                aggregator.update_station_status('line 1', 'station 1', 'GREEN')
+
+    def test_raises_timeout(self):
+        self.server.latency = 0.5
+
+        with AggregatorServer(self.client, self.path):
+            with AggregatorClient(self.path, timeout=0.1) as aggregator:
+                with self.assertRaises(AndonTimeoutException) as context:
+                    aggregator.report_data('line 1', 'station 1', 'PASS', 1)
+
+        self.assertIs(AndonTimeoutException, context.exception.__class__)
+
+    def test_raises_connection_error_without_server(self):
+        aggregator = AggregatorClient(self.path)
+
+        with self.assertRaises(AndonConnectionException):
+            aggregator.report_data('line 1', 'station 1', 'PASS', 1)
@@ -0,0 +1,170 @@
+"""
+Minimal local HTTP/2 Andon server, built on the ``h2`` protocol library, used
+by the HTTP/2 transport tests.
+"""
+
+import json
+import os
+import select
+import socket
+import ssl
+import threading
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+
+CERTS = os.path.join(os.path.dirname(__file__), 'certs')
+CERT_FILE = os.path.join(CERTS, 'localhost.pem')
+KEY_FILE = os.path.join(CERTS, 'localhost.key')
+
+
+def client_ssl_context():
+    """
+    An SSL context trusting the stub servers' self-signed certificate.
+    """
+    return ssl.create_default_context(cafile=CERT_FILE)
+
+
+def server_ssl_context(protocols):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERT_FILE, KEY_FILE)
+    context.set_alpn_protocols(protocols)
+    return context
+
+
+class StubH2Server(object):
+    """
+    Accepts HTTP/2 connections, over TLS with ALPN or in cleartext with prior
+    knowledge, records each request, and answers every stream with ``status``
+    and ``body`` after waiting ``delay`` seconds. Streams are answered
+    concurrently, so a client multiplexing requests sees them overlap.
+    """
+
+    def __init__(self, status=200, body=None, delay=0, tls=True):
+        self.status = status
+        self.body = body if body is not None else {}
+        self.delay = delay
+        self.requests = []
+        self.connections = 0
+        self.protocols = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        self._context = server_ssl_context(['h2']) if tls else None
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(('127.0.0.1', 0))
+        self._socket.listen(16)
+        self._socket.settimeout(0.05)
+        self._stopping = False
+        self._threads = []
+
+    @property
+    def endpoint(self):
+        return '{}://{}:{}'.format('https' if self._context else 'http',
+                *self._socket.getsockname())
+
+    def start(self):
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopping = True
+        for thread in list(self._threads):
+            thread.join()
+        self._socket.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _accept(self):
+        while not self._stopping:
+            try:
+                sock, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            thread = threading.Thread(target=self._serve, args=(sock,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _serve(self, sock):
+        sock.setblocking(True)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            if self._context is not None:
+                sock = self._context.wrap_socket(sock, server_side=True)
+            protocol = sock.selected_alpn_protocol() if self._context else 'h2c'
+        except (OSError, ssl.SSLError):
+            sock.close()
+            return
+        with self._lock:
+            self.connections += 1
+            self.protocols.append(protocol)
+
+        connection = h2.connection.H2Connection(config=h2.config.H2Configuration(
+                client_side=False, header_encoding='utf-8'))
+        connection.initiate_connection()
+        sock.sendall(connection.data_to_send())
+
+        # One thread per connection reads and writes, so responses due after
+        # ``delay`` are kept here until their time comes.
+        streams = {}
+        due = []
+        try:
+            while not self._stopping:
+                timeout = 0.05
+                if due:
+                    timeout = max(0, min(timeout, min(at for at, _ in due) - time.monotonic()))
+                pending = self._context is not None and sock.pending()
+                if pending or select.select([sock], [], [], timeout)[0]:
+                    data = sock.recv(65535)
+                    if not data:
+                        return
+                    for event in connection.receive_data(data):
+                        if isinstance(event, h2.events.RequestReceived):
+                            streams[event.stream_id] = [dict(event.headers), b'']
+                        elif isinstance(event, h2.events.DataReceived):
+                            streams[event.stream_id][1] += event.data
+                            connection.acknowledge_received_data(
+                                    event.flow_controlled_length, event.stream_id)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            headers, body = streams.pop(event.stream_id)
+                            self._record(headers, body)
+                            due.append((time.monotonic() + self.delay, event.stream_id))
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            return
+
+                now = time.monotonic()
+                for at, stream_id in [entry for entry in due if entry[0] <= now]:
+                    due.remove((at, stream_id))
+                    self._respond(connection, stream_id)
+                sock.sendall(connection.data_to_send())
+        except (OSError, ssl.SSLError):
+            pass
+        finally:
+            sock.close()
+
+    def _record(self, headers, body):
+        with self._lock:
+            self.requests.append((headers[':path'], headers, body))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _respond(self, connection, stream_id):
+        payload = json.dumps(self.body).encode('utf-8')
+        connection.send_headers(stream_id, [
+            (':status', str(self.status)),
+            ('content-type', 'application/json'),
+            ('content-length', str(len(payload)))])
+        connection.send_data(stream_id, payload, end_stream=True)
+        with self._lock:
+            self.in_flight -= 1
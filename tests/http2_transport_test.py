@@ -0,0 +1,159 @@
+import json
+import sys
+import unittest
+from unittest.mock import patch
+from andonapp import AndonAppClient, AsyncAndonAppClient
+from andonapp.exceptions import *
+from benchmarks.stub_server import StubServer
+
+try:
+    from andonapp.http2_transport import Http2Transport
+    from .h2_stub_server import StubH2Server, client_ssl_context, server_ssl_context
+except ImportError:
+    Http2Transport = None
+
+requires_http2 = unittest.skipIf(Http2Transport is None, 'httpx[http2] is not installed')
+
+EVENTS = [{'line_name': 'line 1', 'station_name': 'station {}'.format(n),
+        'pass_result': 'PASS', 'process_time_seconds': 100} for n in range(20)]
+
+
+@requires_http2
+class TestHttp2Transport(unittest.TestCase):
+    def setUp(self):
+        self.server = StubH2Server().start()
+        self.client = self.create_client()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def create_client(self, **kwargs):
+        transport = Http2Transport(verify=client_ssl_context(), **kwargs)
+        client = AndonAppClient('Demo', 'api-token', transport=transport)
+        client.endpoint = self.server.endpoint + '/public/api/v1'
+        return client
+
+    def test_negotiates_http2(self):
+        self.client.report_data('line 1', 'station 1', 'FAIL', 200, 'Test Failure', 'notes')
+
+        self.assertEqual(['h2'], self.server.protocols)
+        path, headers, body = self.server.requests[0]
+        self.assertEqual('/public/api/v1/data/report', path)
+        self.assertEqual('Bearer api-token', headers['authorization'])
+        self.assertEqual({
+            'orgName': 'Demo',
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'passResult': 'FAIL',
+            'processTimeSeconds': 200,
+            'failReason': 'Test Failure',
+            'failNotes': 'notes'
+        }, json.loads(body.decode('utf-8')))
+
+    def test_multiplexes_concurrent_requests_over_one_connection(self):
+        self.server.delay = 0.2
+
+        results = list(self.client.report_many(EVENTS, max_workers=10))
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(1, self.server.connections)
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def test_falls_back_to_http1(self):
+        with StubServer(ssl_context=server_ssl_context(['http/1.1'])) as server:
+            self.client.endpoint = server.endpoint
+            for n in range(2):
+                self.client.update_station_status('line 1', 'station 1', 'GREEN')
+
+        self.assertEqual(2, len(server.requests))
+        self.assertEqual(1, len(server.connections))
+
+    def test_drops_connection_header(self):
+        client = AndonAppClient('Demo', 'api-token', keep_alive=False,
+                transport=Http2Transport(verify=client_ssl_context()))
+        client.endpoint = self.server.endpoint
+        client.update_station_status('line 1', 'station 1', 'GREEN')
+        client.close()
+
+        self.assertNotIn('connection', self.server.requests[0][1])
+
+    def test_prior_knowledge_over_cleartext(self):
+        with StubH2Server(tls=False) as server:
+            client = AndonAppClient('Demo', 'api-token',
+                    transport=Http2Transport(prior_knowledge=True))
+            client.endpoint = server.endpoint
+            client.update_station_status('line 1', 'station 1', 'GREEN')
+            client.close()
+
+        self.assertEqual(['h2c'], server.protocols)
+        self.assertEqual(1, len(server.requests))
+
+    def test_error_response(self):
+        self.server.status = 400
+        self.server.body = {'errorType': 'RESOURCE_NOT_FOUND', 'errorMessage': 'Station not found.'}
+
+        with self.assertRaisesRegex(AndonResourceNotFoundException, 'Station not found.'):
+            self.client.report_data('line 1', 'station 1', 'PASS', 100)
+
+    def test_read_timeout(self):
+        self.server.delay = 0.3
+        client = AndonAppClient('Demo', 'api-token', read_timeout=0.05,
+                transport=Http2Transport(verify=client_ssl_context()))
+        client.endpoint = self.server.endpoint
+
+        with self.assertRaises(AndonTimeoutException):
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+        client.close()
+
+    def test_unreachable(self):
+        self.client.endpoint = 'https://127.0.0.1:1'
+
+        with self.assertRaises(AndonConnectionException):
+            self.client.report_data('line 1', 'station 1', 'PASS', 100)
+
+    def test_reconnects_after_fork(self):
+        self.client.update_station_status('line 1', 'station 1', 'GREEN')
+        transport = self.client._get_transport()
+
+        transport.after_fork()
+        self.client.update_station_status('line 1', 'station 1', 'GREEN')
+
+        self.assertEqual(2, self.server.connections)
+
+
+@requires_http2
+class TestAsyncHttp2(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = StubH2Server(delay=0.2).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    async def test_multiplexes_concurrent_requests(self):
+        import asyncio
+
+        client = AsyncAndonAppClient('Demo', 'api-token', http2=True,
+                ssl_context=client_ssl_context())
+        client.endpoint = self.server.endpoint
+        await asyncio.gather(*(client.report_data(**event) for event in EVENTS))
+        await client.close()
+
+        self.assertEqual(len(EVENTS), len(self.server.requests))
+        self.assertEqual(1, self.server.connections)
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    async def test_falls_back_to_http1(self):
+        with StubServer(ssl_context=server_ssl_context(['http/1.1'])) as server:
+            client = AsyncAndonAppClient('Demo', 'api-token', http2=True,
+                    ssl_context=client_ssl_context())
+            client.endpoint = server.endpoint
+            await client.update_station_status('line 1', 'station 1', 'GREEN')
+            await client.close()
+
+        self.assertEqual(1, len(server.requests))
+
+    def test_requires_h2(self):
+        with patch.dict(sys.modules, {'h2': None}):
+            with self.assertRaisesRegex(ValueError, 'andonapp\\[http2\\]'):
+                AsyncAndonAppClient('Demo', 'api-token', http2=True)
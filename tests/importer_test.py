@@ -0,0 +1,253 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from andonapp import importer
+from andonapp.bulk import dispatch
+from andonapp.exceptions import *
+from andonapp.importer import import_file, main
+
+
+class FakeClient(object):
+    def __init__(self, fail_stations=(), down_stations=()):
+        self.fail_stations = fail_stations
+        self.down_stations = down_stations
+        self.reports = []
+        self._lock = threading.Lock()
+
+    def report_data(self, **kwargs):
+        if kwargs['station_name'] in self.fail_stations:
+            raise AndonResourceNotFoundException('No station ' + kwargs['station_name'])
+        if kwargs['station_name'] in self.down_stations:
+            raise AndonConnectionException('Andon is unreachable')
+        with self._lock:
+            self.reports.append(kwargs)
+
+
+class TestImportFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_imports_csv_with_column_mapping_and_defaults(self):
+        path = self._write('results.csv',
+                'Station,passResult,CycleTime,fail_reason,Operator\n'
+                'station 1,PASS,120,,alice\n'
+                '"station, 2",FAIL,1.5,"Test\nFailure",bob\n')
+        client = FakeClient()
+
+        result = import_file(client, path,
+                columns={'station_name': 'Station', 'process_time_seconds': 'CycleTime'},
+                defaults={'line_name': 'line 1'})
+
+        self.assertEqual((2, 0, os.path.getsize(path)), result)
+        self.assertEqual([{
+            'line_name': 'line 1',
+            'station_name': 'station 1',
+            'pass_result': 'PASS',
+            'process_time_seconds': 120
+        }, {
+            'line_name': 'line 1',
+            'station_name': 'station, 2',
+            'pass_result': 'FAIL',
+            'process_time_seconds': 1.5,
+            'fail_reason': 'Test\nFailure'
+        }], client.reports)
+
+    def test_writes_csv_rejects_with_exception_type(self):
+        path = self._write('results.csv',
+                'line_name,station_name,pass_result,process_time_seconds\n'
+                'line 1,station 1,PASS,120\n'
+                'line 1,missing,PASS,120\n'
+                'line 1,station 1,PASS,soon\n'
+                'line 1,,PASS,120\n')
+
+        result = import_file(FakeClient(fail_stations=('missing',)), path)
+
+        self.assertEqual((1, 3), result[:2])
+        with io.open(os.path.join(self.directory, 'results.rejects.csv'), newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(['line_name', 'station_name', 'pass_result',
+                'process_time_seconds', 'import_error', 'import_error_message'], rows[0])
+        self.assertEqual(['AndonResourceNotFoundException', 'ValueError', 'ValueError'],
+                [row[4] for row in rows[1:]])
+        self.assertEqual('missing', rows[1][1])
+
+    def test_imports_ndjson_and_rejects_bad_lines(self):
+        path = self._write('results.ndjson',
+                '{"lineName": "line 1", "stationName": "station 1", "passResult": "PASS", "processTimeSeconds": 3}\n'
+                '\n'
+                'not json\n'
+                '{"line_name": "line 1", "station_name": "station 2", "pass_result": "FAIL", "process_time_seconds": 4, "fail_notes": null}\n')
+        client = FakeClient()
+
+        result = import_file(client, path)
+
+        self.assertEqual((2, 1), result[:2])
+        self.assertEqual(['station 1', 'station 2'],
+                [report['station_name'] for report in client.reports])
+        with open(os.path.join(self.directory, 'results.rejects.ndjson')) as f:
+            reject = json.loads(f.readline())
+        self.assertEqual({'line': 'not json', 'import_error': 'JSONDecodeError'},
+                dict((key, reject[key]) for key in ('line', 'import_error')))
+
+    def test_resumes_after_checkpoint(self):
+        header = 'line_name,station_name,pass_result,process_time_seconds\n'
+        path = self._write('results.csv', header + 'line 1,station 1,PASS,1\n')
+        client = FakeClient()
+        import_file(client, path)
+
+        with open(path, 'a') as f:
+            f.write('line 1,station 2,PASS,2\nline 1,station 3,PASS,3\n')
+        result = import_file(client, path)
+
+        self.assertEqual(2, result.imported)
+        self.assertEqual(['station 1', 'station 2', 'station 3'],
+                [report['station_name'] for report in client.reports])
+        self.assertEqual((0, 0), import_file(client, path)[:2])
+
+    def test_interrupted_import_checkpoints_completed_rows(self):
+        path = self._write('results.ndjson', ''.join(
+                json.dumps({'line_name': 'line 1', 'station_name': 'station {}'.format(n),
+                        'pass_result': 'PASS', 'process_time_seconds': n}) + '\n'
+                for n in range(10)))
+        client = FakeClient()
+
+        def interrupted(func, items, max_workers):
+            for n, result in enumerate(dispatch(func, items, max_workers)):
+                if n == 3:
+                    raise KeyboardInterrupt()
+                yield result
+
+        with patch.object(importer, 'dispatch', interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                import_file(client, path, max_workers=2)
+        sent = len(client.reports)
+        import_file(client, path, max_workers=2)
+
+        self.assertGreater(sent, 3)
+        self.assertEqual(['station {}'.format(n) for n in range(10)],
+                sorted((report['station_name'] for report in client.reports),
+                        key=lambda name: int(name.split()[1])))
+
+    def test_checkpoints_through_runs_of_invalid_rows(self):
+        path = self._write('results.csv',
+                'line_name,station_name,pass_result,process_time_seconds\n'
+                + 'line 1,station 1,PASS,soon\n' * 2000
+                + 'line 1,station 1,PASS,1\n')
+        queued = []
+        saved = []
+        enqueue = importer._Importer._enqueue
+        save_checkpoint = importer._Importer._save_checkpoint
+
+        def record_enqueue(self, entry):
+            enqueue(self, entry)
+            queued.append(len(self._entries))
+
+        def record_save_checkpoint(self):
+            save_checkpoint(self)
+            saved.append(self._offset)
+
+        with patch.object(importer._Importer, '_enqueue', record_enqueue), \
+                patch.object(importer._Importer, '_save_checkpoint', record_save_checkpoint):
+            result = import_file(FakeClient(), path, max_workers=2, checkpoint_interval=100)
+
+        self.assertEqual((1, 2000), result[:2])
+        self.assertLessEqual(max(queued), 10)
+        self.assertGreaterEqual(len(saved), 20)
+
+    def test_stops_at_row_that_failed_to_send(self):
+        path = self._write('results.ndjson', ''.join(
+                json.dumps({'line_name': 'line 1', 'station_name': 'station {}'.format(n),
+                        'pass_result': 'PASS', 'process_time_seconds': n}) + '\n'
+                for n in range(20)))
+        client = FakeClient(down_stations=('station 5',))
+
+        with self.assertRaises(AndonConnectionException):
+            import_file(client, path, max_workers=2)
+
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'results.rejects.ndjson')))
+        sent = set(report['station_name'] for report in client.reports)
+        self.assertLess(len(sent), 19)
+
+        client.down_stations = ()
+        result = import_file(client, path, max_workers=2)
+
+        self.assertEqual(0, result.rejected)
+        self.assertEqual(set('station {}'.format(n) for n in range(20)),
+                set(report['station_name'] for report in client.reports))
+        self.assertEqual(set('station {}'.format(n) for n in range(5, 20)),
+                set(report['station_name'] for report in client.reports[len(sent):]))
+
+    def test_rejects_checkpoint_of_another_file(self):
+        content = ('line_name,station_name,pass_result,process_time_seconds\n'
+                'line 1,station 1,PASS,1\n')
+        first = self._write('first.csv', content)
+        second = self._write('second.csv', content)
+        checkpoint = os.path.join(self.directory, 'import.checkpoint')
+        import_file(FakeClient(), first, checkpoint=checkpoint)
+
+        with self.assertRaises(ValueError):
+            import_file(FakeClient(), second, checkpoint=checkpoint)
+
+    def test_rejects_file_rewritten_since_checkpoint(self):
+        header = 'line_name,station_name,pass_result,process_time_seconds\n'
+        path = self._write('results.csv', header + 'line 1,station 1,PASS,1\n')
+        import_file(FakeClient(), path)
+
+        self._write('results.csv', header + 'line 2,station 9,FAIL,7\n')
+        with self.assertRaises(ValueError):
+            import_file(FakeClient(), path)
+
+    def test_rejects_non_finite_process_times(self):
+        path = self._write('results.csv',
+                'line_name,station_name,pass_result,process_time_seconds\n'
+                'line 1,station 1,PASS,nan\n'
+                'line 1,station 1,PASS,inf\n')
+
+        self.assertEqual((0, 2), import_file(FakeClient(), path)[:2])
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            import_file(FakeClient(), self._write('results.xlsx', ''))
+
+    def test_main_reports_counts(self):
+        path = self._write('results.csv',
+                'line_name,station_name,pass_result,process_time_seconds\n'
+                'line 1,station 1,PASS,1\n')
+
+        with patch('andonapp.andon_client.AndonAppClient.report_data') as report_data:
+            with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+                status = main([path, '--org-name', 'Demo', '--api-token', 'token',
+                        '--default', 'fail_notes=none'])
+
+        self.assertEqual(0, status)
+        self.assertEqual('Imported 1 rows, rejected 0\n', stdout.getvalue())
+        report_data.assert_called_once_with(line_name='line 1', station_name='station 1',
+                pass_result='PASS', process_time_seconds=1, fail_notes='none')
+
+    def test_main_reports_stopped_import(self):
+        path = self._write('results.csv',
+                'line_name,station_name,pass_result,process_time_seconds\n'
+                'line 1,station 1,PASS,1\n')
+
+        with patch('andonapp.andon_client.AndonAppClient.report_data',
+                side_effect=AndonInternalErrorException('unavailable')):
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+                status = main([path, '--org-name', 'Demo', '--api-token', 'token'])
+
+        self.assertEqual(2, status)
+        self.assertIn('run again to resume', stderr.getvalue())
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with io.open(path, 'w', newline='') as f:
+            f.write(content)
+        return path
@@ -0,0 +1,147 @@
+import socket
+import unittest
+from unittest.mock import patch
+from andonapp import AndonAppClient
+from andonapp.exceptions import *
+from andonapp.exceptions import raise_from_error_response
+from andonapp.metrics import Metrics, RequestInfo, StatsdSink
+from benchmarks.stub_server import StubServer
+
+
+def request_info(path='/data/report', elapsed=0.02, exception=None):
+    info = RequestInfo(path, 120)
+    info.status_code = 200 if exception is None else 400
+    info.elapsed = elapsed
+    info.exception = exception
+    return info
+
+
+class TestMetrics(unittest.TestCase):
+    def test_queue_metrics_in_prometheus_format(self):
+        metrics = Metrics(buckets=(0.01, 0.1))
+        metrics.set_queue_depth('alarm', 2)
+        metrics.observe_queue_wait('report', 0.05)
+
+        text = metrics.to_prometheus()
+
+        self.assertIn('andon_queue_depth{priority="alarm"} 2', text)
+        self.assertIn('andon_queue_wait_seconds_bucket{priority="report",le="0.1"} 1', text)
+        self.assertIn('andon_queue_wait_seconds_count{priority="report"} 1', text)
+
+    def test_counts_requests_by_outcome(self):
+        metrics = Metrics()
+        metrics.observe(request_info())
+        metrics.observe(request_info())
+        metrics.observe(request_info(exception=AndonInvalidRequestException))
+        metrics.observe(request_info(path='/station/update'))
+
+        self.assertEqual(4, metrics.requests())
+        self.assertEqual(3, metrics.requests(path='/data/report'))
+        self.assertEqual(1, metrics.requests(outcome='AndonInvalidRequestException'))
+
+    def test_prometheus_format(self):
+        metrics = Metrics(buckets=(0.01, 0.1))
+        metrics.observe(request_info(elapsed=0.005))
+        metrics.observe(request_info(elapsed=0.05))
+        metrics.observe(request_info(elapsed=1, exception=AndonInternalErrorException))
+
+        text = metrics.to_prometheus()
+
+        self.assertIn('# TYPE andon_requests_total counter', text)
+        self.assertIn('andon_requests_total{path="/data/report",outcome="ok"} 2', text)
+        self.assertIn('andon_requests_total{path="/data/report",outcome="AndonInternalErrorException"} 1', text)
+        self.assertIn('andon_request_bytes_total{path="/data/report"} 360', text)
+        self.assertIn('andon_request_duration_seconds_bucket{path="/data/report",le="0.01"} 1', text)
+        self.assertIn('andon_request_duration_seconds_bucket{path="/data/report",le="0.1"} 2', text)
+        self.assertIn('andon_request_duration_seconds_bucket{path="/data/report",le="+Inf"} 3', text)
+        self.assertIn('andon_request_duration_seconds_count{path="/data/report"} 3', text)
+
+    def test_statsd_sink(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.settimeout(1)
+        sink = StatsdSink(*listener.getsockname())
+
+        sink(request_info(elapsed=0.25))
+        lines = listener.recv(1024).decode('utf-8').split('\n')
+        sink.close()
+        listener.close()
+
+        self.assertEqual(['andon.requests.data_report.ok:1|c',
+                'andon.request_bytes.data_report:120|h',
+                'andon.request_time.data_report:250.000|ms'], lines)
+
+    def test_client_hooks(self):
+        before, after = [], []
+        metrics = Metrics()
+
+        with StubServer(status=400, body={
+                    'errorType': 'INVALID_REQUEST',
+                    'errorMessage': 'bad'
+                }) as server:
+            client = AndonAppClient('Demo', 'api-token', metrics=metrics)
+            client.endpoint = server.endpoint
+            client.add_request_hooks(before=before.append, after=after.append)
+
+            with self.assertRaises(AndonInvalidRequestException):
+                client.report_data('line 1', 'station 1', 'PAS', 100)
+            client.close()
+
+        self.assertEqual('/data/report', before[0].path)
+        self.assertEqual(len(server.requests[0][2]), before[0].payload_size)
+        self.assertEqual(400, after[0].status_code)
+        self.assertIs(AndonInvalidRequestException, after[0].exception)
+        self.assertGreater(after[0].elapsed, 0)
+        self.assertIsNotNone(after[0].server_time)
+        self.assertEqual(1, metrics.requests(outcome='AndonInvalidRequestException'))
+
+    def test_parses_error_response_once(self):
+        after = []
+
+        with StubServer(status=400, body={
+                    'errorType': 'INVALID_REQUEST',
+                    'errorMessage': 'bad'
+                }) as server:
+            client = AndonAppClient('Demo', 'api-token')
+            client.endpoint = server.endpoint
+            client.add_request_hooks(after=after.append)
+
+            with patch('andonapp.andon_client.raise_from_error_response',
+                    wraps=raise_from_error_response) as parse:
+                with self.assertRaises(AndonInvalidRequestException):
+                    client.report_data('line 1', 'station 1', 'PAS', 100)
+            client.close()
+
+        self.assertEqual(1, parse.call_count)
+        self.assertIs(AndonInvalidRequestException, after[0].exception)
+
+    def test_connection_timings(self):
+        after = []
+
+        with StubServer() as server:
+            client = AndonAppClient('Demo', 'api-token', transport='http')
+            client.endpoint = server.endpoint
+            client.add_request_hooks(after=after.append)
+
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+            client.close()
+
+        self.assertGreater(after[0].connect_time, 0)
+        self.assertIsNone(after[0].tls_time)
+        self.assertIsNone(after[1].connect_time)
+
+    def test_failing_hook_does_not_break_request(self):
+        def broken(info):
+            raise RuntimeError('hook')
+
+        with StubServer() as server:
+            client = AndonAppClient('Demo', 'api-token')
+            client.endpoint = server.endpoint
+            client.add_request_hooks(after=broken)
+
+            with self.assertLogs('andonapp', level='ERROR'):
+                client.report_data('line 1', 'station 1', 'PASS', 100)
+            client.close()
+
+        self.assertEqual(1, len(server.requests))
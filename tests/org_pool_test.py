@@ -0,0 +1,213 @@
+import datetime
+import json
+import threading
+import time
+import unittest
+from andonapp.exceptions import *
+from andonapp.org_pool import OrgPool
+from andonapp.transport import Transport
+from benchmarks.stub_server import StubServer
+
+
+class Response(object):
+    def __init__(self, status_code=200, body=None):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = json.dumps(body or {})
+        self.elapsed = datetime.timedelta(0)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class RecordingTransport(Transport):
+    """
+    Records the organization of every request, holding requests while the
+    gate is closed.
+    """
+
+    def __init__(self):
+        self.orgs = []
+        self.waiting = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.closed = False
+        self.failing = set()
+
+    def post(self, url, body, headers, timeout):
+        self.waiting += 1
+        self.gate.wait()
+        self.waiting -= 1
+        org = json.loads(body.decode('utf-8'))['orgName']
+        self.orgs.append(org)
+        if org in self.failing:
+            return Response(400, {'errorType': 'INVALID_REQUEST', 'errorMessage': 'bad'})
+        return Response()
+
+    def close(self):
+        self.closed = True
+
+
+def report(org, n=1, **kwargs):
+    for i in range(n):
+        org.report_data('line 1', 'station {}'.format(i), 'PASS', 100, **kwargs)
+
+
+class TestOrgPool(unittest.TestCase):
+    def setUp(self):
+        self.transport = RecordingTransport()
+
+    def block_worker(self, pool, org):
+        # Holds the only worker on one request so the rest queue up.
+        self.transport.gate.clear()
+        report(org)
+        while not self.transport.waiting:
+            time.sleep(0.001)
+
+    def test_sends_through_shared_transport(self):
+        with OrgPool(transport=self.transport) as pool:
+            report(pool.add('Plant A', 'token-a'), 2)
+            report(pool.add('Plant B', 'token-b'), 3)
+            self.assertTrue(pool.flush(1))
+
+        self.assertCountEqual(['Plant A'] * 2 + ['Plant B'] * 3, self.transport.orgs)
+        self.assertTrue(self.transport.closed)
+
+    def test_backlog_does_not_starve_other_orgs(self):
+        pool = OrgPool(workers=1, transport=self.transport)
+        plant_a = pool.add('Plant A', 'token-a')
+        plant_b = pool.add('Plant B', 'token-b')
+
+        self.block_worker(pool, plant_a)
+        report(plant_a, 20)
+        report(plant_b, 5)
+        self.transport.gate.set()
+        pool.close(1)
+
+        self.assertEqual(['Plant A'] + ['Plant A', 'Plant B'] * 5 + ['Plant A'] * 15,
+                self.transport.orgs)
+
+    def test_weights_share_sends(self):
+        pool = OrgPool(workers=1, transport=self.transport)
+        plant_a = pool.add('Plant A', 'token-a', weight=3)
+        plant_b = pool.add('Plant B', 'token-b')
+
+        self.block_worker(pool, plant_b)
+        report(plant_b, 10)
+        report(plant_a, 30)
+        self.transport.gate.set()
+        pool.close(1)
+
+        first = self.transport.orgs[1:21]
+        self.assertEqual(15, first.count('Plant A'))
+        self.assertEqual(5, first.count('Plant B'))
+
+    def test_idle_org_gets_no_saved_credit(self):
+        pool = OrgPool(workers=1, transport=self.transport)
+        plant_a = pool.add('Plant A', 'token-a')
+        plant_b = pool.add('Plant B', 'token-b')
+
+        report(plant_b, 10)
+        pool.flush(1)
+        self.block_worker(pool, plant_b)
+        report(plant_b, 4)
+        report(plant_a, 4)
+        self.transport.gate.set()
+        pool.close(1)
+
+        self.assertEqual(['Plant B', 'Plant A'] * 4, self.transport.orgs[-8:])
+
+    def test_per_org_stats(self):
+        self.transport.failing.add('Plant B')
+        errors = []
+
+        with OrgPool(transport=self.transport) as pool:
+            report(pool.add('Plant A', 'token-a'), 3)
+            report(pool.add('Plant B', 'token-b'), 2, callback=errors.append)
+            pool.flush(1)
+            stats = pool.stats()
+            text = pool.to_prometheus()
+
+        self.assertEqual(3, stats['Plant A']['sent'])
+        self.assertEqual(0, stats['Plant A']['failed'])
+        self.assertGreater(stats['Plant A']['throughput'], 0)
+        self.assertEqual(2, stats['Plant B']['failed'])
+        self.assertEqual({'AndonInvalidRequestException': 2}, stats['Plant B']['errors'])
+        self.assertEqual(2, len(errors))
+        self.assertIn('andon_org_events_total{org="Plant A",outcome="ok"} 3', text)
+        self.assertIn('andon_org_events_total{org="Plant B",'
+                'outcome="AndonInvalidRequestException"} 2', text)
+        self.assertIn('andon_org_queue_depth{org="Plant A"} 0', text)
+
+    def test_queue_bound_is_per_org(self):
+        pool = OrgPool(workers=1, max_queue_size=2, when_full='raise',
+                transport=self.transport)
+        plant_a = pool.add('Plant A', 'token-a')
+        plant_b = pool.add('Plant B', 'token-b')
+
+        self.block_worker(pool, plant_a)
+        report(plant_a, 2)
+        with self.assertRaises(AndonQueueFullException):
+            report(plant_a)
+        report(plant_b, 2)
+        self.transport.gate.set()
+        pool.close(1)
+
+    def test_drop_oldest(self):
+        pool = OrgPool(workers=1, max_queue_size=1, when_full='drop_oldest',
+                transport=self.transport)
+        plant_a = pool.add('Plant A', 'token-a')
+        results = []
+
+        self.block_worker(pool, plant_a)
+        report(plant_a, 2, callback=results.append)
+        self.transport.gate.set()
+        pool.close(1)
+
+        self.assertIsInstance(results[0], AndonQueueFullException)
+        self.assertEqual(1, pool.get('Plant A').stats()['dropped'])
+        self.assertEqual(2, len(self.transport.orgs))
+
+    def test_callback_exceptions_are_logged(self):
+        pool = OrgPool(workers=1, transport=self.transport)
+        plant_a = pool.add('Plant A', 'token-a')
+
+        def callback(error):
+            raise RuntimeError('callback bug')
+
+        with self.assertLogs('andonapp.work_queue', 'ERROR'):
+            report(plant_a, callback=callback)
+            pool.close(1)
+
+        self.assertEqual(1, pool.get('Plant A').stats()['sent'])
+
+    def test_rejects_duplicate_orgs_and_bad_weights(self):
+        with OrgPool(transport=self.transport) as pool:
+            pool.add('Plant A', 'token-a')
+            with self.assertRaises(ValueError):
+                pool.add('Plant A', 'token-a')
+            with self.assertRaises(ValueError):
+                pool.add('Plant B', 'token-b', weight=0)
+
+            self.assertIn('Plant A', pool)
+            self.assertEqual(1, len(pool))
+            with self.assertRaises(KeyError):
+                pool.get('Plant C')
+
+    def test_closing_an_org_client_keeps_shared_connections(self):
+        with OrgPool(transport=self.transport) as pool:
+            plant_a = pool.add('Plant A', 'token-a')
+            plant_a.client.close()
+            self.assertFalse(self.transport.closed)
+
+    def test_shares_connections_to_andon(self):
+        with StubServer() as server:
+            with OrgPool(workers=1, transport='http', endpoint=server.endpoint) as pool:
+                report(pool.add('Plant A', 'token-a'), 3)
+                report(pool.add('Plant B', 'token-b'), 3)
+                pool.flush(1)
+
+        self.assertEqual(6, len(server.requests))
+        self.assertEqual(1, len(server.connections))
+        self.assertEqual(set(['Bearer token-a', 'Bearer token-b']),
+                set(headers['Authorization'] for _, headers, _ in server.requests))
@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from andonapp import AndonAppClient
+from andonapp.exceptions import *
+from andonapp.rate_limit import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_allows_burst_then_delays(self):
+        bucket = TokenBucket(rate=10, burst=2)
+
+        self.assertEqual(0, bucket.reserve(now=100))
+        self.assertEqual(0, bucket.reserve(now=100))
+        self.assertAlmostEqual(0.1, bucket.reserve(now=100))
+        self.assertAlmostEqual(0.2, bucket.reserve(now=100))
+
+    def test_refills_over_time(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.reserve(now=100)
+
+        self.assertAlmostEqual(0, bucket.reserve(now=100.1))
+
+    def test_does_not_exceed_burst(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.reserve(now=100)
+
+        self.assertEqual(0, bucket.reserve(now=200))
+        self.assertAlmostEqual(0.1, bucket.reserve(now=200))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_unlimited_by_default(self):
+        limiter = RateLimiter()
+
+        for _ in range(100):
+            self.assertEqual(0, limiter.reserve('line 1', 'station 1'))
+
+    def test_per_station_buckets_are_independent(self):
+        limiter = RateLimiter(per_station_rate=1)
+
+        self.assertEqual(0, limiter.reserve('line 1', 'station 1'))
+        self.assertEqual(0, limiter.reserve('line 1', 'station 2'))
+        self.assertGreater(limiter.reserve('line 1', 'station 1'), 0)
+
+    def test_per_line_limit_spans_stations(self):
+        limiter = RateLimiter(per_line_rate=1)
+
+        self.assertEqual(0, limiter.reserve('line 1', 'station 1'))
+        self.assertGreater(limiter.reserve('line 1', 'station 2'), 0)
+        self.assertEqual(0, limiter.reserve('line 2', 'station 1'))
+
+    def test_global_limit(self):
+        limiter = RateLimiter(rate=1)
+
+        limiter.reserve('line 1', 'station 1')
+
+        self.assertGreater(limiter.reserve('line 2', 'station 2'), 0)
+
+    def test_reports_delay(self):
+        limiter = RateLimiter(rate=100, burst=1)
+
+        limiter.acquire('line 1', 'station 1')
+        delay = limiter.acquire('line 1', 'station 1')
+
+        stats = limiter.stats()
+        self.assertEqual(1, stats['delayed'])
+        self.assertAlmostEqual(delay, stats['total_delay'])
+
+    def test_smooths_burst_across_threads(self):
+        limiter = RateLimiter(rate=100, burst=1)
+        started = time.time()
+
+        threads = [threading.Thread(target=limiter.acquire, args=('line 1', 'station {}'.format(i)))
+                for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertGreaterEqual(time.time() - started, 0.08)
+        self.assertEqual(9, limiter.stats()['delayed'])
+
+    def test_acquire_gives_back_slot_past_timeout(self):
+        limiter = RateLimiter(per_station_rate=1, per_station_burst=1)
+        limiter.acquire('line 1', 'station 1')
+
+        with self.assertRaises(AndonDeadlineExceededException):
+            limiter.acquire('line 1', 'station 1', timeout=0.1)
+        self.assertAlmostEqual(1.0, limiter.reserve('line 1', 'station 1'), places=1)
+
+    @patch('requests.Session.post')
+    def test_client_waits_for_limiter(self, mock_post):
+        mock_post.return_value.status_code = 200
+        limiter = RateLimiter(per_station_rate=50, per_station_burst=1)
+        client = AndonAppClient('Demo', 'api-token', rate_limiter=limiter)
+
+        client.report_data('line 1', 'station 1', 'PASS', 100)
+        client.update_station_status('line 1', 'station 1', 'GREEN')
+
+        self.assertEqual(2, mock_post.call_count)
+        self.assertEqual(1, limiter.stats()['delayed'])
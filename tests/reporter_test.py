@@ -0,0 +1,311 @@
+import threading
+import time
+import unittest
+from andonapp.exceptions import *
+from andonapp.reporter import BufferedReporter
+
+
+class FakeClient(object):
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def report_data(self, *args, **kwargs):
+        self.gate.wait()
+        self.calls.append(('report_data',) + args)
+        self.deadline = kwargs.get('deadline')
+        if self.error:
+            raise self.error
+
+    def update_station_status(self, *args, **kwargs):
+        self.gate.wait()
+        self.calls.append(('update_station_status',) + args)
+        if self.error:
+            raise self.error
+
+
+def wait_until_taken(reporter):
+    while reporter.queue_size:
+        time.sleep(0.001)
+
+
+class TestBufferedReporter(unittest.TestCase):
+    def test_sends_queued_events(self):
+        client = FakeClient()
+        reporter = BufferedReporter(client)
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 100)
+        reporter.update_station_status('line 1', 'station 1', 'RED', 'Missing parts')
+
+        self.assertTrue(reporter.flush(1))
+        self.assertCountEqual([
+            ('report_data', 'line 1', 'station 1', 'PASS', 100, None, None),
+            ('update_station_status', 'line 1', 'station 1', 'RED', 'Missing parts', None)
+        ], client.calls)
+        self.assertTrue(reporter.close(1))
+
+    def test_callback_receives_exception(self):
+        client = FakeClient(error=AndonInvalidRequestException('bad'))
+        results = []
+
+        with BufferedReporter(client) as reporter:
+            reporter.report_data('line 1', 'station 1', 'PAS', 100,
+                    callback=results.append)
+
+        self.assertEqual(1, len(results))
+        self.assertIsInstance(results[0], AndonInvalidRequestException)
+
+    def test_callback_exceptions_are_logged(self):
+        def callback(error):
+            raise RuntimeError('callback bug')
+
+        with self.assertLogs('andonapp.work_queue', 'ERROR') as logs:
+            with BufferedReporter(FakeClient()) as reporter:
+                reporter.report_data('line 1', 'station 1', 'PASS', 100, callback=callback)
+                reporter.report_data('line 1', 'station 1', 'PASS', 100, callback=callback)
+
+        self.assertEqual(2, len(logs.records))
+        self.assertIn('callback bug', logs.output[0])
+
+    def test_callback_receives_none_on_success(self):
+        results = []
+
+        with BufferedReporter(FakeClient(), callback=results.append) as reporter:
+            reporter.report_data('line 1', 'station 1', 'PASS', 100)
+
+        self.assertEqual([None], results)
+
+    def test_flush_times_out_while_blocked(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client)
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 100)
+
+        self.assertFalse(reporter.flush(0.05))
+        client.gate.set()
+        self.assertTrue(reporter.flush(1))
+        reporter.close()
+
+    def test_expired_events_are_not_sent(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client)
+        errors = []
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 100)
+        reporter.report_data('line 1', 'station 2', 'PASS', 100,
+                callback=errors.append, deadline=0.01)
+        time.sleep(0.02)
+        client.gate.set()
+        reporter.close()
+
+        self.assertEqual(1, len(client.calls))
+        self.assertIsInstance(errors[0], AndonDeadlineExceededException)
+
+    def test_passes_remaining_deadline_to_client(self):
+        client = FakeClient()
+        reporter = BufferedReporter(client)
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 100, deadline=5)
+        reporter.close()
+
+        self.assertTrue(0 < client.deadline.remaining() <= 5)
+
+    def test_block_when_full_until_deadline(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client, max_queue_size=1)
+        reporter.report_data('line 1', 'station 1', 'PASS', 100)
+        reporter.report_data('line 1', 'station 2', 'PASS', 100)
+
+        with self.assertRaises(AndonDeadlineExceededException):
+            reporter.report_data('line 1', 'station 3', 'PASS', 100, deadline=0.02)
+        client.gate.set()
+        reporter.close()
+
+    def test_sends_alarms_before_reports(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client)
+        reporter.report_data('line 1', 'station 0', 'PASS', 100)
+        wait_until_taken(reporter)
+
+        for n in range(1, 4):
+            reporter.report_data('line 1', 'station {}'.format(n), 'PASS', 100)
+        reporter.update_station_status('line 1', 'station 1', 'GREEN')
+        reporter.update_station_status('line 1', 'station 2', 'RED')
+        client.gate.set()
+        reporter.close()
+
+        self.assertEqual([
+            ('report_data', 'station 0'),
+            ('update_station_status', 'station 2'),
+            ('update_station_status', 'station 1'),
+            ('report_data', 'station 1'),
+            ('report_data', 'station 2'),
+            ('report_data', 'station 3')
+        ], [(call[0], call[2]) for call in client.calls])
+
+    def test_keeps_station_status_order(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client)
+        reporter.report_data('line 1', 'station 0', 'PASS', 100)
+        wait_until_taken(reporter)
+
+        reporter.update_station_status('line 1', 'station 1', 'GREEN')
+        reporter.update_station_status('line 1', 'station 1', 'RED')
+        reporter.update_station_status('line 1', 'station 2', 'YELLOW')
+        client.gate.set()
+        reporter.close()
+
+        self.assertEqual([('station 2', 'YELLOW'), ('station 1', 'GREEN'),
+                ('station 1', 'RED')], [call[2:4] for call in client.calls[1:]])
+
+    def test_starved_events_go_first(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client, max_starvation=0.02)
+        reporter.report_data('line 1', 'station 0', 'PASS', 100)
+        wait_until_taken(reporter)
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 100)
+        time.sleep(0.03)
+        reporter.update_station_status('line 1', 'station 1', 'RED')
+        client.gate.set()
+        reporter.close()
+
+        self.assertEqual(['report_data', 'report_data', 'update_station_status'],
+                [call[0] for call in client.calls])
+
+    def test_drop_oldest_drops_reports_first(self):
+        client = FakeClient()
+        client.gate.clear()
+        errors = []
+        reporter = BufferedReporter(client, max_queue_size=2, when_full='drop_oldest')
+        reporter.report_data('line 1', 'station 0', 'PASS', 100)
+        wait_until_taken(reporter)
+
+        reporter.update_station_status('line 1', 'station 1', 'RED')
+        reporter.report_data('line 1', 'station 1', 'PASS', 100, callback=errors.append)
+        reporter.update_station_status('line 1', 'station 2', 'RED')
+        client.gate.set()
+        reporter.close()
+
+        self.assertIsInstance(errors[0], AndonQueueFullException)
+        self.assertEqual(['station 0', 'station 1', 'station 2'],
+                [call[2] for call in client.calls])
+
+    def test_stats_per_priority(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client)
+        reporter.report_data('line 1', 'station 0', 'PASS', 100)
+        wait_until_taken(reporter)
+        reporter.update_station_status('line 1', 'station 1', 'RED')
+
+        stats = reporter.stats()
+        self.assertEqual(1, stats['alarm']['depth'])
+        self.assertEqual(1, stats['report']['dispatched'])
+        client.gate.set()
+        reporter.close()
+        self.assertEqual(1, reporter.stats()['alarm']['dispatched'])
+        self.assertGreater(reporter.stats()['alarm']['wait_max'], 0)
+
+    def test_raise_when_full(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client, max_queue_size=1, when_full='raise')
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 1)
+        self._wait_for_empty_queue(reporter)
+        reporter.report_data('line 1', 'station 1', 'PASS', 2)
+
+        with self.assertRaises(AndonQueueFullException):
+            reporter.report_data('line 1', 'station 1', 'PASS', 3)
+
+        client.gate.set()
+        reporter.close()
+        self.assertEqual([1, 2], [call[4] for call in client.calls])
+
+    def test_drop_oldest_when_full(self):
+        client = FakeClient()
+        client.gate.clear()
+        results = []
+        reporter = BufferedReporter(client, max_queue_size=2, when_full='drop_oldest')
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 1)
+        self._wait_for_empty_queue(reporter)
+        reporter.report_data('line 1', 'station 1', 'PASS', 2, callback=results.append)
+        reporter.report_data('line 1', 'station 1', 'PASS', 3)
+        reporter.report_data('line 1', 'station 1', 'PASS', 4)
+
+        client.gate.set()
+        reporter.close()
+        self.assertEqual([1, 3, 4], [call[4] for call in client.calls])
+        self.assertIsInstance(results[0], AndonQueueFullException)
+
+    def test_preallocated_queue(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client, max_queue_size=3, when_full='drop_oldest',
+                preallocate=True)
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 1)
+        self._wait_for_empty_queue(reporter)
+        for n in range(2, 7):
+            reporter.report_data('line 1', 'station 1', 'PASS', n)
+
+        client.gate.set()
+        reporter.close()
+        self.assertEqual([1, 4, 5, 6], [call[4] for call in client.calls])
+
+    def test_block_when_full(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client, max_queue_size=1)
+
+        reporter.report_data('line 1', 'station 1', 'PASS', 1)
+        self._wait_for_empty_queue(reporter)
+        reporter.report_data('line 1', 'station 1', 'PASS', 2)
+
+        blocked = threading.Thread(target=reporter.report_data,
+                args=('line 1', 'station 1', 'PASS', 3))
+        blocked.start()
+        blocked.join(0.05)
+        self.assertTrue(blocked.is_alive())
+
+        client.gate.set()
+        blocked.join(1)
+        reporter.close()
+        self.assertEqual([1, 2, 3], [call[4] for call in client.calls])
+
+    def test_multiple_workers_send_concurrently(self):
+        client = FakeClient()
+        client.gate.clear()
+        reporter = BufferedReporter(client, workers=3)
+
+        for i in range(3):
+            reporter.report_data('line 1', 'station 1', 'PASS', i)
+        self._wait_for_empty_queue(reporter)
+
+        client.gate.set()
+        reporter.close()
+        self.assertEqual(3, len(client.calls))
+
+    def test_fail_when_closed(self):
+        reporter = BufferedReporter(FakeClient())
+        reporter.close()
+
+        with self.assertRaises(AndonAppException):
+            reporter.report_data('line 1', 'station 1', 'PASS', 100)
+
+    def _wait_for_empty_queue(self, reporter):
+        for _ in range(100):
+            if not reporter.queue_size:
+                return
+            threading.Event().wait(0.01)
+        self.fail('Queue was not drained')
@@ -0,0 +1,304 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock, patch
+from andonapp import AndonAppClient
+from andonapp.deadline import Deadline
+from andonapp.exceptions import *
+from andonapp.retry import CircuitBreaker, RetryBudget, RetryPolicy
+from andonapp.spool import Spool
+from benchmarks.stub_server import StubServer
+
+ERROR_PAGE = b'<html><body><h1>503 Service Unavailable</h1></body></html>'
+
+
+class Flaky(object):
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+
+    def test_retries_internal_errors(self):
+        func = Flaky(AndonInternalErrorException('oops'), 'done')
+
+        result = RetryPolicy(max_attempts=3).call(func, sleep=self.sleeps.append)
+
+        self.assertEqual('done', result)
+        self.assertEqual(2, func.calls)
+
+    def test_retries_connection_errors(self):
+        func = Flaky(AndonConnectionException('down'), AndonConnectionException('down'), 'done')
+
+        RetryPolicy(max_attempts=3).call(func, sleep=self.sleeps.append)
+
+        self.assertEqual(3, func.calls)
+
+    def test_gives_up_after_max_attempts(self):
+        func = Flaky(*[AndonInternalErrorException('oops')] * 3)
+
+        with self.assertRaises(AndonInternalErrorException):
+            RetryPolicy(max_attempts=3).call(func, sleep=self.sleeps.append)
+
+        self.assertEqual(3, func.calls)
+        self.assertEqual(2, len(self.sleeps))
+
+    def test_never_retries_invalid_requests(self):
+        func = Flaky(AndonInvalidRequestException('bad'))
+
+        with self.assertRaises(AndonInvalidRequestException):
+            RetryPolicy(max_attempts=3).call(func, sleep=self.sleeps.append)
+
+        self.assertEqual(1, func.calls)
+
+    def test_never_retries_unauthorized_requests(self):
+        func = Flaky(AndonUnauthorizedRequestException('no'))
+
+        with self.assertRaises(AndonUnauthorizedRequestException):
+            RetryPolicy(max_attempts=3).call(func, sleep=self.sleeps.append)
+
+        self.assertEqual(1, func.calls)
+
+    def test_retries_throttled_requests(self):
+        func = Flaky(AndonThrottledException('slow down'), 'done')
+
+        RetryPolicy(max_attempts=3).call(func, sleep=self.sleeps.append)
+
+        self.assertEqual(2, func.calls)
+
+    def test_waits_for_retry_after(self):
+        func = Flaky(AndonThrottledException('slow down', retry_after=2), 'done')
+
+        RetryPolicy(max_attempts=3, backoff_max=1).call(func, sleep=self.sleeps.append)
+
+        self.assertEqual([2], self.sleeps)
+
+    def test_gives_up_when_retry_after_passes_deadline(self):
+        func = Flaky(AndonThrottledException('slow down', retry_after=30), 'done')
+
+        with self.assertRaises(AndonDeadlineExceededException):
+            RetryPolicy().call(func, sleep=self.sleeps.append, deadline=Deadline(5))
+        self.assertEqual([], self.sleeps)
+
+    def test_exponential_backoff_without_jitter(self):
+        policy = RetryPolicy(backoff_base=0.1, backoff_max=0.3, jitter=False)
+
+        self.assertEqual([0.1, 0.2, 0.3], [policy.backoff(i) for i in (1, 2, 3)])
+
+    def test_jitter_stays_within_backoff(self):
+        policy = RetryPolicy(backoff_base=0.1, backoff_max=1)
+
+        for _ in range(100):
+            self.assertTrue(0 <= policy.backoff(2) <= 0.2)
+
+    def test_stops_retrying_at_deadline(self):
+        func = Flaky(AndonConnectionException('down'), 'done')
+        policy = RetryPolicy(max_attempts=3, backoff_base=1, jitter=False)
+
+        with self.assertRaises(AndonDeadlineExceededException):
+            policy.call(func, sleep=self.sleeps.append, deadline=Deadline(0.5))
+        self.assertEqual(1, func.calls)
+        self.assertEqual([], self.sleeps)
+
+    def test_expired_deadline_does_not_trip_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+
+        with self.assertRaises(AndonDeadlineExceededException):
+            RetryPolicy().call(Flaky('done'), breaker, deadline=Deadline(0))
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+    def test_local_deadline_does_not_close_half_open_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record(True)
+
+        with self.assertRaises(AndonDeadlineExceededException):
+            RetryPolicy().call(Flaky(AndonDeadlineExceededException('queued too long')),
+                    breaker)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+
+        breaker.before_call()
+        self.assertEqual(CircuitBreaker.HALF_OPEN, breaker.state)
+
+    def test_local_deadline_keeps_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record(True)
+
+        with self.assertRaises(AndonDeadlineExceededException):
+            RetryPolicy().call(Flaky(AndonDeadlineExceededException('queued too long')),
+                    breaker)
+        breaker.record(True)
+
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+
+    def test_stops_retrying_when_budget_spent(self):
+        budget = RetryBudget(ratio=0, max_tokens=1)
+        policy = RetryPolicy(max_attempts=5, budget=budget)
+        func = Flaky(*[AndonInternalErrorException('oops')] * 5)
+
+        with self.assertRaises(AndonInternalErrorException):
+            policy.call(func, sleep=self.sleeps.append)
+
+        self.assertEqual(2, func.calls)
+
+    def test_budget_refills_with_traffic(self):
+        budget = RetryBudget(ratio=0.5, max_tokens=2)
+        budget.withdraw()
+        budget.withdraw()
+
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record(True)
+        breaker.before_call()
+        breaker.record(True)
+
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+        with self.assertRaises(AndonCircuitOpenException):
+            breaker.before_call()
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record(True)
+        breaker.record(False)
+        breaker.record(True)
+
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+    def test_half_open_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record(True)
+        time.sleep(0.02)
+
+        breaker.before_call()
+        self.assertEqual(CircuitBreaker.HALF_OPEN, breaker.state)
+        with self.assertRaises(AndonCircuitOpenException):
+            breaker.before_call()
+
+        breaker.record(True)
+        self.assertEqual(CircuitBreaker.OPEN, breaker.state)
+
+    def test_half_open_closes_on_success(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record(True)
+        breaker.before_call()
+        breaker.record(False)
+
+        self.assertEqual(CircuitBreaker.CLOSED, breaker.state)
+
+    def test_policy_fails_fast_when_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        func = Flaky(AndonConnectionException('down'), 'unused')
+
+        with self.assertRaises(AndonCircuitOpenException):
+            RetryPolicy(max_attempts=3).call(func, breaker, sleep=lambda s: None)
+
+        self.assertEqual(1, func.calls)
+
+
+class TestClientRetries(unittest.TestCase):
+    @patch('requests.Session.post')
+    def test_client_retries_internal_error(self, mock_post):
+        error = Mock(status_code=500, text='', json=lambda: {
+            'errorType': 'INTERNAL_ERROR',
+            'errorMessage': 'oops'
+        })
+        ok = Mock(status_code=200)
+        mock_post.side_effect = [error, ok]
+
+        client = AndonAppClient('Demo', 'api-token',
+                retry_policy=RetryPolicy(backoff_base=0))
+        client.report_data('line 1', 'station 1', 'PASS', 100)
+
+        self.assertEqual(2, mock_post.call_count)
+
+    @patch('requests.Session.post')
+    def test_client_circuit_breaker_without_retries(self, mock_post):
+        mock_post.return_value.status_code = 500
+        mock_post.return_value.json = lambda: {
+            'errorType': 'INTERNAL_ERROR',
+            'errorMessage': 'oops'
+        }
+
+        client = AndonAppClient('Demo', 'api-token',
+                circuit_breaker=CircuitBreaker(failure_threshold=1))
+
+        with self.assertRaises(AndonInternalErrorException):
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+        with self.assertRaises(AndonCircuitOpenException):
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+        self.assertEqual(1, mock_post.call_count)
+
+    def test_client_retries_and_spools_proxy_error_page(self):
+        directory = tempfile.mkdtemp()
+        spool = Spool(os.path.join(directory, 'spool.db'), replay_interval=60)
+        try:
+            with StubServer(status=503, body=ERROR_PAGE) as server:
+                client = AndonAppClient('Demo', 'api-token', spool=spool,
+                        retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+                client.endpoint = server.endpoint
+                client.report_data('line 1', 'station 1', 'PASS', 100)
+                client.close()
+
+            # Three attempts, then possibly a replay of the spooled event.
+            self.assertGreaterEqual(len(server.requests), 3)
+            self.assertEqual(1, spool.backlog_size)
+        finally:
+            spool.close()
+            shutil.rmtree(directory)
+
+    def test_client_retries_too_many_requests(self):
+        with StubServer(status=429, body=b'<html>Too Many Requests</html>',
+                headers={'Retry-After': '0'}) as server:
+            client = AndonAppClient('Demo', 'api-token',
+                    retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+            client.endpoint = server.endpoint
+
+            with self.assertRaises(AndonThrottledException) as context:
+                client.report_data('line 1', 'station 1', 'PASS', 100)
+            client.close()
+
+        self.assertEqual(0, context.exception.retry_after)
+        self.assertEqual(3, len(server.requests))
+
+    def test_client_retries_request_timeout(self):
+        with StubServer(status=408, body={'status': 408, 'error': 'Request Timeout',
+                'message': 'Timed out reading request'}) as server:
+            client = AndonAppClient('Demo', 'api-token', transport='http',
+                    retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+            client.endpoint = server.endpoint
+
+            with self.assertRaises(AndonThrottledException):
+                client.report_data('line 1', 'station 1', 'PASS', 100)
+            client.close()
+
+        self.assertEqual(3, len(server.requests))
+
+    def test_client_raises_non_json_rejection_by_status(self):
+        with StubServer(status=401, body=b'<html>Unauthorized</html>') as server:
+            client = AndonAppClient('Demo', 'api-token',
+                    retry_policy=RetryPolicy(max_attempts=3, backoff_base=0))
+            client.endpoint = server.endpoint
+
+            with self.assertRaisesRegex(AndonUnauthorizedRequestException, 'Status 401'):
+                client.report_data('line 1', 'station 1', 'PASS', 100)
+            client.close()
+
+        self.assertEqual(1, len(server.requests))
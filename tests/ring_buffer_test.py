@@ -0,0 +1,53 @@
+import unittest
+from andonapp.ring_buffer import RingBuffer
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_first_in_first_out_across_wraparound(self):
+        buffer = RingBuffer(4)
+        for n in range(3):
+            buffer.append(n)
+        self.assertEqual(0, buffer.popleft())
+        self.assertEqual(1, buffer.popleft())
+        for n in range(3, 6):
+            buffer.append(n)
+
+        self.assertEqual(4, len(buffer))
+        self.assertEqual(2, buffer[0])
+        self.assertEqual(5, buffer[-1])
+        self.assertEqual([2, 3, 4, 5], list(buffer))
+        self.assertEqual([2, 3, 4, 5], [buffer.popleft() for _ in range(4)])
+        self.assertFalse(buffer)
+
+    def test_grows_up_to_capacity(self):
+        buffer = RingBuffer(40)
+        buffer.append('a')
+        buffer.popleft()
+        for n in range(40):
+            buffer.append(n)
+
+        self.assertEqual(40, len(buffer._items))
+        self.assertEqual(list(range(40)), list(buffer))
+        with self.assertRaises(IndexError):
+            buffer.append(40)
+
+    def test_preallocate(self):
+        buffer = RingBuffer(1000, preallocate=True)
+
+        self.assertEqual(1000, len(buffer._items))
+        self.assertEqual(0, len(buffer))
+
+    def test_releases_popped_items(self):
+        buffer = RingBuffer(4)
+        buffer.append(object())
+        buffer.popleft()
+
+        self.assertEqual([None] * 4, buffer._items)
+
+    def test_empty(self):
+        buffer = RingBuffer(4)
+
+        with self.assertRaises(IndexError):
+            buffer.popleft()
+        with self.assertRaises(IndexError):
+            buffer[0]
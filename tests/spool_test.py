@@ -0,0 +1,268 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+from andonapp import AndonAppClient
+from andonapp.exceptions import *
+from andonapp.rate_limit import RateLimiter
+from andonapp.spool import Spool
+from benchmarks.stub_server import StubServer
+
+
+def unused_endpoint():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'http://127.0.0.1:{}'.format(port)
+
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'spool.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replays_in_order(self):
+        spool = Spool(self.path, max_replay_rate=0)
+        spool.append('/data/report', {'n': 1})
+        spool.append('/station/update', {'n': 2})
+        sent = []
+
+        self.assertEqual(2, spool.replay(lambda path, request: sent.append((path, request))))
+        self.assertEqual([('/data/report', {'n': 1}), ('/station/update', {'n': 2})], sent)
+        self.assertEqual(0, spool.backlog_size)
+        spool.close()
+
+    def test_survives_restart(self):
+        spool = Spool(self.path)
+        spool.append('/data/report', {'n': 1})
+        spool.close()
+
+        spool = Spool(self.path)
+        self.assertEqual(1, spool.backlog_size)
+        self.assertGreaterEqual(spool.backlog_age, 0)
+        spool.close()
+
+    def test_stops_replay_while_unreachable(self):
+        spool = Spool(self.path, max_replay_rate=0)
+        spool.append('/data/report', {'n': 1})
+        spool.append('/data/report', {'n': 2})
+
+        def send(path, request):
+            raise AndonConnectionException('down')
+
+        self.assertEqual(0, spool.replay(send))
+        self.assertEqual(2, spool.backlog_size)
+        spool.close()
+
+    def test_discards_rejected_events(self):
+        spool = Spool(self.path, max_replay_rate=0)
+        spool.append('/data/report', {'n': 1})
+
+        def send(path, request):
+            raise AndonInvalidRequestException('bad')
+
+        self.assertEqual(1, spool.replay(send))
+        self.assertEqual(0, spool.backlog_size)
+        spool.close()
+
+    def test_keeps_events_after_other_failures(self):
+        spool = Spool(self.path, max_replay_rate=0)
+        spool.append('/data/report', {'n': 1})
+
+        for exception in [AndonUnauthorizedRequestException('rotated'),
+                ValueError('Expecting value')]:
+            def send(path, request):
+                raise exception
+
+            self.assertEqual(0, spool.replay(send))
+            self.assertEqual(1, spool.backlog_size)
+        spool.close()
+
+    def test_keeps_events_behind_non_json_error_page(self):
+        spool = Spool(self.path, max_replay_rate=0)
+        spool.append('/data/report', {'orgName': 'Demo', 'lineName': 'line 1',
+                'stationName': 'station 1', 'passResult': 'PASS',
+                'processTimeSeconds': 1})
+
+        for transport in ['requests', 'http']:
+            with StubServer(status=503,
+                    body=b'<html><body>503 Service Unavailable</body></html>') as server:
+                client = AndonAppClient('Demo', 'api-token', transport=transport)
+                client.endpoint = server.endpoint
+
+                self.assertEqual(0, spool.replay(client._deliver))
+                client.close()
+
+            self.assertEqual(1, len(server.requests))
+            self.assertEqual(1, spool.backlog_size)
+        spool.close()
+
+    def test_keeps_throttled_events(self):
+        spool = Spool(self.path, max_replay_rate=0)
+        for i in range(3):
+            spool.append('/data/report', {'orgName': 'Demo', 'lineName': 'line 1',
+                    'stationName': 'station 1', 'passResult': 'PASS',
+                    'processTimeSeconds': i})
+
+        for status in [429, 408, 400, 404]:
+            with StubServer(status=status, body=b'<html>Try again later</html>') as server:
+                client = AndonAppClient('Demo', 'api-token')
+                client.endpoint = server.endpoint
+
+                self.assertEqual(0, spool.replay(client._deliver))
+                client.close()
+
+            self.assertEqual(3, spool.backlog_size)
+        spool.close()
+
+    def test_discards_events_andon_rejects_as_bad(self):
+        spool = Spool(self.path, max_replay_rate=0)
+        spool.append('/data/report', {'n': 1})
+        spool.append('/data/report', {'n': 2})
+
+        for exception in [AndonBadRequestException('Bad request'),
+                AndonResourceNotFoundException('Station not found.')]:
+            def send(path, request):
+                raise exception
+
+            self.assertEqual(1, spool.replay(send, max_events=1))
+        self.assertEqual(0, spool.backlog_size)
+        spool.close()
+
+    def test_waits_for_retry_after(self):
+        spool = Spool(self.path, max_replay_rate=0)
+        spool.append('/data/report', {'n': 1})
+        sent = []
+
+        def send(path, request):
+            sent.append(request)
+            if len(sent) == 1:
+                raise AndonThrottledException('slow down', retry_after=0.2)
+
+        self.assertEqual(0, spool.replay(send))
+        self.assertEqual(0, spool.replay(send))
+        self.assertEqual(1, len(sent))
+
+        time.sleep(0.25)
+        self.assertEqual(1, spool.replay(send))
+        spool.close()
+
+    def test_one_replay_at_a_time(self):
+        first = Spool(self.path, max_replay_rate=0)
+        second = Spool(self.path, max_replay_rate=0)
+        first.append('/data/report', {'n': 1})
+        second.append('/data/report', {'n': 2})
+        nested = []
+
+        def send(path, request):
+            nested.append(second.replay(lambda path, request: None))
+
+        self.assertEqual(2, first.backlog_size)
+        self.assertEqual(2, first.replay(send))
+        self.assertEqual([0, 0], nested)
+        self.assertEqual(0, second.backlog_size)
+        first.close()
+        second.close()
+
+    def test_takes_over_expired_lease(self):
+        first = Spool(self.path, max_replay_rate=0, lease_timeout=0.05)
+        second = Spool(self.path, max_replay_rate=0)
+        first.append('/data/report', {'n': 1})
+        first.append('/data/report', {'n': 2})
+        nested = []
+
+        def send(path, request):
+            time.sleep(0.1)
+            nested.append(second.replay(lambda path, request: None, max_events=1))
+
+        self.assertEqual(1, first.replay(send, max_events=1))
+        self.assertEqual([1], nested)
+        self.assertEqual(1, first.backlog_size)
+        first.close()
+        second.close()
+
+    def test_paces_replay(self):
+        spool = Spool(self.path, max_replay_rate=20)
+        for i in range(3):
+            spool.append('/data/report', {'n': i})
+
+        started = time.time()
+        spool.replay(lambda path, request: None)
+
+        self.assertGreaterEqual(time.time() - started, 0.14)
+        spool.close()
+
+    def test_backlog_age_when_empty(self):
+        spool = Spool(self.path)
+        self.assertEqual(0, spool.backlog_age)
+        spool.close()
+
+    def test_client_spools_and_replays_after_outage(self):
+        spool = Spool(self.path, max_replay_rate=0, replay_interval=0.05)
+        client = AndonAppClient('Demo', 'api-token', spool=spool)
+        client.endpoint = unused_endpoint()
+
+        client.report_data('line 1', 'station 1', 'PASS', 1)
+        client.report_data('line 1', 'station 1', 'PASS', 2)
+        self.assertEqual(2, spool.backlog_size)
+
+        with StubServer() as server:
+            client.endpoint = server.endpoint
+            for _ in range(100):
+                if not spool.backlog_size:
+                    break
+                time.sleep(0.01)
+            client.close()
+
+        self.assertEqual(0, spool.backlog_size)
+        self.assertEqual([1, 2], [json.loads(body.decode('utf-8'))['processTimeSeconds']
+                for path, headers, body in server.requests])
+        spool.close()
+
+    def test_client_raises_rejections_without_spooling(self):
+        spool = Spool(self.path)
+        with StubServer(status=400, body={
+                    'errorType': 'INVALID_REQUEST',
+                    'errorMessage': 'bad'
+                }) as server:
+            client = AndonAppClient('Demo', 'api-token', spool=spool)
+            client.endpoint = server.endpoint
+
+            with self.assertRaises(AndonInvalidRequestException):
+                client.report_data('line 1', 'station 1', 'PAS', 1)
+            client.close()
+
+        self.assertEqual(0, spool.backlog_size)
+        spool.close()
+
+    def test_client_raises_expired_deadline_without_spooling(self):
+        spool = Spool(self.path)
+        with StubServer() as server:
+            client = AndonAppClient('Demo', 'api-token', spool=spool,
+                    rate_limiter=RateLimiter(rate=1, burst=1))
+            client.endpoint = server.endpoint
+            client.report_data('line 1', 'station 1', 'PASS', 1)
+
+            with self.assertRaises(AndonDeadlineExceededException):
+                client.report_data('line 1', 'station 1', 'PASS', 2, deadline=0.1)
+            client.report_data('line 1', 'station 1', 'PASS', 3)
+            client.close()
+
+        self.assertEqual(0, spool.backlog_size)
+        self.assertEqual([1, 3], [json.loads(body.decode('utf-8'))['processTimeSeconds']
+                for path, headers, body in server.requests])
+        spool.close()
+
+    def test_client_raises_connection_error_without_spool(self):
+        client = AndonAppClient('Demo', 'api-token')
+        client.endpoint = unused_endpoint()
+
+        with self.assertRaises(AndonConnectionException):
+            client.report_data('line 1', 'station 1', 'PASS', 1)
@@ -0,0 +1,106 @@
+import time
+import unittest
+from unittest.mock import patch
+from andonapp import AndonAppClient
+from andonapp.exceptions import *
+from andonapp.status_cache import StatusCache
+
+
+def status(color, line='line 1', station='station 1', reason=None):
+    return {
+        'orgName': 'Demo',
+        'lineName': line,
+        'stationName': station,
+        'statusColor': color,
+        'statusReason': reason,
+        'statusNotes': None
+    }
+
+
+class TestStatusCache(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+
+    def test_suppresses_unchanged_status(self):
+        cache = StatusCache()
+
+        cache.update(status('GREEN'), self.sent.append)
+        cache.update(status('GREEN'), self.sent.append)
+        cache.update(status('RED'), self.sent.append)
+        cache.update(status('RED', reason='Missing parts'), self.sent.append)
+
+        self.assertEqual(['GREEN', 'RED', 'RED'], [r['statusColor'] for r in self.sent])
+        self.assertEqual({'sent': 3, 'suppressed': 1, 'coalesced': 0}, cache.stats())
+
+    def test_tracks_stations_separately(self):
+        cache = StatusCache()
+
+        cache.update(status('GREEN', station='station 1'), self.sent.append)
+        cache.update(status('GREEN', station='station 2'), self.sent.append)
+
+        self.assertEqual(2, len(self.sent))
+
+    def test_resends_after_refresh_ttl(self):
+        cache = StatusCache(refresh_ttl=0.01)
+
+        cache.update(status('GREEN'), self.sent.append)
+        time.sleep(0.02)
+        cache.update(status('GREEN'), self.sent.append)
+
+        self.assertEqual(2, len(self.sent))
+
+    def test_failed_send_is_not_cached(self):
+        cache = StatusCache()
+
+        def fail(request):
+            raise AndonConnectionException('down')
+
+        with self.assertRaises(AndonConnectionException):
+            cache.update(status('GREEN'), fail)
+        cache.update(status('GREEN'), self.sent.append)
+
+        self.assertEqual(1, len(self.sent))
+        self.assertIsNotNone(cache.get('line 1', 'station 1'))
+
+    def test_coalesces_burst_to_final_status(self):
+        cache = StatusCache(coalesce_window=0.05)
+
+        cache.update(status('GREEN'), self.sent.append)
+        cache.update(status('YELLOW'), self.sent.append)
+        cache.update(status('RED'), self.sent.append)
+        self.assertEqual([], self.sent)
+
+        time.sleep(0.1)
+        self.assertEqual(['RED'], [r['statusColor'] for r in self.sent])
+        self.assertEqual({'sent': 1, 'suppressed': 0, 'coalesced': 2}, cache.stats())
+
+    def test_coalesced_flip_back_is_suppressed(self):
+        cache = StatusCache(coalesce_window=0.05)
+        cache.update(status('GREEN'), self.sent.append)
+        cache.flush()
+
+        cache.update(status('YELLOW'), self.sent.append)
+        cache.update(status('GREEN'), self.sent.append)
+        cache.flush()
+
+        self.assertEqual(['GREEN'], [r['statusColor'] for r in self.sent])
+        self.assertEqual(1, cache.stats()['suppressed'])
+
+    def test_flush_sends_held_updates(self):
+        cache = StatusCache(coalesce_window=60)
+
+        cache.update(status('RED'), self.sent.append)
+        cache.flush()
+
+        self.assertEqual(1, len(self.sent))
+
+    @patch('requests.Session.post')
+    def test_client_skips_unchanged_status(self, mock_post):
+        mock_post.return_value.status_code = 200
+        client = AndonAppClient('Demo', 'api-token', status_cache=StatusCache())
+
+        client.update_station_status('line 1', 'station 1', 'GREEN')
+        client.update_station_status('line 1', 'station 1', 'GREEN')
+
+        self.assertEqual(1, mock_post.call_count)
+        self.assertEqual(1, client.status_cache.suppressed)
@@ -0,0 +1,119 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from andonapp import AndonAppClient
+from andonapp.exceptions import *
+from andonapp.traffic import Recorder, main, read_log, replay
+from benchmarks.stub_server import StubServer
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.server = StubServer().start()
+        self.client = AndonAppClient('Demo', 'api-token', transport='http')
+        self.client.endpoint = self.server.endpoint
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_records_requests_and_outcomes(self):
+        path = self.path('shift.ndjson')
+        with Recorder(path) as recorder:
+            self.client.add_request_hooks(after=recorder)
+            self.client.report_data('line 1', 'station 1', 'PASS', 100)
+            self.server.status = 400
+            self.server.body = {'errorType': 'INVALID_REQUEST', 'errorMessage': 'bad'}
+            with self.assertRaises(AndonInvalidRequestException):
+                self.client.update_station_status('line 1', 'station 1', 'RED', 'Jam')
+
+        report, status = list(read_log(path))
+        self.assertEqual('/data/report', report['p'])
+        self.assertEqual({
+            'orgName': 'Demo',
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'passResult': 'PASS',
+            'processTimeSeconds': 100
+        }, report['r'])
+        self.assertEqual(('ok', 200), (report['o'], report['s']))
+        self.assertEqual(('AndonInvalidRequestException', 400), (status['o'], status['s']))
+        self.assertLessEqual(report['t'], status['t'])
+        self.assertLess(abs(time.time() - report['t']), 5)
+
+    def test_compressed_log_in_batches(self):
+        path = self.path('shift.ndjson.gz')
+        recorder = Recorder(path, buffer_size=2)
+        self.client.add_request_hooks(after=recorder)
+        for n in range(5):
+            self.client.report_data('line 1', 'station {}'.format(n), 'PASS', 100)
+
+        self.assertEqual(4, len(list(read_log(path))))
+        recorder.close()
+
+        with gzip.open(path, 'rb') as f:
+            self.assertEqual(5, len(f.read().splitlines()))
+        self.assertEqual(['station {}'.format(n) for n in range(5)],
+                [record['r']['stationName'] for record in read_log(path)])
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'shift.ndjson')
+        now = time.time()
+        with open(self.path, 'w') as f:
+            for n in range(10):
+                f.write(json.dumps({
+                    't': now + n * 0.1,
+                    'p': '/station/update' if n % 2 else '/data/report',
+                    'r': {'orgName': 'Demo', 'lineName': 'line 1', 'stationName': 'station 1',
+                            'passResult': 'PASS', 'processTimeSeconds': n},
+                    'o': 'ok', 's': 200, 'l': 0.01}) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replays_with_recorded_timing(self):
+        with StubServer() as server:
+            result = replay(self.path, server.endpoint, speed=1, concurrency=4,
+                    transport='http')
+
+        self.assertEqual(10, result.requests)
+        self.assertEqual({'ok': 10}, result.outcomes)
+        self.assertGreaterEqual(result.duration, 0.85)
+        self.assertAlmostEqual(10, result.recorded_rate, delta=1.5)
+        self.assertEqual(5, sum(1 for path, _, _ in server.requests if path == '/data/report'))
+        self.assertEqual(list(range(10)), sorted(json.loads(body.decode('utf-8'))['processTimeSeconds']
+                for _, _, body in server.requests))
+
+    def test_accelerated_replay_reports_errors(self):
+        with StubServer(status=500, body={
+                    'errorType': 'INTERNAL_ERROR',
+                    'errorMessage': 'down'
+                }) as server:
+            result = replay(self.path, server.endpoint, speed=None, concurrency=4,
+                    transport='http')
+
+        self.assertLess(result.duration, 0.85)
+        self.assertEqual({'AndonInternalErrorException': 10}, result.outcomes)
+        self.assertIsNone(result.recorded_rate)
+        self.assertGreater(result.latency['max'], 0)
+        self.assertLessEqual(result.latency['p50'], result.latency['p99'])
+
+    def test_command_line(self):
+        with StubServer() as server:
+            code = main([self.path, '--endpoint', server.endpoint, '--speed', 'max',
+                    '--transport', 'http', '--json'])
+
+        self.assertEqual(0, code)
+        self.assertEqual(10, len(server.requests))
@@ -0,0 +1,114 @@
+import json
+import socket
+import subprocess
+import sys
+import unittest
+from andonapp import AndonAppClient
+from andonapp.exceptions import *
+from andonapp.http_transport import HttpTransport, _is_dropped
+from andonapp.transport import Transport, get_transport
+from benchmarks.stub_server import StubServer
+
+
+class TestGetTransport(unittest.TestCase):
+    def test_by_name(self):
+        transport = get_transport('http', pool_maxsize=3)
+
+        self.assertIsInstance(transport, HttpTransport)
+        self.assertEqual(3, transport._pool_maxsize)
+
+    def test_default_prefers_requests(self):
+        from andonapp.requests_transport import RequestsTransport
+
+        self.assertIsInstance(get_transport(), RequestsTransport)
+
+    def test_passes_instances_through(self):
+        transport = Transport()
+
+        self.assertIs(transport, get_transport(transport))
+
+    def test_unknown_name(self):
+        with self.assertRaises(ValueError):
+            get_transport('carrier-pigeon')
+
+    def test_import_is_lazy(self):
+        output = subprocess.check_output([sys.executable, '-c',
+                'import sys, andonapp; andonapp.AndonAppClient("Demo", "token"); '
+                'print(sorted(m for m in ("requests", "asyncio", "http.client") '
+                'if m in sys.modules))'])
+
+        self.assertEqual("[]", output.decode('utf-8').strip())
+
+
+class TestHttpTransport(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().start()
+        self.client = AndonAppClient('Demo', 'api-token', transport='http')
+        self.client.endpoint = self.server.endpoint + '/public/api/v1'
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_report_data(self):
+        self.client.report_data('line 1', 'station 1', 'FAIL', 200, 'Test Failure', 'notes')
+
+        path, headers, body = self.server.requests[0]
+        self.assertEqual('/public/api/v1/data/report', path)
+        self.assertEqual('Bearer api-token', headers['Authorization'])
+        self.assertEqual('application/json; charset=utf-8', headers['Content-Type'])
+        self.assertEqual({
+            'orgName': 'Demo',
+            'lineName': 'line 1',
+            'stationName': 'station 1',
+            'passResult': 'FAIL',
+            'processTimeSeconds': 200,
+            'failReason': 'Test Failure',
+            'failNotes': 'notes'
+        }, json.loads(body.decode('utf-8')))
+
+    def test_reuses_connection(self):
+        for n in range(3):
+            self.client.update_station_status('line 1', 'station 1', 'GREEN')
+
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual(1, len(self.server.connections))
+
+    def test_closes_connections_without_keep_alive(self):
+        client = AndonAppClient('Demo', 'api-token', keep_alive=False, transport='http')
+        client.endpoint = self.server.endpoint
+        for n in range(2):
+            client.update_station_status('line 1', 'station 1', 'GREEN')
+        client.close()
+
+        self.assertEqual(2, len(self.server.connections))
+
+    def test_error_response(self):
+        self.server.status = 400
+        self.server.body = {'errorType': 'RESOURCE_NOT_FOUND', 'errorMessage': 'Station not found.'}
+
+        with self.assertRaisesRegex(AndonResourceNotFoundException, 'Station not found.'):
+            self.client.report_data('line 1', 'station 1', 'PASS', 100)
+
+    def test_read_timeout(self):
+        self.server.latency = 0.3
+        client = AndonAppClient('Demo', 'api-token', read_timeout=0.05, transport='http')
+        client.endpoint = self.server.endpoint
+
+        with self.assertRaises(AndonTimeoutException):
+            client.report_data('line 1', 'station 1', 'PASS', 100)
+        client.close()
+
+    def test_unreachable(self):
+        self.client.endpoint = 'http://127.0.0.1:1'
+
+        with self.assertRaises(AndonConnectionException):
+            self.client.report_data('line 1', 'station 1', 'PASS', 100)
+
+    def test_detects_dropped_idle_connection(self):
+        local, remote = socket.socketpair()
+
+        self.assertFalse(_is_dropped(local))
+        remote.close()
+        self.assertTrue(_is_dropped(local))
+        local.close()
@@ -0,0 +1,132 @@
+import unittest
+from unittest.mock import patch
+from andonapp import AndonAppClient
+from andonapp.exceptions import *
+from andonapp.validation import StationRegistry, Validator
+
+
+def report(**overrides):
+    request = {
+        'orgName': 'Demo',
+        'lineName': 'line 1',
+        'stationName': 'station 1',
+        'passResult': 'PASS',
+        'processTimeSeconds': 100,
+        'failReason': None,
+        'failNotes': None
+    }
+    request.update(overrides)
+    return request
+
+
+def status(**overrides):
+    request = {
+        'orgName': 'Demo',
+        'lineName': 'line 1',
+        'stationName': 'station 1',
+        'statusColor': 'GREEN',
+        'statusReason': None,
+        'statusNotes': None
+    }
+    request.update(overrides)
+    return request
+
+
+class TestValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = Validator()
+
+    def test_accepts_valid_requests(self):
+        self.validator.validate_report(report())
+        self.validator.validate_report(report(passResult='FAIL', processTimeSeconds=0,
+                failReason='Test Failure', failNotes='notes'))
+        self.validator.validate_status(status(statusColor='RED', statusReason='Missing parts'))
+
+    def test_rejects_invalid_pass_result(self):
+        with self.assertRaisesRegex(AndonInvalidRequestException, "'PAS' is not a valid pass result"):
+            self.validator.validate_report(report(passResult='PAS'))
+
+    def test_rejects_missing_line_name(self):
+        with self.assertRaisesRegex(AndonInvalidRequestException, 'lineName may not be empty'):
+            self.validator.validate_report(report(lineName=None))
+
+    def test_rejects_empty_station_name(self):
+        with self.assertRaisesRegex(AndonInvalidRequestException, 'stationName may not be empty'):
+            self.validator.validate_status(status(stationName=''))
+
+    def test_rejects_negative_process_time(self):
+        with self.assertRaises(AndonInvalidRequestException):
+            self.validator.validate_report(report(processTimeSeconds=-1))
+
+    def test_rejects_non_finite_process_time(self):
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.assertRaises(AndonInvalidRequestException):
+                self.validator.validate_report(report(processTimeSeconds=value))
+
+    def test_rejects_non_numeric_process_time(self):
+        for value in ('100', None, True):
+            with self.assertRaises(AndonInvalidRequestException):
+                self.validator.validate_report(report(processTimeSeconds=value))
+
+    def test_rejects_unknown_status_color(self):
+        with self.assertRaisesRegex(AndonInvalidRequestException, "'BLUE' is not a valid status color"):
+            self.validator.validate_status(status(statusColor='BLUE'))
+
+    def test_rejects_non_string_notes(self):
+        with self.assertRaises(AndonInvalidRequestException):
+            self.validator.validate_status(status(statusNotes=5))
+
+    def test_rejects_unknown_station(self):
+        validator = Validator(StationRegistry(lambda: [('line 1', 'station 1')]))
+
+        validator.validate_report(report())
+        with self.assertRaisesRegex(AndonResourceNotFoundException, 'Station not found'):
+            validator.validate_report(report(stationName='station 2'))
+
+
+class TestStationRegistry(unittest.TestCase):
+    def test_loads_lazily_and_caches(self):
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return [('line 1', 'station 1')]
+
+        registry = StationRegistry(loader, ttl=60)
+        self.assertEqual([], loads)
+
+        self.assertIn(('line 1', 'station 1'), registry)
+        self.assertNotIn(('line 1', 'station 2'), registry)
+        self.assertEqual(1, len(loads))
+
+    def test_reloads_after_ttl(self):
+        stations = [[('line 1', 'station 1')], [('line 1', 'station 2')]]
+        registry = StationRegistry(lambda: stations.pop(0), ttl=0)
+
+        self.assertIn(('line 1', 'station 1'), registry)
+        self.assertIn(('line 1', 'station 2'), registry)
+
+    def test_keeps_names_when_reload_fails(self):
+        results = [[('line 1', 'station 1')]]
+
+        def loader():
+            if not results:
+                raise IOError('unavailable')
+            return results.pop()
+
+        registry = StationRegistry(loader, ttl=0)
+        self.assertIn(('line 1', 'station 1'), registry)
+        self.assertIn(('line 1', 'station 1'), registry)
+
+
+class TestClientValidation(unittest.TestCase):
+    @patch('requests.Session.post')
+    def test_rejects_locally_without_request(self, mock_post):
+        client = AndonAppClient('Demo', 'api-token', validator=Validator())
+
+        with self.assertRaises(AndonInvalidRequestException):
+            client.report_data('line 1', 'station 1', 'PAS', 100)
+        with self.assertRaises(AndonInvalidRequestException):
+            client.update_station_status('line 1', 'station 1', 'BLUE')
+
+        mock_post.assert_not_called()